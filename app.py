@@ -1,8 +1,12 @@
 # app.py
+import json
 import os
+import threading
+import time
 from datetime import datetime, timedelta
-from random import sample as rand_sample
+from functools import wraps
 
+import click
 from flask import (
     Flask,
     render_template,
@@ -12,10 +16,21 @@ from flask import (
     flash,
     jsonify,
     session,
+    Response,
+    stream_with_context,
+    send_file,
+    abort,
+    has_request_context,
+    make_response,
+    g,
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event as sa_event
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from flask_login import (
     LoginManager,
     UserMixin,
@@ -25,14 +40,108 @@ from flask_login import (
     current_user,
 )
 
+from backend import (
+    alarms,
+    assets,
+    benchmark,
+    db_engine,
+    events,
+    http_cache,
+    jobs,
+    leaderboard,
+    metrics,
+    migrations,
+    pagination,
+    query_plans,
+    quest_bulk,
+    quest_engine,
+    quest_scheduler,
+    quest_stateless,
+    points_ledger,
+    rank_tables,
+    search,
+    seed,
+    study_rollups,
+    sync,
+    uploads,
+    user_cache,
+    user_stats,
+    voice_commands,
+)
+
 # ----------------- APP & DB SETUP -----------------
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-not-for-prod")
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///Sam.db"
+# DATABASE_URL swaps in another database (e.g. postgresql://...); relative SQLite paths live in instance/.
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", db_engine.DEFAULT_URI)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# SQLITE_PRAGMAS="cache_size=-64000,mmap_size=0" overrides individual connect-time pragmas.
+app.config["SQLITE_PRAGMAS"] = db_engine.parse_pragmas(os.environ.get("SQLITE_PRAGMAS", ""))
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = db_engine.engine_options(
+    app.config["SQLALCHEMY_DATABASE_URI"],
+    app.config["SQLITE_PRAGMAS"],
+    pool_size=int(os.environ.get("DB_POOL_SIZE", db_engine.POOL_SIZE)),
+    max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", db_engine.MAX_OVERFLOW)),
+)
+# Views marked @db_engine.read_only read through a separate pool: a mode=ro connection
+# to the same SQLite file by default, or DATABASE_READ_URL (e.g. a replica). DATABASE_READ_URL=off disables it.
+_read_uri = os.environ.get("DATABASE_READ_URL") or db_engine.read_only_uri(app.config["SQLALCHEMY_DATABASE_URI"])
+if _read_uri and _read_uri != "off":
+    app.config["SQLALCHEMY_BINDS"] = {
+        db_engine.READ_ONLY_BIND: {"url": _read_uri, **app.config["SQLALCHEMY_ENGINE_OPTIONS"]},
+    }
 app.config["UPLOAD_FOLDER"] = "static/uploads"
-db = SQLAlchemy(app)
+# By default each web process runs a quest scheduler thread (started by its first request);
+# a DB lease lets only one of them sweep at a time. Set QUEST_SCHEDULER to anything else
+# when `flask quests regen` runs from cron instead.
+app.config["QUEST_SCHEDULER"] = os.environ.get("QUEST_SCHEDULER", "inprocess")
+app.config["QUEST_SCHEDULER_INTERVAL"] = int(os.environ.get("QUEST_SCHEDULER_INTERVAL", quest_scheduler.DEFAULT_INTERVAL))
+# "stored" keeps Quest rows per period; "stateless" derives active quests from the
+# pools and only persists completions in QuestCompletion.
+app.config["QUEST_MODE"] = os.environ.get("QUEST_MODE", "stored")
+# Quest pools, per-period counts and the weekly/monthly category rotation live in QUEST_POOLS_FILE;
+# edits are picked up within QUEST_POOLS_CHECK_INTERVAL seconds without a restart.
+app.config["QUEST_POOLS_FILE"] = os.environ.get("QUEST_POOLS_FILE", quest_engine.DEFAULT_POOLS_FILE)
+app.config["QUEST_POOLS_CHECK_INTERVAL"] = float(os.environ.get("QUEST_POOLS_CHECK_INTERVAL", quest_engine.DEFAULT_CHECK_INTERVAL))
+# Each process keeps its own leaderboard index, built by a background thread when the process
+# starts serving and resynced from the DB this often (seconds) so workers converge on points
+# earned through other processes.
+app.config["LEADERBOARD_RESYNC"] = int(os.environ.get("LEADERBOARD_RESYNC", 300))
+# Set ALARM_SCHEDULER=inprocess to fire task alarms from the server (pushed over /events).
+# Alarm times are naive wall-clock times as entered in the browser, compared against server local time.
+app.config["ALARM_SCHEDULER"] = os.environ.get("ALARM_SCHEDULER", "")
+app.config["ALARM_WINDOW"] = int(os.environ.get("ALARM_WINDOW", alarms.DEFAULT_WINDOW))
+# Each web process keeps its own alarm heap; alarms set through another process are picked up
+# (and fire at most this late) when the window is reloaded every ALARM_REFRESH seconds.
+app.config["ALARM_REFRESH"] = int(os.environ.get("ALARM_REFRESH", alarms.DEFAULT_REFRESH))
+# The login loader serves user rows from a per-process cache (USER_CACHE_TTL=0 disables it).
+# Local writes invalidate immediately; changes from other processes show up within the TTL.
+app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", user_cache.DEFAULT_TTL))
+app.config["USER_CACHE_SIZE"] = int(os.environ.get("USER_CACHE_SIZE", user_cache.DEFAULT_MAXSIZE))
+# USER_CACHE_SESSION=1 also keeps a copy in the signed session cookie, so a worker with a cold cache skips the lookup.
+app.config["USER_CACHE_SESSION"] = os.environ.get("USER_CACHE_SESSION", "") == "1"
+# Request/SQL instrumentation exposed at /metrics (METRICS=0 disables it). Statements slower
+# than SLOW_QUERY_MS are logged with their parameter types; SERVER_TIMING=1 adds a Server-Timing header.
+app.config["METRICS"] = os.environ.get("METRICS", "1") == "1"
+app.config["SLOW_QUERY_MS"] = int(os.environ.get("SLOW_QUERY_MS", metrics.DEFAULT_SLOW_QUERY_MS))
+app.config["SERVER_TIMING"] = os.environ.get("SERVER_TIMING", "") == "1"
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; otherwise it only answers
+# requests from localhost (behind a proxy, set a token).
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+# Background jobs are stored in the job table. JOBS_WORKER=inprocess runs JOBS_CONCURRENCY worker
+# threads in each web process (started by its first request); set it to anything
+# else when `flask jobs work` processes run the queue instead.
+app.config["JOBS_WORKER"] = os.environ.get("JOBS_WORKER", "inprocess")
+app.config["JOBS_CONCURRENCY"] = int(os.environ.get("JOBS_CONCURRENCY", jobs.DEFAULT_CONCURRENCY))
+app.config["JOBS_POLL_INTERVAL"] = float(os.environ.get("JOBS_POLL_INTERVAL", jobs.DEFAULT_POLL_INTERVAL))
+app.config["JOBS_LEASE"] = int(os.environ.get("JOBS_LEASE", jobs.DEFAULT_LEASE))
+# /sync remembers each client idempotency key (and its result) for this many seconds
+app.config["SYNC_KEY_TTL"] = int(os.environ.get("SYNC_KEY_TTL", sync.DEFAULT_KEY_TTL))
+db = SQLAlchemy(app, session_options={"class_": db_engine.RoutingSession})
+with app.app_context():
+    for _bind, _engine in db.engines.items():
+        db_engine.install_pragmas(_engine, app.config["SQLITE_PRAGMAS"], read_only=_bind == db_engine.READ_ONLY_BIND)
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -48,12 +157,49 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+# Fingerprinted static assets; precompressed variants live under instance/assets
+asset_manifest = assets.AssetManifest(app.static_folder, os.path.join(app.instance_path, "assets"))
+
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static file that embeds its content hash, so it can be cached forever."""
+    fp = asset_manifest.fingerprint(filename)
+    if fp is None:
+        return url_for("static", filename=filename)
+    return url_for("fingerprinted_asset", fingerprint=fp, filename=filename)
+
+
+def save_profile_pic(file):
+    """Store an uploaded picture under its content hash and return the key saved on User.profile_pic."""
+    # allowed_file() has vetted the extension; secure_filename() would drop non-ASCII
+    # names down to the bare extension ("фото.jpg" -> "jpg"), leaving nothing to split
+    ext = file.filename.rsplit(".", 1)[1].lower()
+    return uploads.save_upload(file, app.config["UPLOAD_FOLDER"], ext)
+
+
+def _store_thumbnails(user_id, key):
+    variants = uploads.make_thumbnails(app.config["UPLOAD_FOLDER"], key)
+    if not variants:
+        return
+    # Skip if the user replaced the picture while we were working
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user_id, User.profile_pic == key)
+        .values(profile_thumb=variants["jpeg"], profile_thumb_webp=variants["webp"])
+    )
+    data_changed(user_id)
+    db.session.commit()
+
+
 # ----------------- MODELS -----------------
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), nullable=False, unique=True)
     password = db.Column(db.String(200), nullable=False)
     profile_pic = db.Column(db.String(200), nullable=True)
+    profile_thumb = db.Column(db.String(200), nullable=True)
+    profile_thumb_webp = db.Column(db.String(200), nullable=True)
     quote = db.Column(db.String(300), nullable=False, default="Stay focused. Keep leveling up.")
     rank = db.Column(db.String(50), default="Bronze")
     level = db.Column(db.Integer, default=1)
@@ -63,6 +209,8 @@ class User(db.Model, UserMixin):
     growth = db.Column(db.Integer, default=50)
     wisdom = db.Column(db.Integer, default=50)
     finance = db.Column(db.Integer, default=50)
+    # Bumped by every change to the user's data; per-user ETags and fragment keys are built from it
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Personal
     age = db.Column(db.Integer, nullable=True)
@@ -75,6 +223,13 @@ class User(db.Model, UserMixin):
     last_weekly_quest = db.Column(db.DateTime, default=None)
     last_monthly_quest = db.Column(db.DateTime, default=None)
 
+    # One per period: the regen sweep reads each as a range (see quest_scheduler.expired_user_ids)
+    __table_args__ = (
+        db.Index("ix_user_last_daily_quest", "last_daily_quest"),
+        db.Index("ix_user_last_weekly_quest", "last_weekly_quest"),
+        db.Index("ix_user_last_monthly_quest", "last_monthly_quest"),
+    )
+
 
 class Task(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -87,6 +242,19 @@ class Task(db.Model):
 
     user = db.relationship("User", backref=db.backref("tasks", lazy=True))
 
+    # Kept in sync with backend/migrations.py for existing databases
+    __table_args__ = (
+        db.Index("ix_task_user_created", "user_id", "created_at"),
+        db.Index("ix_task_user_completed", "user_id", "completed", "created_at"),
+        db.Index("ix_task_alarm_pending", "alarm_time", sqlite_where=db.text("completed = 0 AND alarm_time IS NOT NULL")),
+        db.Index(
+            "ix_task_user_alarm_pending",
+            "user_id",
+            "alarm_time",
+            sqlite_where=db.text("completed = 0 AND alarm_time IS NOT NULL"),
+        ),
+    )
+
 
 class StudyLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -94,14 +262,38 @@ class StudyLog(db.Model):
     subject = db.Column(db.String(100), nullable=False)
     duration = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text, nullable=True)
-    started_at = db.Column(db.String(50))
-    ended_at = db.Column(db.String(50))
+    started_at = db.Column(db.DateTime)  # naive UTC, like created_at
+    ended_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_study_log_user_created", "user_id", "created_at"),
+        db.Index("ix_study_log_user_started", "user_id", "started_at"),
+    )
+
     def __repr__(self):
         return f"<StudyLog {self.subject} - {self.duration} min>"
 
 
+class StudyDaily(db.Model):
+    """Per-user, per-UTC-day study totals, maintained alongside StudyLog."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class StudySubjectDaily(db.Model):
+    """Per-user, per-day, per-subject study totals, maintained alongside StudyLog."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    subject = db.Column(db.String(100), primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+
+
 class Quest(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -113,53 +305,169 @@ class Quest(db.Model):
     completed = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_quest_user_type", "user_id", "type", "created_at"),
+        db.Index("ix_quest_user_completed", "user_id", "completed"),
+    )
+
+
+class QuestCompletion(db.Model):
+    """Completed stateless quest; quest_key encodes period, period number and slot."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    quest_key = db.Column(db.Integer, nullable=False)
+    xp = db.Column(db.Integer, default=10)
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint("user_id", "quest_key"),)
+
+
+class PointsLedger(db.Model):
+    """Append-only record of every points award; User.points caches the per-user sum."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(30), nullable=False)  # task/study_log/quest/quest_completion/...
+    source_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_points_ledger_user_created", "user_id", "created_at"),)
+
+
+class UserStats(db.Model):
+    """Denormalized per-user counters, kept in step with Task/Quest/StudyLog by the mutating routes."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    completed_tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed_quests = db.Column(db.Integer, nullable=False, default=0)
+    study_logs = db.Column(db.Integer, nullable=False, default=0)
+    total_study_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SyncReceipt(db.Model):
+    """Result of one /sync mutation, by the client's idempotency key, so replays are not applied twice."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    key = db.Column(db.String(sync.MAX_KEY_LENGTH), primary_key=True)
+    result = db.Column(db.Text, nullable=False)  # compact JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_sync_receipt_created", "created_at"), {"sqlite_with_rowid": False})
+
+
+class Job(db.Model):
+    """Durable background work; see backend/jobs.py and `flask jobs work`."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")  # JSON keyword arguments for the handler
+    key = db.Column(db.String(200), nullable=True, unique=True)  # idempotency key
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued/running/done/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=jobs.DEFAULT_MAX_ATTEMPTS)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_job_status_run", "status", "run_at", "id"),
+        db.Index("ix_job_status_finished", "status", "finished_at"),
+    )
+
+
+class Lease(db.Model):
+    """A named lock held by one process until expires_at (see quest_scheduler.acquire_lease)."""
+
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
 
 # ----------------- RANK/LEVEL/STATS UTIL -----------------
+RANKS = [
+    ("E", 0, 99),
+    ("E+", 100, 199),
+    ("E++", 200, 299),
+    ("D", 300, 499),
+    ("D+", 500, 699),
+    ("D++", 700, 899),
+    ("C", 900, 1199),
+    ("C+", 1200, 1499),
+    ("C++", 1500, 1799),
+    ("B", 1800, 2199),
+    ("B+", 2200, 2599),
+    ("B++", 2600, 2999),
+    ("A", 3000, 3499),
+    ("A+", 3500, 3999),
+    ("A++", 4000, 4499),
+    ("S", 4500, 4999),
+    ("S+", 5000, 5999),
+    ("SS", 6000, 6999),
+    ("SS+", 7000, 7999),
+    ("SSS", 8000, 8999),
+    ("National Rank", 9000, 9999999),
+]
+
+
+LEVEL_THRESHOLDS = [50, 150, 300, 500, 750, 1050, 1400, 1800, 2250, 2750]
+
+# Shared by get_rank/get_level and the batch recompute so both always agree
+RANK_TABLES = rank_tables.RankTables(RANKS, LEVEL_THRESHOLDS)
+
+
 def get_rank(points: int) -> str:
-    ranks = [
-        ("E", 0, 99),
-        ("E+", 100, 199),
-        ("E++", 200, 299),
-        ("D", 300, 499),
-        ("D+", 500, 699),
-        ("D++", 700, 899),
-        ("C", 900, 1199),
-        ("C+", 1200, 1499),
-        ("C++", 1500, 1799),
-        ("B", 1800, 2199),
-        ("B+", 2200, 2599),
-        ("B++", 2600, 2999),
-        ("A", 3000, 3499),
-        ("A+", 3500, 3999),
-        ("A++", 4000, 4499),
-        ("S", 4500, 4999),
-        ("S+", 5000, 5999),
-        ("SS", 6000, 6999),
-        ("SS+", 7000, 7999),
-        ("SSS", 8000, 8999),
-        ("National Rank", 9000, 9999999),
-    ]
-    for rank, low, high in ranks:
-        if low <= points <= high:
-            return rank
-    return "Unranked"
+    return RANK_TABLES.rank(points)
 
 
 def get_level(points: int) -> int:
-    level = 1
-    thresholds = [50, 150, 300, 500, 750, 1050, 1400, 1800, 2250, 2750]
-    for i, threshold in enumerate(thresholds, start=1):
-        if points >= threshold:
-            level = i + 1
-    return level
+    return RANK_TABLES.level(points)
+
+
+def recompute_ranks(batch_size=1000):
+    """Recompute User.rank/User.level for everyone from points; only changed rows are written."""
+    rows = db.session.execute(db.select(User.id, User.points, User.rank, User.level)).all()
+    ranks, levels = RANK_TABLES.ranks_and_levels([r.points or 0 for r in rows])
+    changed = [
+        {"id": r.id, "rank": rank, "level": level}
+        for r, rank, level in zip(rows, ranks, levels)
+        if r.rank != rank or r.level != level
+    ]
+    for i in range(0, len(changed), batch_size):
+        db.session.execute(db.update(User), changed[i : i + batch_size])
+    db.session.commit()
+    identity_cache.invalidate(*(c["id"] for c in changed))
+    return {"users": len(rows), "changed": len(changed)}
+
+
+def recompute_user_stats(user_ids=None):
+    """Counters recomputed from the base tables, {user_id: {...}}."""
+    if stateless_mode():
+        return user_stats.recompute(db, Task, StudyLog, QuestCompletion, user_ids=user_ids)
+    return user_stats.recompute(db, Task, StudyLog, Quest, Quest.completed.is_(True), user_ids=user_ids)
+
+
+def user_stats_from_base(user_id):
+    """One user's counters recomputed from the base tables."""
+    return recompute_user_stats([user_id]).get(user_id, {})
+
+
+def bump_user_stats(user_id, **deltas):
+    """Adjust a user's stats counters in the current transaction."""
+    user_stats.bump(db, UserStats, user_id, user_stats_from_base, **deltas)
 
 
 def calculate_stats(user):
     base = user.points or 0
     # Simple derived stats — extend as you like
-    completed_tasks = Task.query.filter_by(user_id=user.id, completed=True).count()
-    completed_quests = Quest.query.filter_by(user_id=user.id, completed=True).count()
-    completed_academics = StudyLog.query.filter_by(user_id=user.id).count()
+    row = user_stats.load(db, UserStats, user.id, user_stats_from_base)
+    completed_tasks = row.completed_tasks
+    completed_quests = row.completed_quests
+    completed_academics = row.study_logs
     return {
         "strength": base // 10 + completed_tasks * 5,
         "finance": base // 20 + completed_academics * 3,
@@ -169,32 +477,215 @@ def calculate_stats(user):
     }
 
 
+# ----------------- POINTS -----------------
+def award_points(user, amount, source, source_id=None, **stat_deltas):
+    """
+    Record `amount` points for `user` in the ledger and apply it (plus any
+    stat deltas such as strength=2) with one atomic UPDATE, without
+    committing. The loaded `user` is refreshed in place with the new values.
+    """
+    new = points_ledger.award(
+        db,
+        User,
+        PointsLedger,
+        user.id,
+        amount,
+        source,
+        source_id,
+        ranks=lambda p: (get_rank(p), get_level(p)),
+        data_version=1,
+        **stat_deltas,
+    )
+    for column, value in new.items():
+        set_committed_value(user, column, value)
+    user_changed(user.id)
+    return new["points"]
+
+
+# ----------------- STUDY ROLLUPS -----------------
+def study_rollup(log, sign=1):
+    """Add (or with sign=-1 remove) a flushed StudyLog to the study rollups, without committing."""
+    study_rollups.apply(db, StudyDaily, StudySubjectDaily, log, sign)
+
+
+def rebuild_study_rollups(user_ids=None):
+    study_rollups.rebuild(db, StudyLog, StudyDaily, StudySubjectDaily, user_ids=user_ids)
+
+
+# ----------------- LEADERBOARD -----------------
+ranking = leaderboard.Leaderboard([(name, low) for name, low, _high in RANKS])
+
+
+LEADERBOARD_LOAD_WAIT = 10  # seconds a request waits for the process's initial index build
+
+
+def _leaderboard_rows():
+    return db.session.execute(db.select(User.id, User.points)).all()
+
+
+leaderboard_loader = leaderboard.LeaderboardLoader(app, ranking, _leaderboard_rows, interval=app.config["LEADERBOARD_RESYNC"])
+
+
+def leaderboard_index():
+    """The in-memory leaderboard; leaderboard_loader builds and resyncs it off the request path."""
+    if not ranking.wait_loaded(LEADERBOARD_LOAD_WAIT):
+        # Only reached if the loader thread is failing; don't serve an empty board
+        leaderboard_loader.resync()
+    return ranking
+
+
+def points_changed(user):
+    """Propagate a committed points change to the in-memory indexes and live clients."""
+    ranking.update(user.id, user.points)
+    if event_hub.has_subscribers(user.id):
+        points = user.points or 0
+        event_hub.publish(user.id, "points", {"points": points, "rank": get_rank(points), "level": get_level(points)})
+
+
+# ----------------- LIVE EVENTS -----------------
+event_hub = events.EventHub()
+
+
+def queue_event(user_id, event, data):
+    """Publish `event` to the user's /events subscribers once the current transaction commits."""
+    if event_hub.has_subscribers(user_id):
+        db.session.info.setdefault("pending_events", []).append((user_id, event, data))
+
+
+@sa_event.listens_for(db.session, "after_commit")
+def _publish_pending_events(session):
+    for user_id, event, data in session.info.pop("pending_events", ()):
+        event_hub.publish(user_id, event, data)
+
+
+@sa_event.listens_for(db.session, "after_soft_rollback")
+def _discard_pending_events(session, previous_transaction):
+    session.info.pop("pending_events", None)
+
+
+# ----------------- ALARMS -----------------
+def _pending_alarms_query():
+    # Literal "completed = 0" (not a bound parameter) so SQLite can match the partial ix_task_*alarm_pending indexes
+    return db.select(Task.alarm_time, Task.id, Task.user_id, Task.title).where(
+        Task.completed == db.false(), Task.alarm_time.is_not(None)
+    )
+
+
+def _load_alarm_window(start, end):
+    stmt = _pending_alarms_query().where(Task.alarm_time >= start, Task.alarm_time < end)
+    return db.session.execute(stmt).all()
+
+
+def _fire_alarm(user_id, alarm):
+    event_hub.publish(user_id, "alarm", alarm)
+
+
+alarm_scheduler = alarms.AlarmScheduler(
+    app, _load_alarm_window, _fire_alarm, window=app.config["ALARM_WINDOW"], refresh=app.config["ALARM_REFRESH"]
+)
+
+
+def alarm_changed(task):
+    """Reflect a committed task change in the in-process alarm heap."""
+    if not alarm_scheduler.running:
+        return
+    if task.completed or task.alarm_time is None:
+        alarm_scheduler.cancel(task.id)
+    else:
+        alarm_scheduler.schedule(task.id, task.user_id, task.alarm_time, task.title)
+
+
+# ----------------- USER LOADER -----------------
+identity_cache = user_cache.UserCache(ttl=app.config["USER_CACHE_TTL"], maxsize=app.config["USER_CACHE_SIZE"])
+# Never copied into the (signed but readable) session cookie
+SESSION_SNAPSHOT_EXCLUDE = {"password"}
+
+
+def _user_snapshot(user):
+    return {attr.key: getattr(user, attr.key) for attr in sa_inspect(User).column_attrs}
+
+
+def _session_snapshot(values):
+    # Only JSON-native values; the rest (datetimes) are lazily loaded if a request touches them
+    return {
+        key: value
+        for key, value in values.items()
+        if key not in SESSION_SNAPSHOT_EXCLUDE and (value is None or isinstance(value, (str, int, float, bool)))
+    }
+
+
+def _attach_user(values):
+    """Persistent User for `values` in the current session, without a SELECT; missing columns load on first access."""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def user_changed(user_id):
+    """Drop the user's cached identity once the current transaction commits."""
+    db.session.info.setdefault("stale_users", set()).add(user_id)
+
+
+def data_changed(user_id):
+    """Bump the user's data_version when the current transaction commits (invalidates ETags and fragments)."""
+    db.session.info.setdefault("changed_users", set()).add(user_id)
+    user_changed(user_id)
+
+
+@sa_event.listens_for(db.session, "before_commit")
+def _bump_data_versions(sa_session):
+    changed = sa_session.info.pop("changed_users", None)
+    if changed:
+        sa_session.execute(
+            db.update(User)
+            .where(User.id.in_(changed))
+            .values(data_version=User.data_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+@sa_event.listens_for(db.session, "after_commit")
+def _invalidate_stale_users(sa_session):
+    stale = sa_session.info.pop("stale_users", None)
+    if not stale:
+        return
+    identity_cache.invalidate(*stale)
+    if has_request_context() and session.get("_user", {}).get("id") in stale:
+        session.pop("_user")
+
+
+@sa_event.listens_for(db.session, "after_soft_rollback")
+def _discard_stale_users(sa_session, previous_transaction):
+    sa_session.info.pop("stale_users", None)
+    sa_session.info.pop("changed_users", None)
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    signed = session.get("_user") if app.config["USER_CACHE_SESSION"] else None
+    if signed and (signed.get("id") != user_id or time.time() - signed.get("at", 0) >= identity_cache.ttl):
+        signed = None
+
+    values = identity_cache.get(user_id)
+    if values is None and signed:
+        values = signed["values"]
+    if values is not None:
+        user = _attach_user(values)
+    else:
+        version = identity_cache.version
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        values = _user_snapshot(user)
+        identity_cache.put(user_id, values, version)
+
+    if app.config["USER_CACHE_SESSION"] and not signed:
+        session["_user"] = {"id": user_id, "at": time.time(), "values": _session_snapshot(values)}
+    return user
 
 
 # ----------------- QUEST POOLS & REGEN CONFIG -----------------
-# You can expand these pools with your preferred quests.
-DEFAULT_POOLS = {
-    "daily": [
-        {"title": "Read 20 pages of a book", "category": "Academics", "type": "daily", "difficulty": "Easy", "xp": 15},
-        {"title": "Practice coding for 30 minutes", "category": "Academics", "type": "daily", "difficulty": "Medium", "xp": 20},
-        {"title": "Meditate for 10 minutes", "category": "Mental", "type": "daily", "difficulty": "Easy", "xp": 10},
-    ],
-    "weekly": [
-        {"title": "Finish one small project", "category": "Project", "type": "weekly", "difficulty": "Hard", "xp": 80},
-        {"title": "Workout 4 times this week", "category": "Physical", "type": "weekly", "difficulty": "Hard", "xp": 70},
-    ],
-    "monthly": [
-        {"title": "Complete a mini-course", "category": "Academics", "type": "monthly", "difficulty": "Hard", "xp": 200},
-        {"title": "Read a full book", "category": "Academics", "type": "monthly", "difficulty": "Medium", "xp": 150},
-    ],
-}
-
-# How many to create per period
-COUNTS = {"daily": 3, "weekly": 2, "monthly": 1}
-
 # Seconds to wait before regenerating quests (approx)
 REGEN = {
     "daily": 24 * 3600,  # 24 hours
@@ -202,126 +693,456 @@ REGEN = {
     "monthly": 30 * 24 * 3600,  # 30 days
 }
 
-
-def _choose_sample(pool, count):
-    if not pool:
-        return []
-    if len(pool) <= count:
-        return pool.copy()
-    try:
-        return rand_sample(pool, count)
-    except ValueError:
-        # fallback
-        return pool[:count]
+# Edit QUEST_POOLS_FILE (backend/quest_pools.json by default) to expand the pools.
+quest_pools = quest_engine.QuestEngine(
+    app.config["QUEST_POOLS_FILE"], REGEN, check_interval=app.config["QUEST_POOLS_CHECK_INTERVAL"], logger=app.logger
+)
 
 
 # ----------------- QUEST UTILITIES -----------------
-def generate_quests_for_user(user_id, db_session=db, UserModel=User, QuestModel=Quest):
+def generate_quests_for_user(user_id, db_session=db, UserModel=User, QuestModel=Quest, now=None, commit=True):
     """Generate quests for a user only when the regen period has passed."""
-    user = db_session.session.get(UserModel, user_id) if hasattr(db_session, "session") else UserModel.query.get(user_id)
-    if not user:
-        return
-
-    now = datetime.utcnow()
-    periods = {
-        "daily": (user.last_daily_quest, REGEN["daily"]),
-        "weekly": (user.last_weekly_quest, REGEN["weekly"]),
-        "monthly": (user.last_monthly_quest, REGEN["monthly"]),
-    }
-
-    for period, (last_time, regen_seconds) in periods.items():
-        needs = False
-        if not last_time:
-            needs = True
-        else:
-            elapsed = (now - last_time).total_seconds()
-            if elapsed >= regen_seconds:
-                needs = True
+    user_changed(user_id)  # last_*_quest timestamps
+    return quest_bulk.regenerate_cohort(
+        db_session,
+        UserModel,
+        QuestModel,
+        [user_id],
+        REGEN,
+        quest_pools.choose_now,
+        now=now,
+        commit=commit,
+        Stats=UserStats,
+        extra_values={"data_version": UserModel.data_version + 1},
+    )
+
+
+def generate_quests_for_users(user_ids, now=None):
+    """Regenerate expired quests for a batch of users with set-based statements and a single commit."""
+    result = quest_bulk.regenerate_cohort(
+        db,
+        User,
+        Quest,
+        user_ids,
+        REGEN,
+        quest_pools.choose_now,
+        now=now,
+        Stats=UserStats,
+        extra_values={"data_version": User.data_version + 1},
+    )
+    identity_cache.invalidate(*result["user_ids"])
+    for user_id in result["user_ids"]:
+        if event_hub.has_subscribers(user_id):
+            event_hub.publish(user_id, "quests_regenerated", {})
+    return result
+
+
+_quest_sweep_lock = threading.Lock()
+
+
+def regenerate_expired_quests(batch_size=quest_scheduler.DEFAULT_BATCH_SIZE, keep_lease=False):
+    """
+    Sweep every user whose quests have expired. Used by the CLI, the job queue and the
+    in-process scheduler of every web process, so only one sweep runs at a time: across
+    processes through a DB lease, within one through a lock. A call that can't have
+    them does nothing and returns "leased": False. The scheduler keeps the lease between
+    its sweeps (keep_lease=True); one-shot callers release it when done.
+    """
+    if stateless_mode():
+        return quest_scheduler.sweep_result()
+    if not _quest_sweep_lock.acquire(blocking=False):
+        return quest_scheduler.sweep_result(leased=False)
+    ttl = max(quest_scheduler.DEFAULT_LEASE, 2 * app.config["QUEST_SCHEDULER_INTERVAL"])
+    try:
+        return quest_scheduler.regenerate_expired(
+            db,
+            User,
+            REGEN,
+            generate_quests_for_users,
+            batch_size=batch_size,
+            lease=lambda: quest_scheduler.acquire_lease(db, Lease, quest_scheduler.SWEEP_LEASE, ttl=ttl),
+        )
+    finally:
+        if not keep_lease:
+            quest_scheduler.release_lease(db, Lease, quest_scheduler.SWEEP_LEASE)
+        _quest_sweep_lock.release()
+
+
+scheduler = quest_scheduler.QuestScheduler(
+    app, lambda: regenerate_expired_quests(keep_lease=True), interval=app.config["QUEST_SCHEDULER_INTERVAL"]
+)
 
-        if not needs:
-            continue
 
-        # Delete old quests of this period
-        old_quests = QuestModel.query.filter_by(user_id=user.id, type=period).all()
-        for q in old_quests:
-            db.session.delete(q)
-
-        # Choose and add new quests from pool
-        pool = DEFAULT_POOLS.get(period, [])
-        chosen = _choose_sample(pool, COUNTS.get(period, 1))
-        for q in chosen:
-            quest = QuestModel(
-                user_id=user.id,
-                title=q["title"],
-                category=q.get("category", "General"),
-                type=q.get("type", period),
-                difficulty=q.get("difficulty", "Medium"),
-                xp=q.get("xp", 10),
-                completed=False,
-            )
-            db.session.add(quest)
+def stateless_mode():
+    return app.config["QUEST_MODE"] == "stateless"
 
-        # Personalized physical quest based on BMI (only daily)
-        if period == "daily" and user.weight_kg and user.height_cm:
-            try:
-                bmi = user.weight_kg / ((user.height_cm / 100) ** 2)
-                title, xp = "Standard Exercise", 10
-                if bmi < 18.5:
-                    title, xp = "Light Workout", 15
-                elif bmi > 25:
-                    title, xp = "Moderate Cardio", 20
-                # don't duplicate same title for same day
-                exists = QuestModel.query.filter_by(user_id=user.id, title=title, type="daily").first()
-                if not exists:
-                    q = QuestModel(
-                        user_id=user.id,
-                        title=title,
-                        category="Physical",
-                        type="daily",
-                        difficulty="Medium",
-                        xp=xp,
-                        completed=False,
-                    )
-                    db.session.add(q)
-            except Exception:
-                pass
-
-        # Update last time
-        if period == "daily":
-            user.last_daily_quest = now
-        elif period == "weekly":
-            user.last_weekly_quest = now
-        elif period == "monthly":
-            user.last_monthly_quest = now
 
-    db.session.commit()
+stateless_quests = quest_stateless.StatelessQuests(quest_pools, REGEN)
 
 
 def get_user_quests(user_id, period=None, QuestModel=Quest):
     """Return all quests for user; if period provided filter by type."""
+    if stateless_mode():
+        return _get_stateless_quests(user_id, period)
     q = QuestModel.query.filter_by(user_id=user_id)
     if period:
         q = q.filter_by(type=period)
-    return q.order_by(QuestModel.created_at.desc()).all()
+    return q.order_by(QuestModel.created_at.desc(), QuestModel.id.desc()).all()
 
 
-def complete_user_quest(user_id, quest_id, QuestModel=Quest, UserModel=User):
+def complete_user_quest(user_id, quest_id, QuestModel=Quest, UserModel=User, commit=True):
+    if stateless_mode():
+        return _complete_stateless_quest(user_id, quest_id, commit=commit)
     quest = QuestModel.query.get(quest_id)
     if not quest or quest.user_id != user_id:
         return False, "Quest not found or not owned by user"
     if quest.completed:
         return False, "Quest already completed"
     quest.completed = True
-    user = UserModel.query.get(user_id)
-    user.points = (user.points or 0) + (quest.xp or 0)
-    # Optionally update user level/rank fields
-    user.level = get_level(user.points)
-    user.rank = get_rank(user.points)
-    db.session.commit()
-    return True, {"points": user.points, "quest_id": quest.id}
+    bump_user_stats(user_id, completed_quests=1)
+    queue_event(user_id, "quest_completed", {"quest_id": quest.id})
+    user = db.session.get(UserModel, user_id)
+    points = award_points(user, quest.xp or 0, "quest", quest.id)
+    if commit:
+        db.session.commit()
+        points_changed(user)
+    return True, {"points": points, "quest_id": quest.id}
+
+
+def _get_stateless_quests(user_id, period=None):
+    user = db.session.get(User, user_id)
+    if not user:
+        return []
+    quests = stateless_quests.active(user, period)
+    if not quests:
+        return quests
+    done = db.session.execute(
+        db.select(QuestCompletion.quest_key).where(
+            QuestCompletion.user_id == user_id, QuestCompletion.quest_key.in_([q.id for q in quests])
+        )
+    ).scalars()
+    return quest_stateless.mark_completed(quests, set(done))
+
+
+def _complete_stateless_quest(user_id, quest_key, commit=True):
+    user = db.session.get(User, user_id)
+    quest = stateless_quests.find(user, quest_key) if user else None
+    if not quest:
+        return False, "Quest not found or not owned by user"
+    # The unique (user_id, quest_key) row decides: of two racing completions
+    # (double click, voice + click) only the one that inserts it is awarded
+    inserted = db.session.execute(
+        db_engine.conflict_insert(db, QuestCompletion)
+        .values(user_id=user_id, quest_key=quest_key, xp=quest.xp, completed_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["user_id", "quest_key"])
+    ).rowcount
+    if inserted != 1:
+        return False, "Quest already completed"
+    bump_user_stats(user_id, completed_quests=1)
+    queue_event(user_id, "quest_completed", {"quest_id": quest_key})
+    points = award_points(user, quest.xp or 0, "quest_completion", quest_key)
+    if commit:
+        db.session.commit()
+        points_changed(user)
+    return True, {"points": points, "quest_id": quest_key}
+
+
+# ----------------- TASK & STUDY MUTATIONS -----------------
+# Shared by the form routes, voice commands and /sync; none of them commit.
+def create_task(user, title, alarm_time=None):
+    task = Task(title=title, alarm_time=alarm_time, user_id=user.id)
+    db.session.add(task)
+    db.session.flush()
+    queue_event(user.id, "task_added", serialize_task(task))
+    data_changed(user.id)
+    return task
+
+
+def mark_task_completed(user, task):
+    """Complete `task` and award its points; returns the user's new points total."""
+    task.completed = True
+    bump_user_stats(user.id, completed_tasks=1)
+    queue_event(user.id, "task_completed", {"id": task.id})
+    return award_points(user, 10, "task", task.id, strength=2)
+
+
+def record_study_log(user, subject, duration, notes=None, started_at=None, ended_at=None):
+    """Add a study log, update the rollups and award its points; returns (log, points earned)."""
+    log = StudyLog(user_id=user.id, subject=subject, duration=duration, notes=notes, started_at=started_at, ended_at=ended_at)
+    db.session.add(log)
+    bump_user_stats(user.id, study_logs=1, total_study_minutes=duration)
+    db.session.flush()
+    study_rollup(log)
+    queue_event(user.id, "study_logged", serialize_study_log(log))
+    earned = max(1, duration // 5) if duration > 0 else 1
+    award_points(user, earned, "study_log", log.id, wisdom=earned // 2)
+    return log, earned
+
+
+# ----------------- BACKGROUND JOBS -----------------
+job_queue = jobs.JobQueue(db, Job, lease=app.config["JOBS_LEASE"])
+job_worker = jobs.JobWorker(app, job_queue, concurrency=app.config["JOBS_CONCURRENCY"], poll_interval=app.config["JOBS_POLL_INTERVAL"])
+
+
+def enqueue_job(name, key=None, delay=0, **payload):
+    """Queue handler `name` to run with `payload` once the current transaction commits (no commit here)."""
+    job_id = job_queue.enqueue(name, payload, key=key, delay=delay)
+    db.session.info["jobs_enqueued"] = True
+    return job_id
+
+
+@sa_event.listens_for(db.session, "after_commit")
+def _wake_job_worker(sa_session):
+    if sa_session.info.pop("jobs_enqueued", False):
+        job_worker.wake()
+
+
+@sa_event.listens_for(db.session, "after_soft_rollback")
+def _discard_enqueued_jobs(sa_session, previous_transaction):
+    sa_session.info.pop("jobs_enqueued", None)
+
+
+@job_queue.handler("thumbnails")
+def _thumbnails_job(user_id, picture):
+    _store_thumbnails(user_id, picture)
+
+
+@job_queue.handler("quests.regen", max_attempts=3)
+def _quests_regen_job():
+    regenerate_expired_quests()
+
+
+@job_queue.handler("ranks.recompute", max_attempts=3)
+def _ranks_recompute_job():
+    recompute_ranks()
+
+
+@job_queue.handler("stats.rebuild", max_attempts=3)
+def _stats_rebuild_job(user_ids=None):
+    expected = recompute_user_stats(user_ids)
+    if user_ids is None:
+        user_ids = db.session.execute(db.select(User.id)).scalars().all()
+    user_stats.store_all(db, UserStats, expected, user_ids)
+
+
+@job_queue.handler("study.rebuild_rollups", max_attempts=3)
+def _study_rollups_job(user_ids=None):
+    rebuild_study_rollups(user_ids)
+
+
+@job_queue.handler("sync.purge", max_attempts=3)
+def _sync_purge_job():
+    sync.purge(db, SyncReceipt, ttl=app.config["SYNC_KEY_TTL"])
+
+
+# ----------------- LIST RESPONSES -----------------
+def list_response(stmt, Model, serialize):
+    """
+    Serve a per-user list query in one of three shapes:
+    ?stream=1 streams the whole JSON array from a server-side cursor,
+    ?limit=N[&cursor=...] returns {"items", "next_cursor"} using (created_at, id) keyset pagination,
+    and no parameters returns the full JSON array as before.
+    """
+    args = request.args
+    if args.get("stream"):
+
+        def generate():
+            # Executed lazily inside the streamed response so the session outlives the view.
+            rows = db.session.execute(
+                pagination.newest_first(stmt, Model).execution_options(yield_per=pagination.STREAM_CHUNK)
+            ).scalars()
+            yield from pagination.stream_json_array(rows, serialize)
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
+
+    if "limit" in args or "cursor" in args:
+        limit = pagination.parse_limit(args.get("limit"))
+        try:
+            page_stmt = pagination.keyset_page(stmt, Model, args.get("cursor"), limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        rows = db.session.execute(page_stmt).scalars().all()
+        return jsonify(pagination.page_result(rows, limit, serialize))
+
+    rows = db.session.execute(pagination.newest_first(stmt, Model)).scalars().all()
+    return jsonify([serialize(r) for r in rows])
+
+
+def serialize_task(t):
+    return {"id": t.id, "title": t.title, "completed": t.completed}
+
+
+def serialize_study_log(l):
+    return {
+        "id": l.id,
+        "subject": l.subject,
+        "duration": l.duration,
+        "notes": l.notes,
+        "started_at": l.started_at.isoformat() if l.started_at else None,
+        "ended_at": l.ended_at.isoformat() if l.ended_at else None,
+        "created_at": l.created_at.strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def serialize_quest(q):
+    return {"id": q.id, "title": q.title, "category": q.category, "type": q.type, "difficulty": q.difficulty, "xp": q.xp, "completed": q.completed}
+
+
+# ----------------- METRICS -----------------
+request_metrics = metrics.Metrics(slow_query_ms=app.config["SLOW_QUERY_MS"], logger=app.logger)
+
+
+def _metrics_endpoint():
+    if not has_request_context():
+        return "background"
+    return request.endpoint or "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    request_metrics.observe_query(elapsed, statement, parameters)
+    if has_request_context() and "metrics_started" in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+
+if app.config["METRICS"]:
+    with app.app_context():
+        for _engine in db.engines.values():
+            sa_event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+            sa_event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+
+    @sa_event.listens_for(db.session, "after_commit")
+    def _count_commit(sa_session):
+        request_metrics.observe_commit(_metrics_endpoint())
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        if "metrics_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_started
+        request_metrics.observe_request(
+            _metrics_endpoint(), request.method, response.status_code, elapsed, g.sql_statements, g.sql_seconds
+        )
+        if app.config["SERVER_TIMING"]:
+            response.headers["Server-Timing"] = metrics.server_timing(elapsed, g.sql_statements, g.sql_seconds)
+        return response
+
+
+# ----------------- CONDITIONAL GET -----------------
+# Changes whenever the code or templates of a deployment change; APP_BUILD_ID pins it explicitly.
+BUILD_ID = os.environ.get("APP_BUILD_ID") or http_cache.build_id(
+    __file__, os.path.join(app.root_path, app.template_folder), os.path.join(app.root_path, "backend")
+)
+fragments = http_cache.FragmentCache()
+
+
+def current_data_version():
+    """
+    The user's data_version as committed, read once per request by primary
+    key. Not from the cached identity: that can be USER_CACHE_TTL seconds
+    behind a write made through another worker, and validators built on it
+    would keep answering 304 or serving old fragments until it expires.
+    """
+    if "data_version" not in g:
+        g.data_version = db.session.execute(db.select(User.data_version).where(User.id == current_user.id)).scalar() or 0
+    return g.data_version
+
+
+@sa_event.listens_for(db.session, "after_commit")
+def _forget_data_version(sa_session):
+    # The commit may have bumped it; read it again if the request needs it
+    if has_request_context():
+        g.pop("data_version", None)
+
+
+def conditional(*key_parts):
+    """
+    Per-user conditional GET: the ETag is derived from the build id, the
+    user's current_data_version() and the URL, plus any `key_parts()` for
+    views that also depend on time. A matching If-None-Match gets a 304
+    before the view runs.
+    """
+
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = http_cache.etag(
+                BUILD_ID, current_user.id, current_data_version(), request.full_path, *(part() for part in key_parts)
+            )
+            if http_cache.not_modified(request, tag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag, weak=True)
+            response.headers["Cache-Control"] = http_cache.REVALIDATE
+            response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorate
+
+
+def _utc_today():
+    return datetime.utcnow().date()
+
+
+def _quest_periods():
+    # Stateless quests rotate with the clock and the pools file, not with user writes
+    if not stateless_mode():
+        return ""
+    now = datetime.utcnow()
+    periods = ",".join(str(quest_stateless.period_number(period, REGEN, now)) for period in REGEN)
+    return f"{quest_pools.refresh()}:{periods}"
+
+
+@app.template_global()
+def fragment(name, key="", caller=None):
+    """{% call fragment("name"[, key]) %}...{% endcall %}: render once per (user, data_version, key)."""
+    return fragments.render((BUILD_ID, name, key, current_user.id, current_data_version()), caller)
 
 
 # ----------------- ROUTES -----------------
+@app.route("/assets/<fingerprint>/<path:filename>")
+def fingerprinted_asset(fingerprint, filename):
+    path = asset_manifest.path(filename)
+    if path is None:
+        abort(404)
+
+    encoding = None
+    # Ranges are served from the identity encoding so byte offsets stay meaningful
+    if asset_manifest.compressible(filename) and "Range" not in request.headers:
+        encoding = assets.negotiate(request.accept_encodings, asset_manifest.available_encodings())
+
+    if encoding:
+        response = send_file(asset_manifest.variant(filename, encoding), mimetype=assets.guess_mimetype(filename), conditional=True)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = send_file(path, conditional=True)
+    if asset_manifest.compressible(filename):
+        response.vary.add("Accept-Encoding")
+
+    if fingerprint == asset_manifest.fingerprint(filename):
+        response.headers["Cache-Control"] = assets.CACHE_FOREVER
+    else:
+        # Stale fingerprint from an old page: serve current content but don't pin it
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @app.route("/")
 def home():
     return render_template("index.html")
@@ -351,13 +1172,19 @@ def register():
             if not allowed_file(file.filename):
                 flash("Invalid image type.", "danger")
                 return render_template("register.html")
-            os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-            filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config["UPLOAD_FOLDER"], filename))
+            filename = save_profile_pic(file)
 
         new_user = User(username=username, password=password, profile_pic=filename, quote=quote)
         db.session.add(new_user)
+        db.session.flush()
+        db.session.add(UserStats(user_id=new_user.id))
+        if filename:
+            enqueue_job("thumbnails", key=f"thumbnails:{new_user.id}:{filename}", user_id=new_user.id, picture=filename)
         db.session.commit()
+        # First batch of quests is created here so a new user never waits for the scheduler
+        if not stateless_mode():
+            generate_quests_for_user(new_user.id)
+        points_changed(new_user)
         flash("Registration successful! Please login.", "success")
         return redirect(url_for("login"))
 
@@ -383,6 +1210,7 @@ def login():
 @login_required
 def logout():
     logout_user()
+    session.pop("_user", None)
     flash("Logged out successfully", "success")
     return redirect(url_for("login"))
 
@@ -390,10 +1218,12 @@ def logout():
 # ----- PROFILE -----
 @app.route("/profile")
 @login_required
+@conditional()
 def profile():
     user_rank = get_rank(current_user.points or 0)
     user_level = get_level(current_user.points or 0)
-    stats = calculate_stats(current_user)
+    # Called from a cached fragment, so the stats query only runs when that fragment is rendered
+    stats = lambda: calculate_stats(current_user)  # noqa: E731
     return render_template("dashboard/profile.html", user=current_user, rank=user_rank, level=user_level, stats=stats)
 
 
@@ -412,21 +1242,37 @@ def edit_profile():
         if new_quote:
             current_user.quote = new_quote
 
+        thumbnail_for = None
         file = request.files.get("profile_pic")
         if file and file.filename:
             if not allowed_file(file.filename):
                 flash("Invalid image type.", "danger")
                 return redirect(url_for("edit_profile"))
-            os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-            filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config["UPLOAD_FOLDER"], filename))
-            current_user.profile_pic = filename
+            filename = save_profile_pic(file)
+            if filename != current_user.profile_pic:
+                # Content-addressed keys: a picture used before may already have its variants
+                variants = uploads.existing_thumbnails(app.config["UPLOAD_FOLDER"], filename) or {}
+                current_user.profile_pic = filename
+                current_user.profile_thumb = variants.get("jpeg")
+                current_user.profile_thumb_webp = variants.get("webp")
+                if not variants:
+                    thumbnail_for = filename
 
         current_user.age = request.form.get("age", type=int)
         current_user.height_cm = request.form.get("height_cm", type=float)
         current_user.weight_kg = request.form.get("weight_kg", type=float)
         current_user.fitness_level = request.form.get("fitness_level")
 
+        if thumbnail_for:
+            # Keyed per change: a finished job keeps its key until it is purged, and switching
+            # back to an earlier picture must still queue that picture's thumbnails
+            enqueue_job(
+                "thumbnails",
+                key=f"thumbnails:{current_user.id}:{thumbnail_for}:{time.time_ns()}",
+                user_id=current_user.id,
+                picture=thumbnail_for,
+            )
+        data_changed(current_user.id)
         db.session.commit()
         flash("Profile updated successfully!", "success")
         return redirect(url_for("profile"))
@@ -436,8 +1282,10 @@ def edit_profile():
 # ----- TASKS -----
 @app.route("/tasks")
 @login_required
+@conditional()
 def tasks_page():
-    tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).all()
+    # Lazy: the query only runs if the cached task-list fragment has to be rendered
+    tasks = http_cache.Lazy(lambda: Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).all())
     return render_template("dashboard/tasks.html", tasks=tasks, user=current_user)
 
 
@@ -453,9 +1301,9 @@ def add_task():
         except ValueError:
             alarm_time = None
     if title:
-        new_task = Task(title=title, alarm_time=alarm_time, user_id=current_user.id)
-        db.session.add(new_task)
+        new_task = create_task(current_user, title, alarm_time)
         db.session.commit()
+        alarm_changed(new_task)
     return redirect(url_for("tasks_page"))
 
 
@@ -466,10 +1314,11 @@ def complete_task(task_id):
     if task.user_id != current_user.id:
         return jsonify({"success": False, "error": "Forbidden"}), 403
     if not task.completed:
-        task.completed = True
-        current_user.points = (current_user.points or 0) + 10
-        current_user.strength = (current_user.strength or 0) + 2
+        points = mark_task_completed(current_user, task)
         db.session.commit()
+        points_changed(current_user)
+        alarm_changed(task)
+        return jsonify(success=True, points=points)
     return jsonify(success=True, points=current_user.points)
 
 
@@ -480,21 +1329,58 @@ def delete_task(task_id):
     if task.user_id != current_user.id:
         flash("You cannot delete someone else's task.", "danger")
         return redirect(url_for("tasks_page"))
+    queue_event(current_user.id, "task_deleted", {"id": task.id})
+    data_changed(current_user.id)
+    completed = task.completed
     db.session.delete(task)
+    # Flush first: a user without a stats row yet gets one rebuilt from the
+    # base tables, which must no longer include this task
+    db.session.flush()
+    if completed:
+        bump_user_stats(current_user.id, completed_tasks=-1)
     db.session.commit()
+    alarm_scheduler.cancel(task_id)
     flash("Task deleted.", "success")
     return redirect(url_for("tasks_page"))
 
 
 @app.route("/tasks_list")
 @login_required
+@conditional()
+@db_engine.read_only
 def tasks_list():
-    tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).all()
-    return jsonify([{"id": t.id, "title": t.title, "completed": t.completed} for t in tasks])
+    return list_response(db.select(Task).where(Task.user_id == current_user.id), Task, serialize_task)
+
+
+@app.route("/due_alarms")
+@login_required
+@db_engine.read_only
+def due_alarms():
+    """Pending alarms in (since, now]; clients pass the returned "now" as the next since."""
+    now = datetime.now()
+    try:
+        since = datetime.fromisoformat(request.args["since"]) if request.args.get("since") else now - timedelta(seconds=app.config["ALARM_WINDOW"])
+    except ValueError:
+        return jsonify({"error": "Invalid since"}), 400
+    stmt = (
+        _pending_alarms_query()
+        .where(Task.user_id == current_user.id, Task.alarm_time > since, Task.alarm_time <= now)
+        .order_by(Task.alarm_time)
+        .limit(100)
+    )
+    rows = db.session.execute(stmt).all()
+    return jsonify(
+        {
+            "now": now.isoformat(timespec="seconds"),
+            "alarms": [{"task_id": r.id, "title": r.title, "alarm_time": r.alarm_time.isoformat()} for r in rows],
+        }
+    )
 
 
 @app.route("/latest_task")
 @login_required
+@conditional()
+@db_engine.read_only
 def latest_task():
     task = Task.query.filter_by(user_id=current_user.id, completed=False).order_by(Task.created_at.desc()).first()
     return jsonify({"id": task.id, "title": task.title} if task else None)
@@ -503,6 +1389,7 @@ def latest_task():
 # ----- ACADEMICS / STUDY LOGS -----
 @app.route("/academics")
 @login_required
+@conditional()
 def academics():
     return render_template("dashboard/academics.html", user=current_user)
 
@@ -516,26 +1403,52 @@ def add_study_log():
     except ValueError:
         duration = 0
     notes = request.form.get("notes", "")
-    started_at = request.form.get("started_at", "")
-    ended_at = request.form.get("ended_at", "")
-
-    log = StudyLog(user_id=current_user.id, subject=subject, duration=duration, notes=notes, started_at=started_at, ended_at=ended_at)
-    db.session.add(log)
-
-    earned_points = max(1, duration // 5) if duration > 0 else 1
-    current_user.points = (current_user.points or 0) + earned_points
-    current_user.wisdom = (current_user.wisdom or 0) + (earned_points // 2)
+    started_at = study_rollups.parse_timestamp(request.form.get("started_at"))
+    ended_at = study_rollups.parse_timestamp(request.form.get("ended_at"))
 
+    _log, earned_points = record_study_log(current_user, subject, duration, notes, started_at, ended_at)
+    points = current_user.points
     db.session.commit()
-    return jsonify(success=True, points=current_user.points, earned=earned_points)
+    points_changed(current_user)
+    return jsonify(success=True, points=points, earned=earned_points)
 
 
 @app.route("/get_study_logs")
 @login_required
+@conditional()
+@db_engine.read_only
 def get_study_logs():
-    logs = StudyLog.query.filter_by(user_id=current_user.id).order_by(StudyLog.created_at.desc()).all()
-    data = [{"id": l.id, "subject": l.subject, "duration": l.duration, "notes": l.notes, "created_at": l.created_at.strftime("%Y-%m-%d %H:%M")} for l in logs]
-    return jsonify(data)
+    return list_response(db.select(StudyLog).where(StudyLog.user_id == current_user.id), StudyLog, serialize_study_log)
+
+
+@app.route("/study_stats")
+@login_required
+@conditional(_utc_today)
+@db_engine.read_only
+def study_stats():
+    """Study totals per day, ISO week (starting Monday) or subject, read from the rollup tables."""
+    group = request.args.get("group", "day")
+    if group not in study_rollups.GROUPS:
+        return jsonify({"error": f"group must be one of {', '.join(study_rollups.GROUPS)}"}), 400
+    today = datetime.utcnow().date()
+    try:
+        end = study_rollups.parse_day(request.args.get("to"), today)
+        start = study_rollups.parse_day(request.args.get("from"), end - timedelta(days=study_rollups.DEFAULT_RANGE_DAYS - 1))
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD"}), 400
+    if start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+    buckets = study_rollups.summarize(db, StudyDaily, StudySubjectDaily, current_user.id, start, end, group)
+    return jsonify(
+        {
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "group": group,
+            "buckets": buckets,
+            "total_minutes": sum(b["minutes"] for b in buckets),
+            "total_sessions": sum(b["sessions"] for b in buckets),
+        }
+    )
 
 
 @app.route("/delete_study_log/<int:log_id>", methods=["DELETE"])
@@ -544,7 +1457,13 @@ def delete_study_log(log_id):
     log = StudyLog.query.get_or_404(log_id)
     if log.user_id != current_user.id:
         return jsonify({"error": "Forbidden"}), 403
+    study_rollup(log, sign=-1)
+    queue_event(current_user.id, "study_log_deleted", {"id": log.id})
+    data_changed(current_user.id)
+    duration = log.duration or 0
     db.session.delete(log)
+    db.session.flush()  # see delete_task
+    bump_user_stats(current_user.id, study_logs=-1, total_study_minutes=-duration)
     db.session.commit()
     return jsonify({"message": "Study log deleted successfully!"})
 
@@ -552,23 +1471,35 @@ def delete_study_log(log_id):
 # ----- QUESTS -----
 @app.route("/quests")
 @login_required
+@conditional(_quest_periods)
 def quests_page():
-    # Ensure quests exist/up-to-date
-    generate_quests_for_user(current_user.id)
-    all_quests = get_user_quests(current_user.id)
-    return render_template("dashboard/quests.html", quests=all_quests, user=current_user)
+    # Quests are regenerated ahead of time by the scheduler; this page only reads.
+    all_quests = http_cache.Lazy(lambda: get_user_quests(current_user.id))
+    return render_template("dashboard/quests.html", quests=all_quests, user=current_user, period_key=_quest_periods())
 
 
 @app.route("/get_user_quests")
 @login_required
+@conditional(_quest_periods)
+@db_engine.read_only
 def get_quests_api():
     period = request.args.get("period")
-    quests = get_user_quests(current_user.id, period)
-    quests_data = [
-        {"id": q.id, "title": q.title, "category": q.category, "type": q.type, "difficulty": q.difficulty, "xp": q.xp, "completed": q.completed}
-        for q in quests
-    ]
-    return jsonify(quests_data)
+    if stateless_mode():
+        # Computed quests are a handful per period; page them in memory.
+        quests = get_user_quests(current_user.id, period)
+        if "limit" in request.args or "cursor" in request.args:
+            limit = pagination.parse_limit(request.args.get("limit"))
+            try:
+                rows = pagination.page_list(quests, request.args.get("cursor"), limit)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify(pagination.page_result(rows, limit, serialize_quest))
+        return jsonify([serialize_quest(q) for q in quests])
+
+    stmt = db.select(Quest).where(Quest.user_id == current_user.id)
+    if period:
+        stmt = stmt.where(Quest.type == period)
+    return list_response(stmt, Quest, serialize_quest)
 
 
 @app.route("/complete_quest", methods=["POST"])
@@ -587,142 +1518,400 @@ def complete_quest():
 @app.route("/regenerate_quests")
 @login_required
 def regenerate_quests_api():
-    generate_quests_for_user(current_user.id)
-    return jsonify({"success": True, "message": "Quests regenerated successfully"})
+    if scheduler.running:
+        scheduler.nudge()
+        return jsonify({"success": True, "message": "Quest regeneration scheduled"})
+    # At most one sweep per minute however many users ask
+    enqueue_job("quests.regen", key=f"quests.regen:{int(time.time()) // 60}")
+    db.session.commit()
+    return jsonify({"success": True, "message": "Quest regeneration queued"})
+
+
+# ----- SEARCH -----
+@app.route("/search")
+@login_required
+@conditional()
+@db_engine.read_only
+def search_view():
+    """
+    Full-text search over the user's tasks and study logs:
+    ?q=<words>[&type=task|study_log][&limit=N]. Every word must match and
+    the last one matches as a prefix; hits come best first with <mark>ed
+    titles and snippets.
+    """
+    if not search.available(db.engine):
+        return jsonify({"error": "Search is not available on this database"}), 501
+    kinds = search.KINDS
+    if request.args.get("type"):
+        if request.args["type"] not in search.KINDS:
+            return jsonify({"error": f"type must be one of {', '.join(search.KINDS)}"}), 400
+        kinds = (request.args["type"],)
+    limit = pagination.parse_limit(request.args.get("limit"), default=search.DEFAULT_LIMIT, maximum=search.MAX_LIMIT)
+    query = request.args.get("q", "")
+    return jsonify({"query": query, "results": search.search(db.session, current_user.id, query, kinds, limit)})
+
+
+# ----- VOICE COMMANDS -----
+# Handlers run inside the caller's transaction and must not commit;
+# responses that change points include a "points" key.
+voice = voice_commands.CommandRegistry()
+
+
+@voice.command("add task {title:text}")
+def voice_add_task(title):
+    create_task(current_user, title)
+    return {"success": True, "message": f"Task '{title}' added!"}
+
+
+@voice.command("add task")
+def voice_add_task_missing():
+    return {"success": False, "message": "No task name provided."}
+
+
+@voice.command("complete task {task_id:int}")
+def voice_complete_task(task_id):
+    task = db.session.get(Task, task_id)
+    if not task or task.user_id != current_user.id:
+        return {"success": False, "message": "Task not found or not yours."}
+    if not task.completed:
+        mark_task_completed(current_user, task)
+        g.voice_tasks.append(task)  # its alarm is cancelled once the batch commits
+    return {"success": True, "message": f"Task {task_id} marked complete!", "points": current_user.points}
+
+
+@voice.command("complete task ...")
+def voice_complete_task_invalid():
+    return {"success": False, "message": "Invalid task ID."}
+
+
+@voice.command("search tasks? {query:text}")
+def voice_search_tasks(query):
+    if not search.available(db.engine):
+        return {"success": False, "message": "Search is not available."}
+    query = query.removeprefix("for ")
+    hits = search.search(db.session, current_user.id, query, kinds=("task",), limit=5)
+    if not hits:
+        return {"success": True, "message": f"No tasks match '{query}'."}
+    # Hit titles carry HTML markup; speak the plain ones, best match first
+    titles = dict(db.session.execute(db.select(Task.id, Task.title).where(Task.id.in_([h["id"] for h in hits]))).all())
+    spoken = ", ".join(titles[h["id"]] for h in hits if h["id"] in titles)
+    return {"success": True, "message": f"Tasks matching '{query}': {spoken}", "results": hits}
+
+
+@voice.command("search tasks?")
+def voice_search_tasks_missing():
+    return {"success": False, "message": "Usage: search tasks <words>"}
+
+
+@voice.command("show tasks?", contains=True)
+def voice_show_tasks():
+    tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).limit(5).all()
+    task_list = ", ".join([t.title for t in tasks]) or "You have no tasks."
+    return {"success": True, "message": f"Your latest tasks are: {task_list}"}
+
+
+@voice.command("open tasks", contains=True)
+def voice_open_tasks():
+    return {"success": True, "message": "Opening tasks page.", "redirect": url_for("tasks_page")}
+
+
+@voice.command("complete quest {quest_id:int}")
+def voice_complete_quest(quest_id):
+    success, res = complete_user_quest(current_user.id, quest_id, commit=False)
+    if not success:
+        return {"success": False, "message": res}
+    return {"success": True, "message": f"Quest {quest_id} completed!", "points": res.get("points", current_user.points)}
+
+
+@voice.command("complete quest ...")
+def voice_complete_quest_invalid():
+    return {"success": False, "message": "Invalid quest ID."}
+
+
+@voice.command("open quests", contains=True)
+def voice_open_quests():
+    return {"success": True, "message": "Opening quests page.", "redirect": url_for("quests_page")}
+
+
+@voice.command("log study {subject:word} {duration:int} ...")
+def voice_log_study(subject, duration):
+    # A spoken log describes a session that just ended
+    ended_at = datetime.utcnow()
+    _log, earned = record_study_log(current_user, subject, duration, started_at=ended_at - timedelta(minutes=duration), ended_at=ended_at)
+    return {"success": True, "message": f"Logged {duration} min of {subject} study.", "earned": earned, "points": current_user.points}
+
+
+@voice.command("log study {subject:word} ...")
+def voice_log_study_invalid(subject):
+    return {"success": False, "message": "Invalid duration."}
+
+
+@voice.command("log study ...")
+def voice_log_study_usage():
+    return {"success": False, "message": "Usage: log study <subject> <minutes>"}
+
+
+@voice.command("profile", contains=True)
+def voice_open_profile():
+    return {"success": True, "message": "Opening your profile.", "redirect": url_for("profile")}
+
+
+@voice.command("points", contains=True)
+def voice_points():
+    return {"success": True, "message": f"You currently have {current_user.points or 0} points."}
+
+
+@voice.command("hello|hi|hey", contains=True)
+def voice_greeting():
+    return {"success": True, "message": f"Hello {current_user.username}! How can I assist you today?"}
+
+
+@voice.command("how are you", contains=True)
+def voice_how_are_you():
+    return {"success": True, "message": "I'm doing great! Ready to help you with your tasks."}
+
+
+def run_voice_commands(commands):
+    """Dispatch utterances in order and commit once. Returns per-command responses."""
+    results = []
+    g.voice_tasks = []
+    for command in commands:
+        if command is not None and not isinstance(command, str):
+            results.append({"success": False, "message": "Command must be a string."})
+            continue
+        cmd = voice_commands.normalize(command)
+        if not cmd:
+            results.append({"success": False, "message": "No command provided."})
+            continue
+        handler, kwargs = voice.match(cmd)
+        if handler is None:
+            results.append({"success": False, "message": "Command not recognized."})
+            continue
+        results.append(handler(**kwargs))
+    db.session.commit()
+    for task in g.voice_tasks:
+        alarm_changed(task)
+    if any("points" in r for r in results):
+        points_changed(current_user)
+    return results
 
 
-# ----- VOICE COMMAND (simple parser) -----
 @app.route("/voice_command", methods=["POST"])
 @login_required
 def voice_command():
-    data = request.get_json() or {}
-    cmd = (data.get("command") or "").lower().strip()
-    response = {"success": False, "message": "Command not recognized."}
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    batch = data.get("commands")
+    if batch is not None and not isinstance(batch, list):
+        return jsonify({"success": False, "message": "commands must be a list."}), 400
+    if batch is not None and len(batch) > voice_commands.MAX_BATCH:
+        return jsonify({"success": False, "message": f"At most {voice_commands.MAX_BATCH} commands per request."}), 400
+    if batch is None and data.get("command") is not None and not isinstance(data.get("command"), str):
+        return jsonify({"success": False, "message": "Command must be a string."}), 400
+    if batch is None and not voice_commands.normalize(data.get("command")):
+        return jsonify({"success": False, "message": "No command provided."}), 400
 
     try:
-        if not cmd:
-            return jsonify({"success": False, "message": "No command provided."}), 400
-
-        # ========================
-        # TASK COMMANDS
-        # ========================
-        if cmd.startswith("add task"):
-            task_name = cmd.replace("add task", "", 1).strip()
-            if task_name:
-                new_task = Task(title=task_name, user_id=current_user.id)
-                db.session.add(new_task)
-                db.session.commit()
-                response = {"success": True, "message": f"Task '{task_name}' added!"}
-            else:
-                response = {"success": False, "message": "No task name provided."}
+        results = run_voice_commands(batch if batch is not None else [data.get("command")])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": f"Error processing command: {str(e)}"})
 
-        elif cmd.startswith("complete task"):
-            rest = cmd.replace("complete task", "", 1).strip()
-            try:
-                task_id = int(rest)
-                task = Task.query.get(task_id)
-                if task and task.user_id == current_user.id:
-                    task.completed = True
-                    current_user.points = (current_user.points or 0) + 10
-                    db.session.commit()
-                    response = {"success": True, "message": f"Task {task_id} marked complete!", "points": current_user.points}
-                else:
-                    response = {"success": False, "message": "Task not found or not yours."}
-            except Exception:
-                response = {"success": False, "message": "Invalid task ID."}
-
-        elif "show task" in cmd:
-            tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.created_at.desc()).limit(5).all()
-            task_list = ", ".join([t.title for t in tasks]) or "You have no tasks."
-            response = {"success": True, "message": f"Your latest tasks are: {task_list}"}
-
-        elif "open tasks" in cmd:
-            response = {"success": True, "message": "Opening tasks page.", "redirect": url_for("tasks_page")}
-
-        # ========================
-        # QUEST COMMANDS
-        # ========================
-        elif cmd.startswith("complete quest"):
-            rest = cmd.replace("complete quest", "", 1).strip()
-            try:
-                quest_id = int(rest)
-                success, res = complete_user_quest(current_user.id, quest_id)
-                if success:
-                    response = {
-                        "success": True,
-                        "message": f"Quest {quest_id} completed!",
-                        "points": res.get("points", current_user.points),
-                    }
-                else:
-                    response = {"success": False, "message": res}
-            except Exception:
-                response = {"success": False, "message": "Invalid quest ID."}
-
-        elif "open quests" in cmd:
-            response = {"success": True, "message": "Opening quests page.", "redirect": url_for("quests_page")}
-
-        # ========================
-        # STUDY COMMANDS
-        # ========================
-        elif cmd.startswith("log study"):
-            parts = cmd.split()
-            if len(parts) >= 4:
-                subject = parts[2]
-                try:
-                    duration = int(parts[3])
-                    log = StudyLog(user_id=current_user.id, subject=subject, duration=duration, started_at="", ended_at="")
-                    db.session.add(log)
-                    earned = max(1, duration // 5)
-                    current_user.points = (current_user.points or 0) + earned
-                    db.session.commit()
-                    response = {
-                        "success": True,
-                        "message": f"Logged {duration} min of {subject} study.",
-                        "earned": earned,
-                        "points": current_user.points,
-                    }
-                except ValueError:
-                    response = {"success": False, "message": "Invalid duration."}
-            else:
-                response = {"success": False, "message": "Usage: log study <subject> <minutes>"}
+    if batch is None:
+        return jsonify(results[0])
+    return jsonify({"success": all(r["success"] for r in results), "results": results, "points": current_user.points or 0})
 
-        # ========================
-        # PROFILE & POINTS
-        # ========================
-        elif "profile" in cmd or "open profile" in cmd:
-            response = {"success": True, "message": "Opening your profile.", "redirect": url_for("profile")}
 
-        elif "points" in cmd or "my points" in cmd:
-            response = {"success": True, "message": f"You currently have {current_user.points or 0} points."}
+# ----- OFFLINE SYNC -----
+# Ops run inside /sync's single transaction and must not commit; results are
+# stored as receipts, so keep them small and free of per-request snapshots.
+sync_ops = sync.SyncOps()
 
-        # ========================
-        # GREETINGS & SMALL TALK
-        # ========================
-        elif "hello" in cmd or "hi" in cmd:
-            response = {"success": True, "message": f"Hello {current_user.username}! How can I assist you today?"}
 
-        elif "how are you" in cmd:
-            response = {"success": True, "message": "I'm doing great! Ready to help you with your tasks."}
+def _int_arg(args, name):
+    try:
+        return int(args.get(name))
+    except (TypeError, ValueError):
+        return None
 
-    except Exception as e:
-        response = {"success": False, "message": f"Error processing command: {str(e)}"}
 
-    return jsonify(response)
+@sync_ops.op("add_task")
+def sync_add_task(args, refs):
+    title = str(args.get("title") or "").strip()
+    if not title:
+        return {"success": False, "error": "title is required"}
+    alarm_time = None
+    if args.get("time"):
+        try:
+            alarm_time = datetime.strptime(args["time"], "%Y-%m-%dT%H:%M")
+        except (TypeError, ValueError):
+            return {"success": False, "error": "time must be YYYY-MM-DDTHH:MM"}
+    task = create_task(current_user, title, alarm_time)
+    g.sync_tasks.append(task)
+    return {"success": True, "task_id": task.id}
+
+
+@sync_ops.op("complete_task")
+def sync_complete_task(args, refs):
+    # task_ref names the key of an earlier add_task, for tasks created while offline
+    task_id = refs.get(args["task_ref"], {}).get("task_id") if args.get("task_ref") else _int_arg(args, "task_id")
+    task = db.session.get(Task, task_id) if task_id else None
+    if not task or task.user_id != current_user.id:
+        return {"success": False, "error": "Task not found or not yours"}
+    if task.completed:
+        return {"success": True, "task_id": task.id, "earned": 0}
+    mark_task_completed(current_user, task)
+    g.sync_tasks.append(task)
+    return {"success": True, "task_id": task.id, "earned": 10}
+
+
+@sync_ops.op("add_study_log")
+def sync_add_study_log(args, refs):
+    duration = max(0, _int_arg(args, "duration") or 0)
+    log, earned = record_study_log(
+        current_user,
+        str(args.get("subject") or "Study"),
+        duration,
+        args.get("notes") or "",
+        study_rollups.parse_timestamp(args.get("started_at")),
+        study_rollups.parse_timestamp(args.get("ended_at")),
+    )
+    return {"success": True, "log_id": log.id, "earned": earned}
+
+
+@sync_ops.op("complete_quest")
+def sync_complete_quest(args, refs):
+    quest_id = _int_arg(args, "quest_id")
+    if quest_id is None:
+        return {"success": False, "error": "quest_id is required"}
+    success, res = complete_user_quest(current_user.id, quest_id, commit=False)
+    if not success:
+        return {"success": False, "error": res}
+    return {"success": True, "quest_id": res["quest_id"]}
+
+
+@app.route("/sync", methods=["POST"])
+@login_required
+def sync_batch():
+    """
+    Apply {"mutations": [{"key": ..., "op": ..., "args": {...}}, ...]} in order
+    in one transaction. Keys already applied within SYNC_KEY_TTL are answered
+    from their receipts ("replayed": true) instead of being applied again.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        items = sync_ops.validate(data.get("mutations"))
+    except sync.SyncError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
+    points_before = current_user.points or 0
+    for attempt in (1, 2):
+        g.sync_tasks = []
+        try:
+            results = sync_ops.apply(db, SyncReceipt, current_user.id, items, ttl=app.config["SYNC_KEY_TTL"])
+            if not all(r.get("replayed") for r in results):
+                enqueue_job("sync.purge", key=f"sync.purge:{int(time.time()) // 3600}")
+            db.session.commit()
+            break
+        except IntegrityError:
+            # A concurrent retry of this batch committed the same keys first; its receipts answer the next attempt
+            db.session.rollback()
+            if attempt == 2:
+                return jsonify({"success": False, "error": "Conflicting concurrent sync, retry the batch"}), 409
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"success": False, "error": f"Nothing was applied: {e}"}), 500
+
+    for task in g.sync_tasks:
+        alarm_changed(task)
+    points = current_user.points or 0
+    if points != points_before:
+        points_changed(current_user)
+    return jsonify({"success": all(r["success"] for r in results), "results": results, "points": points})
+
+
+# ----- LIVE EVENTS (SSE) -----
+@app.route("/events")
+@login_required
+def events_stream():
+    sub = event_hub.subscribe(current_user.id)
+    if sub is None:
+        return jsonify({"error": "Too many open event streams"}), 429
+    # No stream_with_context: the generator only reads its queue, so the DB session is released now.
+    response = Response(event_hub.stream(sub), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+# ----- LEADERBOARD -----
+@app.route("/leaderboard")
+@login_required
+@db_engine.read_only
+def leaderboard_api():
+    limit = pagination.parse_limit(request.args.get("limit"), default=10, maximum=100)
+    radius = pagination.parse_limit(request.args.get("radius"), default=5, maximum=50)
+    index = leaderboard_index()
+    top = index.top(limit)
+    around = index.around(current_user.id, radius)
+
+    ids = {e["user_id"] for e in top + around}
+    names = dict(db.session.execute(db.select(User.id, User.username).where(User.id.in_(ids))).all()) if ids else {}
+    for entry in top + around:
+        entry["username"] = names.get(entry["user_id"])
+        entry["rank"] = get_rank(entry["points"])
+
+    points = current_user.points or 0
+    tier = get_rank(points)
+    tiers = index.tier_counts()
+    total = len(index)
+    # Share of users in a lower tier than this user
+    below = 0
+    for name, count in tiers:
+        if name == tier:
+            break
+        below += count
+    return jsonify(
+        {
+            "total": total,
+            "top": top,
+            "around": around,
+            "me": {
+                "position": index.position(current_user.id),
+                "points": points,
+                "rank": tier,
+                "percentile": index.percentile(current_user.id),
+                "tier_percentile": round(100.0 * below / total, 2) if total else None,
+            },
+            "tiers": [{"rank": name, "users": count} for name, count in tiers],
+        }
+    )
 
 
 # ----- DEVELOPERS / VIEW OTHER PROFILES -----
-@app.route("/developers")
-@login_required
-def developers():
-    developers = [
+DEVELOPERS = [
     {"id": 1, "name": "S.Imam Basha", "role": "Coordinator", "description": "Leads project vision & integration.", "photo": "hameed.jpg"},
     {"id": 2, "name": "S.Abdul Hameed", "role": "Backend Developer", "description": "Handles database & APIs.", "photo": "member2.jpg"},
     {"id": 3, "name": "Sagabala Goutham", "role": "Frontend Developer", "description": "Designs UI/UX with neon theme.", "photo": "member3.jpg"},
     {"id": 4, "name": "M.Yashwanth Kumar", "role": "Tester", "description": "Ensures everything works smoothly.", "photo": "member4.jpg"},
 ]
+_developers_page = {}  # rendered once per process; the page has no per-user content
 
-    return render_template("dashboard/developers.html", developers=developers)
+
+@app.route("/developers")
+@login_required
+def developers():
+    tag = http_cache.etag(BUILD_ID, "developers")
+    if http_cache.not_modified(request, tag):
+        response = Response(status=304)
+    else:
+        if "html" not in _developers_page:
+            _developers_page["html"] = render_template("dashboard/developers.html", developers=DEVELOPERS)
+        response = make_response(_developers_page["html"])
+    response.set_etag(tag, weak=True)
+    response.headers["Cache-Control"] = http_cache.REVALIDATE
+    return response
 
 
 @app.route("/developer/<int:dev_id>")
@@ -734,8 +1923,474 @@ def view_developer(dev_id):
     return render_template("dashboard/profile_dev.html", user=dev_user)
 
 
+# ----- DIAGNOSTICS -----
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target for this worker process."""
+    if not app.config["METRICS"] or not metrics.allowed_scrape(
+        request.remote_addr, request.headers.get("Authorization"), app.config["METRICS_TOKEN"]
+    ):
+        abort(404)
+    users = identity_cache.stats()
+    gauges = [
+        ("user_cache_hits_total", "Login loader cache hits.", "counter", users["hits"]),
+        ("user_cache_misses_total", "Login loader cache misses.", "counter", users["misses"]),
+        ("user_cache_entries", "Users held in the login loader cache.", "gauge", users["size"]),
+        ("fragment_cache_hits_total", "Rendered fragment cache hits.", "counter", fragments.hits),
+        ("fragment_cache_misses_total", "Rendered fragment cache misses.", "counter", fragments.misses),
+        ("sse_subscribers", "Open /events streams.", "gauge", event_hub.stats()["subscribers"]),
+    ]
+    checked_out = {
+        f'bind="{bind or "default"}"': engine.pool.checkedout() for bind, engine in db.engines.items() if hasattr(engine.pool, "checkedout")
+    }
+    gauges.append(("db_pool_checked_out", "Pooled connections currently in use.", "gauge", checked_out))
+    queue = job_queue.stats()
+    gauges.append(("jobs", "Background jobs by status.", "gauge", {f'status="{k}"': v for k, v in queue["depth"].items()}))
+    gauges.append(("jobs_lag_seconds", "Age of the oldest due job still queued.", "gauge", queue["lag_seconds"]))
+    return Response(request_metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/cache_stats")
+@login_required
+def cache_stats():
+    """Hit/miss counters of this worker's in-process caches."""
+    quests = stateless_quests.cache_info()
+    return jsonify(
+        {
+            "user_loader": identity_cache.stats(),
+            "stateless_quests": {"hits": quests.hits, "misses": quests.misses, "size": quests.currsize},
+            "events": event_hub.stats(),
+            "fragments": fragments.stats(),
+            "job_worker": {"running": job_worker.running, "processed": job_worker.processed},
+        }
+    )
+
+
+# ----------------- CLI -----------------
+@app.cli.group("quests")
+def quests_cli():
+    """Quest maintenance commands."""
+
+
+@quests_cli.command("regen")
+@click.option("--batch-size", default=quest_scheduler.DEFAULT_BATCH_SIZE, show_default=True, help="Users per batch/commit.")
+def quests_regen_command(batch_size):
+    """Regenerate quests for every user whose period has expired."""
+    result = regenerate_expired_quests(batch_size=batch_size)
+    if not result["leased"]:
+        click.echo("Another process is sweeping right now; nothing done")
+        return
+    click.echo(
+        f"Regenerated quests for {result['users']} users in {result['batches']} batches "
+        f"({result['rows']} rows, {result['seconds']}s, {result['rows_per_sec']} rows/sec)"
+    )
+
+
+@quests_cli.command("pools")
+def quests_pools_command():
+    """Validate the quest pools file and show what each period draws from."""
+    for period, pool in quest_pools.describe().items():
+        categories = ", ".join(f"{name} ({n})" for name, n in pool["categories"].items())
+        click.echo(f"{period}: select={pool['select']} count={pool['count']}: {categories}")
+    click.echo(f"Loaded {quest_pools.path} (version {quest_pools.version})")
+
+
+@app.cli.group("ranks")
+def ranks_cli():
+    """Rank/level maintenance commands."""
+
+
+@ranks_cli.command("recompute")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows per bulk UPDATE.")
+def ranks_recompute_command(batch_size):
+    """Recompute every user's rank and level from their points."""
+    result = recompute_ranks(batch_size=batch_size)
+    click.echo(f"Checked {result['users']} users, updated {result['changed']}")
+
+
+@app.cli.group("uploads")
+def uploads_cli():
+    """Upload maintenance commands."""
+
+
+@uploads_cli.command("thumbnails")
+def uploads_thumbnails_command():
+    """Generate missing thumbnails for existing profile pictures."""
+    rows = db.session.execute(
+        db.select(User.id, User.profile_pic).where(User.profile_pic.is_not(None), User.profile_thumb.is_(None))
+    ).all()
+    for user_id, key in rows:
+        _store_thumbnails(user_id, key)
+    click.echo(f"Processed {len(rows)} profile pictures")
+
+
+@app.cli.group("assets")
+def assets_cli():
+    """Static asset commands."""
+
+
+@assets_cli.command("build")
+def assets_build_command():
+    """Fingerprint static files and precompress text assets ahead of the first request."""
+    manifest = asset_manifest.build()
+    for filename, fp in sorted(manifest.items()):
+        click.echo(f"{fp}  {filename}")
+
+
+@app.cli.group("stats")
+def stats_cli():
+    """User stats maintenance commands."""
+
+
+@stats_cli.command("verify")
+@click.option("--fix", is_flag=True, help="Rewrite drifted rows from the base tables.")
+def stats_verify_command(fix):
+    """Recompute user_stats from the base tables and report drift."""
+    user_ids = db.session.execute(db.select(User.id)).scalars().all()
+    expected = recompute_user_stats()
+    drift = user_stats.verify(db, UserStats, expected, user_ids)
+    for user_id, key, have, want in drift:
+        click.echo(f"user {user_id}: {key} stored={have} expected={want}")
+    if fix:
+        user_stats.store_all(db, UserStats, expected, sorted({d[0] for d in drift}))
+        db.session.commit()
+    click.echo(f"{len(drift)} drifted counters across {len({d[0] for d in drift})} users" + (" (fixed)" if fix and drift else ""))
+
+
+@stats_cli.command("rebuild")
+def stats_rebuild_command():
+    """Rewrite every user's stats row from the base tables."""
+    expected = recompute_user_stats()
+    user_ids = db.session.execute(db.select(User.id)).scalars().all()
+    user_stats.store_all(db, UserStats, expected, user_ids)
+    db.session.commit()
+    click.echo(f"Rebuilt stats for {len(user_ids)} users")
+
+
+@app.cli.group("points")
+def points_cli():
+    """Points ledger maintenance commands (run periodically from cron)."""
+
+
+@points_cli.command("reconcile")
+@click.option("--fix", is_flag=True, help="Rewrite drifted User.points from the ledger.")
+def points_reconcile_command(fix):
+    """Check every cached User.points against the ledger sum."""
+    drift = points_ledger.reconcile(db, User, PointsLedger, fix=fix)
+    for user_id, cached, ledger in drift:
+        click.echo(f"user {user_id}: points={cached} ledger={ledger}")
+    if fix:
+        db.session.commit()
+    click.echo(f"{len(drift)} users drifted" + (" (fixed)" if fix and drift else ""))
+
+
+@points_cli.command("compact")
+@click.option("--older-than-days", type=int, default=points_ledger.DEFAULT_COMPACT_AFTER_DAYS, show_default=True)
+def points_compact_command(older_than_days):
+    """Fold old ledger rows into one row per user."""
+    users, removed = points_ledger.compact(db, PointsLedger, older_than_days=older_than_days)
+    db.session.commit()
+    click.echo(f"Compacted {removed} ledger rows across {users} users")
+
+
+@app.cli.group("study")
+def study_cli():
+    """Study log maintenance commands."""
+
+
+@study_cli.command("rebuild-rollups")
+def study_rebuild_rollups_command():
+    """Rebuild the daily and per-subject study rollups from study_log."""
+    rebuild_study_rollups()
+    db.session.commit()
+    days = db.session.execute(db.select(db.func.count()).select_from(StudyDaily)).scalar()
+    click.echo(f"Rebuilt study rollups ({days} user-days)")
+
+
+@app.cli.group("db")
+def db_cli():
+    """Schema migration commands."""
+
+
+@db_cli.command("upgrade")
+@click.option("--target", type=int, default=None, help="Stop after this schema version.")
+def db_upgrade_command(target):
+    """Create missing tables and apply pending migrations."""
+    applied = migrations.upgrade(db, target=target)
+    for version, description in applied:
+        click.echo(f"Applied {version}: {description}")
+    click.echo(f"Schema at version {migrations.current_version(db)}")
+
+
+@db_cli.command("settings")
+def db_settings_command():
+    """Show the pool and connect-time pragmas each engine actually runs with."""
+    for bind, engine in db.engines.items():
+        click.echo(f"[{bind or 'default'}] {engine.url.render_as_string(hide_password=True)} pool={engine.pool.status()}")
+        for name, value in db_engine.sqlite_settings(engine).items():
+            click.echo(f"  {name} = {value}")
+
+
+@db_cli.command("status")
+def db_status_command():
+    """Show the current schema version and pending migrations."""
+    click.echo(f"Schema at version {migrations.current_version(db)}")
+    for version, description, _fn in migrations.pending(db):
+        click.echo(f"Pending {version}: {description}")
+
+
+@app.cli.group("jobs")
+def jobs_cli():
+    """Background job queue commands."""
+
+
+@jobs_cli.command("work")
+@click.option("--concurrency", default=jobs.DEFAULT_CONCURRENCY, show_default=True, help="Worker threads in this process.")
+@click.option("--burst", is_flag=True, help="Run every due job, then exit (e.g. from cron).")
+def jobs_work_command(concurrency, burst):
+    """Run the job queue in the foreground; start as many of these processes as needed."""
+    worker = jobs.JobWorker(app, job_queue, concurrency=concurrency, poll_interval=app.config["JOBS_POLL_INTERVAL"])
+    if burst:
+        processed = worker.drain()
+        click.echo(f"Ran {sum(processed.values())} jobs: {processed['done']} done, {processed['queued']} to retry, {processed['failed']} failed")
+        return
+    click.echo(f"Working the job queue with {worker.concurrency} threads as {worker.worker_id} (Ctrl+C to stop)")
+    worker.start()
+    try:
+        worker.join()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+@jobs_cli.command("enqueue")
+@click.argument("name")
+@click.option("--payload", default="{}", show_default=True, help="JSON keyword arguments for the handler.")
+@click.option("--key", default=None, help="Idempotency key; an existing job with this key is reused.")
+@click.option("--delay", default=0, show_default=True, help="Seconds before the job becomes due.")
+def jobs_enqueue_command(name, payload, key, delay):
+    """Queue a job by handler name."""
+    if name not in job_queue.handlers:
+        raise click.BadParameter(f"choose from {', '.join(sorted(job_queue.handlers))}", param_hint="NAME")
+    job_id = job_queue.enqueue(name, json.loads(payload), key=key, delay=delay)
+    db.session.commit()
+    click.echo(f"Queued job {job_id} ({name})")
+
+
+@jobs_cli.command("stats")
+def jobs_stats_command():
+    """Show queue depth, lag and wait/run latency."""
+    stats = job_queue.stats()
+    click.echo("depth: " + ", ".join(f"{status}={n}" for status, n in stats["depth"].items()))
+    for name, n in sorted(stats["queued_by_name"].items()):
+        click.echo(f"  queued {name}: {n}")
+    click.echo(f"lag: {stats['lag_seconds']}s")
+    for label in ("wait_ms", "run_ms"):
+        click.echo(f"{label} over the last {stats['sampled']} done: " + ", ".join(f"{k}={v}" for k, v in stats[label].items()))
+
+
+@jobs_cli.command("retry")
+@click.argument("job_ids", nargs=-1, type=int)
+def jobs_retry_command(job_ids):
+    """Requeue failed jobs (all of them unless JOB_IDS are given)."""
+    n = job_queue.retry(list(job_ids) or None)
+    db.session.commit()
+    click.echo(f"Requeued {n} failed jobs")
+
+
+@jobs_cli.command("purge")
+@click.option("--older-than-days", type=int, default=jobs.DEFAULT_KEEP_DAYS, show_default=True)
+@click.option("--failed", is_flag=True, help="Also delete failed jobs.")
+def jobs_purge_command(older_than_days, failed):
+    """Delete old finished jobs, releasing their idempotency keys."""
+    statuses = (jobs.DONE, jobs.FAILED) if failed else (jobs.DONE,)
+    n = job_queue.purge(older_than_days, statuses)
+    db.session.commit()
+    click.echo(f"Deleted {n} jobs")
+
+
+@app.cli.group("search")
+def search_cli():
+    """Full-text search index commands."""
+
+
+@search_cli.command("rebuild")
+def search_rebuild_command():
+    """Re-index every task and study log (triggers keep the index in sync otherwise)."""
+    migrations.upgrade(db)
+    with db.engine.begin() as conn:
+        search.rebuild(conn)
+    click.echo("Rebuilt the search index")
+
+
+@search_cli.command("optimize")
+def search_optimize_command():
+    """Merge the index segments after bulk loads or heavy churn (e.g. nightly)."""
+    with db.engine.begin() as conn:
+        search.optimize(conn)
+    click.echo("Optimized the search index")
+
+
+@app.cli.group("seed")
+def seed_cli():
+    """Synthetic data for scale testing (never run against production)."""
+
+
+@seed_cli.command("run")
+@click.option("--users", default=1000, show_default=True, help="Users to create (e.g. 1000000).")
+@click.option("--tasks", default=50000, show_default=True, help="Tasks spread over the new users (e.g. 50000000).")
+@click.option("--study-logs", default=20000, show_default=True, help="Study logs spread over the new users.")
+@click.option("--skew", default=seed.DEFAULT_SKEW, show_default=True, help="Pareto alpha of per-user activity; lower is more skewed.")
+@click.option("--seed", "rng_seed", type=int, default=None, help="Random seed for a reproducible dataset.")
+@click.option("--batch", default=seed.DEFAULT_BATCH, show_default=True, help="Rows per INSERT batch/commit.")
+@click.option("--no-quests", is_flag=True, help="Skip the per-user quest sets.")
+def seed_run_command(users, tasks, study_logs, skew, rng_seed, batch, no_quests):
+    """Append seeded users (password "seed-password") with skewed task, study and quest history."""
+    migrations.upgrade(db)
+    request_metrics.slow_query_seconds = None  # every bulk batch would be logged
+    seeder = seed.Seeder(
+        db,
+        {"User": User, "Task": Task, "StudyLog": StudyLog, "Quest": Quest, "PointsLedger": PointsLedger},
+        quest_pools.choose_now,
+        generate_password_hash(seed.SEED_PASSWORD),
+        lambda p: (get_rank(p), get_level(p)),
+        skew=skew,
+        rng_seed=rng_seed,
+        batch=batch,
+        echo=click.echo,
+    )
+    with db.engine.begin() as conn:
+        search.drop_triggers(conn)  # one rebuild at the end is far cheaper than a trigger per row
+    try:
+        result = seeder.run(users, tasks, study_logs, quests=not no_quests)
+    finally:
+        with db.engine.begin() as conn:
+            search.create(conn)
+    # user_stats rows are built lazily on first use; the study rollups are not
+    rebuild_study_rollups()
+    db.session.commit()
+    identity_cache.clear()
+    click.echo(
+        f"Seeded {result['users']} users, {result['tasks']} tasks, {result['study_logs']} study logs and "
+        f"{result['quests']} quests in {result['seconds']}s ({result['rows_per_sec']} rows/sec)"
+    )
+
+
+@app.cli.group("plans")
+def plans_cli():
+    """Query plan regression checks (run against a seeded database)."""
+
+
+def _plan_probe_user():
+    """The user with the most tasks: the worst case for every per-user query."""
+    return db.session.execute(
+        db.select(Task.user_id).group_by(Task.user_id).order_by(db.func.count().desc()).limit(1)
+    ).scalar() or db.session.execute(db.select(db.func.min(User.id))).scalar()
+
+
+def _plan_probes(client):
+    """Drive the read routes (including a second keyset page) and the delete routes as the logged-in user."""
+    for path in (
+        "/profile",
+        "/tasks",
+        "/academics",
+        "/quests",
+        "/get_user_quests",
+        "/tasks_list",
+        "/latest_task",
+        "/due_alarms",
+        "/get_study_logs",
+        "/study_stats?group=day",
+        "/study_stats?group=week",
+        "/study_stats?group=subject",
+        "/leaderboard",
+        "/search?q=pl",
+        "/search?q=math&type=study_log",
+        "/regenerate_quests",
+    ):
+        client.get(path)
+    for path in ("/tasks_list", "/get_study_logs"):
+        page = client.get(f"{path}?limit=20").get_json() or {}
+        if page.get("next_cursor"):
+            client.get(f"{path}?limit=20&cursor={page['next_cursor']}")
+    client.post("/add_task", data={"title": "plan check"})
+    task = client.get("/latest_task").get_json()
+    if task:
+        client.post(f"/complete_task/{task['id']}")
+        client.post(f"/delete_task/{task['id']}")
+    client.post("/add_study_log", data={"subject": "Math", "duration": "5"})
+    batch = [{"key": f"plans-{os.urandom(4).hex()}", "op": "add_study_log", "args": {"duration": 5}}]
+    client.post("/sync", json={"mutations": batch})
+    client.post("/sync", json={"mutations": batch})
+    logs = (client.get("/get_study_logs?limit=1").get_json() or {}).get("items") or []
+    if logs:
+        client.delete(f"/delete_study_log/{logs[0]['id']}")
+
+
+@plans_cli.command("check")
+@click.option("--analyze", is_flag=True, help="Run ANALYZE first so the planner has table statistics.")
+@click.option("--verbose", "-v", is_flag=True, help="Print every statement's full plan, not only the problems.")
+def plans_check_command(analyze, verbose):
+    """
+    EXPLAIN QUERY PLAN every statement the route handlers and quest
+    functions issue (driving them through the test client, which writes a
+    few rows), and exit 1 if a hot table is fully scanned.
+    """
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("The plan checker reads SQLite's EXPLAIN QUERY PLAN output")
+    migrations.upgrade(db)
+    app.config["QUEST_SCHEDULER"] = ""  # the probes run the sweep themselves; no thread racing the recorder
+    if analyze:
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+    user_id = _plan_probe_user()
+
+    with query_plans.PlanRecorder(db.engines.values(), context=lambda: request.endpoint if has_request_context() else None) as recorder:
+        benchmark.journey(benchmark.TestClientDriver(app), f"plans-{os.urandom(4).hex()}", benchmark.Recorder())
+        if user_id is not None:
+            client = app.test_client()
+            with client.session_transaction() as s:
+                s["_user_id"] = str(user_id)
+                s["_fresh"] = True
+            _plan_probes(client)
+            recorder.label = "generate_quests_for_users"
+            generate_quests_for_users([user_id])
+        recorder.label = "regenerate_expired_quests"
+        regenerate_expired_quests()
+        recorder.label = None
+
+    results = query_plans.check(db.session.connection(), recorder)
+    db.session.rollback()
+    failures = warnings = 0
+    for r in results:
+        failures += bool(r["failures"])
+        warnings += bool(r["warnings"])
+        status = "FAIL" if r["failures"] else "WARN" if r["warnings"] else "ok"
+        if verbose or status != "ok":
+            click.echo(f"{status} [{r['label']}] {r['sql']}")
+            for detail in r["plan"] if verbose else r["failures"] + r["warnings"]:
+                click.echo(f"    {detail}")
+    click.echo(f"Checked {len(results)} statements: {failures} full scans of hot tables, {warnings} with warnings")
+    if failures:
+        raise SystemExit(1)
+
+
 # ----------------- STARTUP -----------------
+@app.before_request
+def _start_background_threads():
+    # Started by a process's first request rather than at import, so CLI commands
+    # (e.g. `flask db upgrade`) never run against the schema they are changing
+    if not leaderboard_loader.running:
+        leaderboard_loader.start()
+    if app.config["QUEST_SCHEDULER"] == "inprocess" and not scheduler.running:
+        scheduler.start()
+    if app.config["ALARM_SCHEDULER"] == "inprocess" and not alarm_scheduler.running:
+        alarm_scheduler.start()
+    # Also picks up jobs enqueued by CLI commands or left pending by a restart
+    if app.config["JOBS_WORKER"] == "inprocess" and not job_worker.running:
+        job_worker.start()
+
+
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        migrations.upgrade(db)
     app.run(debug=True)
@@ -0,0 +1,167 @@
+# backend/alarms.py
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+# ---------- CONFIG ----------
+DEFAULT_WINDOW = 3600  # seconds of upcoming alarms held in memory
+DEFAULT_REFRESH = 15  # seconds between reloads that pick up alarms set through other processes
+MAX_SLEEP = 60  # upper bound on one wait so clock changes are picked up
+
+
+class AlarmScheduler:
+    """
+    Min-heap of upcoming task alarms. Only alarms inside the next `window`
+    seconds are loaded (via `load_window(start, end)`, which should return
+    (alarm_time, task_id, user_id, title) rows from the pending-alarm
+    index); the window is reloaded when it runs out. `fire(user_id, alarm)`
+    is called from the scheduler thread when an alarm is due.
+
+    Changes made in this process are applied incrementally with
+    schedule()/cancel(); heap entries that no longer match the task's
+    current alarm are skipped when popped instead of being removed eagerly.
+    Changes made through other processes (each web worker runs its own
+    scheduler for its own /events streams) are picked up by reloading
+    every `refresh` seconds from the time of the previous load, skipping
+    alarms already fired here, so an alarm set elsewhere fires at most
+    `refresh` seconds late.
+    """
+
+    def __init__(self, app, load_window, fire, window=DEFAULT_WINDOW, refresh=DEFAULT_REFRESH, clock=datetime.now):
+        self.app = app
+        self.load_window = load_window
+        self.fire = fire
+        self.window = timedelta(seconds=window)
+        self.refresh = timedelta(seconds=refresh)
+        self.clock = clock
+        self.fired = 0
+        self._heap = []
+        self._current = {}  # task_id -> alarm_time currently scheduled
+        self._window_end = None
+        self._loaded_at = None
+        self._popped = {}  # task_id -> alarm_time popped since the last load, so a reload doesn't repeat it
+        self._during_load = None  # local changes made while reload() reads the table
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self):
+        return len(self._current)
+
+    # ---------- LIFECYCLE ----------
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="alarm-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ---------- INCREMENTAL UPDATES ----------
+    def schedule(self, task_id, user_id, alarm_time, title):
+        """(Re)schedule a task's alarm if it falls inside the loaded window."""
+        with self._lock:
+            if self._during_load is not None:
+                self._during_load[task_id] = (user_id, alarm_time, title)
+            self._current.pop(task_id, None)
+            if alarm_time is None or self._window_end is None or alarm_time > self._window_end:
+                return
+            self._current[task_id] = alarm_time
+            heapq.heappush(self._heap, (alarm_time, task_id, user_id, title))
+        self._wake.set()
+
+    def cancel(self, task_id):
+        with self._lock:
+            if self._during_load is not None:
+                self._during_load[task_id] = None
+            self._current.pop(task_id, None)
+
+    # ---------- LOOP ----------
+    def reload(self, now=None):
+        """
+        Replace the heap with the alarms from the previous load's time (or
+        `now` on the first load) up to now + window, minus those already
+        popped, then replay the local changes made while the rows were read.
+        """
+        now = now or self.clock()
+        end = now + self.window
+        with self._lock:
+            self._during_load = {}
+            start = self._loaded_at or now
+        try:
+            rows = self.load_window(start, end)
+        except BaseException:
+            with self._lock:
+                self._during_load = None
+            raise
+        with self._lock:
+            changes, self._during_load = self._during_load, None
+            self._heap = [
+                (alarm_time, task_id, user_id, title)
+                for alarm_time, task_id, user_id, title in rows
+                if self._popped.get(task_id) != alarm_time
+            ]
+            # The next load starts at `now`; older pops can't come back
+            self._popped = {task_id: t for task_id, t in self._popped.items() if t >= now}
+            heapq.heapify(self._heap)
+            self._current = {task_id: alarm_time for alarm_time, task_id, _user_id, _title in self._heap}
+            self._window_end = end
+            self._loaded_at = now
+        for task_id, change in changes.items():
+            if change is None:
+                self.cancel(task_id)
+            else:
+                user_id, alarm_time, title = change
+                self.schedule(task_id, user_id, alarm_time, title)
+
+    def pop_due(self, now=None):
+        """Remove and return alarms due at `now`, skipping cancelled or rescheduled entries."""
+        now = now or self.clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                alarm_time, task_id, user_id, title = heapq.heappop(self._heap)
+                if self._current.get(task_id) != alarm_time:
+                    continue
+                del self._current[task_id]
+                self._popped[task_id] = alarm_time
+                due.append((user_id, {"task_id": task_id, "title": title, "alarm_time": alarm_time.isoformat()}))
+        return due
+
+    def _next_wait(self, now):
+        with self._lock:
+            until = min(self._window_end, self._loaded_at + self.refresh)
+            if self._heap and self._heap[0][0] < until:
+                until = self._heap[0][0]
+        return max(0.0, min((until - now).total_seconds(), MAX_SLEEP))
+
+    def tick(self, now=None):
+        """Reload if the window ran out or is due a refresh, fire what is due, and return the seconds to sleep."""
+        now = now or self.clock()
+        if self._window_end is None or now >= min(self._window_end, self._loaded_at + self.refresh):
+            with self.app.app_context():
+                self.reload(now)
+        for user_id, alarm in self.pop_due(now):
+            self.fire(user_id, alarm)
+            self.fired += 1
+        return self._next_wait(now)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.tick()
+            except Exception as e:
+                self.app.logger.exception("Alarm scheduler failed: %s", e)
+                wait = MAX_SLEEP
+            self._wake.wait(wait)
+            self._wake.clear()
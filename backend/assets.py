@@ -0,0 +1,112 @@
+# backend/assets.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+try:  # optional: br variants are only produced when the brotli package is installed
+    import brotli
+except ImportError:
+    brotli = None
+
+# ---------- CONFIG ----------
+FINGERPRINT_LENGTH = 12
+CACHE_FOREVER = "public, max-age=31536000, immutable"
+COMPRESSIBLE = {".js", ".css", ".svg", ".json", ".txt", ".html", ".map"}
+ENCODINGS = ("br", "gzip")  # preference order
+
+
+class AssetManifest:
+    """
+    Build-free asset manifest: fingerprints files under `static_folder` by
+    content hash (recomputed only when size/mtime change) and keeps
+    precompressed gzip/brotli variants in `cache_folder`.
+    """
+
+    def __init__(self, static_folder, cache_folder):
+        self.static_folder = static_folder
+        self.cache_folder = cache_folder
+        self._entries = {}  # filename -> (mtime, size, fingerprint)
+        self._lock = threading.Lock()
+
+    def path(self, filename):
+        """Absolute path for `filename`, or None if it escapes the static folder or is missing."""
+        root = os.path.realpath(self.static_folder)
+        path = os.path.realpath(os.path.join(root, filename))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def fingerprint(self, filename):
+        path = self.path(filename)
+        if path is None:
+            return None
+        st = os.stat(path)
+        entry = self._entries.get(filename)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(chunk)
+        fp = digest.hexdigest()[:FINGERPRINT_LENGTH]
+        with self._lock:
+            self._entries[filename] = (st.st_mtime_ns, st.st_size, fp)
+        return fp
+
+    def compressible(self, filename):
+        return os.path.splitext(filename)[1].lower() in COMPRESSIBLE
+
+    def available_encodings(self):
+        return [e for e in ENCODINGS if e != "br" or brotli is not None]
+
+    def variant(self, filename, encoding):
+        """Path to the `encoding` variant of `filename`, compressing it on first use."""
+        fp = self.fingerprint(filename)
+        if fp is None:
+            return None
+        ext = "br" if encoding == "br" else "gz"
+        name = f"{filename.replace('/', '__')}.{fp}.{ext}"
+        target = os.path.join(self.cache_folder, name)
+        if os.path.exists(target):
+            return target
+
+        with open(self.path(filename), "rb") as f:
+            data = f.read()
+        if encoding == "br":
+            data = brotli.compress(data, quality=11)
+        else:
+            data = gzip.compress(data, compresslevel=9, mtime=0)
+        os.makedirs(self.cache_folder, exist_ok=True)
+        tmp = f"{target}.{threading.get_ident()}.part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+        return target
+
+    def build(self, exclude=("uploads",)):
+        """Fingerprint every static file and precompress the compressible ones. Returns {filename: fingerprint}."""
+        manifest = {}
+        for dirpath, dirs, files in os.walk(self.static_folder):
+            if dirpath == self.static_folder:
+                dirs[:] = [d for d in dirs if d not in exclude]
+            for name in files:
+                filename = os.path.relpath(os.path.join(dirpath, name), self.static_folder).replace(os.sep, "/")
+                manifest[filename] = self.fingerprint(filename)
+                if self.compressible(filename):
+                    for encoding in self.available_encodings():
+                        self.variant(filename, encoding)
+        return manifest
+
+
+def guess_mimetype(filename):
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def negotiate(accept_encodings, available):
+    """First encoding from `available` the client accepts, or None."""
+    for encoding in available:
+        if accept_encodings[encoding]:
+            return encoding
+    return None
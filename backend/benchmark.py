@@ -0,0 +1,258 @@
+# backend/benchmark.py
+#
+# Load benchmark for the core user journey. In-process (default) it imports
+# the real app against a throwaway SQLite database and drives it through the
+# Flask test client; with --base-url it drives a running server over HTTP.
+#
+#   python -m backend.benchmark --journeys 200 --concurrency 8 --save bench/baseline.json
+#   python -m backend.benchmark --journeys 200 --concurrency 8 --compare bench/baseline.json
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+import click
+
+# ---------- CONFIG ----------
+PERCENTILES = (50, 95, 99)
+DEFAULT_THRESHOLD = 0.25  # fail when a route's p95 is 25% slower than the baseline...
+NOISE_FLOOR_MS = 2.0  # ...and at least this many ms slower, so tiny routes don't flap
+COMPARE_STAT = "p95_ms"
+
+
+# ---------- DRIVERS ----------
+class TestClientDriver:
+    """One virtual user against the in-process app (own cookie jar)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client.open(path, method=method, data=form, json=json_body)
+        body = response.get_json(silent=True)
+        response.close()
+        return response.status_code, body
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Measure the POST itself, like the test client does, not the page it redirects to
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpDriver:
+    """One virtual user against a running server."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect)
+
+    def request(self, method, path, form=None, json_body=None):
+        data, headers = None, {}
+        if json_body is not None:
+            data, headers = json.dumps(json_body).encode(), {"Content-Type": "application/json"}
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, raw, ctype = response.status, response.read(), response.headers.get("Content-Type", "")
+        except urllib.error.HTTPError as e:
+            status, raw, ctype = e.code, e.read(), e.headers.get("Content-Type", "")
+        body = None
+        if "json" in ctype:
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                pass
+        return status, body
+
+
+# ---------- JOURNEY ----------
+class Recorder:
+    """Collects (route -> latencies) and error counts from concurrent journeys."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, driver, route, method, path, form=None, json_body=None):
+        started = time.perf_counter()
+        status, body = driver.request(method, path, form=form, json_body=json_body)
+        elapsed = time.perf_counter() - started
+        ok = status < 400 and not (isinstance(body, dict) and body.get("success") is False)
+        with self._lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+        return body
+
+
+def journey(driver, username, rec):
+    """register -> login -> add_task -> complete_task -> quests -> complete_quest -> add_study_log -> voice_command"""
+    credentials = {"username": username, "password": "bench-password"}
+    rec.call(driver, "register", "POST", "/register", form=credentials)
+    rec.call(driver, "login", "POST", "/login", form=credentials)
+    rec.call(driver, "add_task", "POST", "/add_task", form={"title": "benchmark task"})
+    task = rec.call(driver, "latest_task", "GET", "/latest_task")
+    if task:
+        rec.call(driver, "complete_task", "POST", f"/complete_task/{task['id']}")
+    rec.call(driver, "quests", "GET", "/quests")
+    quests = rec.call(driver, "get_user_quests", "GET", "/get_user_quests") or []
+    open_quest = next((q for q in quests if not q.get("completed")), None)
+    if open_quest:
+        rec.call(driver, "complete_quest", "POST", "/complete_quest", json_body={"quest_id": open_quest["id"]})
+    rec.call(driver, "add_study_log", "POST", "/add_study_log", form={"subject": "Math", "duration": "25", "notes": "bench"})
+    rec.call(driver, "voice_command", "POST", "/voice_command", json_body={"command": "log study physics 10"})
+
+
+def run(make_driver, journeys, concurrency, rec=None):
+    """Run `journeys` journeys on `concurrency` threads; returns (Recorder, wall seconds)."""
+    rec = rec or Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    counter = iter(range(journeys))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                return
+            journey(make_driver(), f"bench-{run_id}-{n}", rec)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return rec, time.perf_counter() - started
+
+
+# ---------- REPORTING ----------
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(rec, wall_seconds, journeys, concurrency, mode):
+    routes = {}
+    for route, values in rec.samples.items():
+        values = sorted(values)
+        stats = {"count": len(values), "errors": rec.errors.get(route, 0), "mean_ms": round(sum(values) / len(values) * 1000, 3)}
+        for p in PERCENTILES:
+            stats[f"p{p}_ms"] = round(percentile(values, p) * 1000, 3)
+        routes[route] = stats
+    total = sum(r["count"] for r in routes.values())
+    return {
+        "meta": {
+            "mode": mode,
+            "journeys": journeys,
+            "concurrency": concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "requests": total,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "throughput_rps": round(total / wall_seconds, 1) if wall_seconds else 0.0,
+        "journeys_per_sec": round(journeys / wall_seconds, 2) if wall_seconds else 0.0,
+        "routes": routes,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, noise_floor_ms=NOISE_FLOOR_MS, stat=COMPARE_STAT):
+    """Routes whose `stat` regressed past the threshold: [(route, baseline_ms, current_ms, ratio)]."""
+    regressions = []
+    for route, base in baseline.get("routes", {}).items():
+        now = current["routes"].get(route)
+        if now is None or not base.get(stat):
+            continue
+        before, after = base[stat], now[stat]
+        if after > before * (1 + threshold) and after - before >= noise_floor_ms:
+            regressions.append((route, before, after, round(after / before, 2)))
+    return regressions
+
+
+def format_report(summary):
+    lines = [f"{'route':<18}{'count':>7}{'err':>5}{'mean':>10}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES)]
+    for route, r in summary["routes"].items():
+        lines.append(
+            f"{route:<18}{r['count']:>7}{r['errors']:>5}{r['mean_ms']:>10.2f}" + "".join(f"{r[f'p{p}_ms']:>10.2f}" for p in PERCENTILES)
+        )
+    lines.append(
+        f"{summary['requests']} requests in {summary['wall_seconds']}s: {summary['throughput_rps']} req/s, "
+        f"{summary['journeys_per_sec']} journeys/s, {summary['errors']} errors (latencies in ms)"
+    )
+    return "\n".join(lines)
+
+
+# ---------- IN-PROCESS APP ----------
+def in_process_app(workdir):
+    """Import the real app bound to a fresh SQLite file in `workdir` (must run before anything imports app)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["QUEST_SCHEDULER"] = ""
+    os.environ["ALARM_SCHEDULER"] = ""
+    import app as app_module  # noqa: E402  (configured from the environment at import time)
+
+    with app_module.app.app_context():
+        app_module.migrations.upgrade(app_module.db)
+    return app_module.app
+
+
+# ---------- CLI ----------
+@click.command()
+@click.option("--journeys", default=50, show_default=True, help="Measured journeys (one new user each).")
+@click.option("--concurrency", default=4, show_default=True, help="Virtual users running at once.")
+@click.option("--warmup", default=2, show_default=True, help="Unmeasured journeys run first.")
+@click.option("--base-url", default=None, help="Benchmark a running server instead of the in-process app.")
+@click.option("--save", "save_path", type=click.Path(dir_okay=False), help="Write the results as a JSON baseline.")
+@click.option("--compare", "compare_path", type=click.Path(exists=True, dir_okay=False), help="Fail on regressions against this baseline.")
+@click.option("--threshold", default=DEFAULT_THRESHOLD, show_default=True, help="Allowed p95 slowdown as a fraction.")
+def main(journeys, concurrency, warmup, base_url, save_path, compare_path, threshold):
+    """Benchmark the register -> ... -> voice_command journey and report per-route percentiles."""
+    with tempfile.TemporaryDirectory(prefix="sam-bench-") as workdir:
+        if base_url:
+            make_driver, mode = (lambda: HttpDriver(base_url)), f"http {base_url}"
+        else:
+            app = in_process_app(workdir)
+            make_driver, mode = (lambda: TestClientDriver(app)), "in-process"
+
+        if warmup:
+            run(make_driver, warmup, min(concurrency, warmup))
+        rec, wall = run(make_driver, journeys, concurrency)
+        summary = summarize(rec, wall, journeys, concurrency, mode)
+
+    click.echo(format_report(summary))
+    if save_path:
+        os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
+        with open(save_path, "w") as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+        click.echo(f"Saved baseline to {save_path}")
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline, threshold)
+        for route, before, after, ratio in regressions:
+            click.echo(f"REGRESSION {route}: {COMPARE_STAT} {before:.2f}ms -> {after:.2f}ms ({ratio}x)")
+        if regressions:
+            raise SystemExit(1)
+        click.echo(f"No route regressed more than {threshold:.0%} ({COMPARE_STAT}) against {compare_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# backend/db_engine.py
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import UpdateBase, event
+from sqlalchemy.engine import make_url
+
+# ---------- CONFIG ----------
+DEFAULT_URI = "sqlite:///Sam.db"
+READ_ONLY_BIND = "readonly"
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer; NORMAL sync is durable across app crashes in WAL mode (only
+# an OS crash can lose the last commits); busy_timeout makes a writer wait for
+# the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "cache_size": -16000,  # KiB when negative (16 MB per connection)
+    "mmap_size": 134217728,  # 128 MB
+    "temp_store": "MEMORY",
+}
+# journal_mode is a database-wide setting and cannot be changed read-only
+WRITE_ONLY_PRAGMAS = {"journal_mode"}
+
+POOL_SIZE = 10
+MAX_OVERFLOW = 20
+POOL_TIMEOUT = 30  # seconds to wait for a pooled connection
+POOL_RECYCLE = 1800  # server databases only
+
+
+# ---------- SETTINGS ----------
+def _is_file(url):
+    return url.database not in (None, "", ":memory:")
+
+
+def parse_pragmas(spec, base=SQLITE_PRAGMAS):
+    """
+    Merge "name=value,name=value" overrides (e.g. from SQLITE_PRAGMAS) into
+    `base`. An empty value drops that pragma; malformed entries raise ValueError.
+    """
+    pragmas = dict(base)
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, value = item.partition("=")
+        name = name.strip().lower()
+        if not sep or not name.replace("_", "").isalnum():
+            raise ValueError(f"Invalid pragma override: {item!r}")
+        value = value.strip()
+        if value:
+            pragmas[name] = value
+        else:
+            pragmas.pop(name, None)
+    return pragmas
+
+
+def engine_options(uri, pragmas=SQLITE_PRAGMAS, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT):
+    """SQLALCHEMY_ENGINE_OPTIONS for `uri`: a bounded queue pool sized for threaded workers."""
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite":
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": POOL_RECYCLE,
+            "pool_pre_ping": True,
+        }
+    if not _is_file(url):
+        return {}  # in-memory: Flask-SQLAlchemy pins a single StaticPool connection
+    busy_ms = int(pragmas.get("busy_timeout", 0) or 0)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "connect_args": {"timeout": busy_ms / 1000, "check_same_thread": False},
+    }
+
+
+def read_only_uri(uri):
+    """A mode=ro URI for the same SQLite file, or None if `uri` has no read-only twin."""
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite" or not _is_file(url) or url.query.get("uri"):
+        return None
+    return f"sqlite:///file:{url.database}?mode=ro&uri=true"
+
+
+# ---------- CONNECT HOOK ----------
+def install_pragmas(engine, pragmas, read_only=False):
+    """Run `pragmas` on every new connection of a SQLite `engine`; no-op for other databases."""
+    if engine.dialect.name != "sqlite":
+        return
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items() if not (read_only and name in WRITE_ONLY_PRAGMAS)]
+    if read_only:
+        statements.append("PRAGMA query_only=1")
+
+    @event.listens_for(engine, "connect")
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def sqlite_settings(engine):
+    """Current value of each tuned pragma on a fresh pooled connection, for diagnostics."""
+    if engine.dialect.name != "sqlite":
+        return {}
+    with engine.connect() as conn:
+        return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in (*SQLITE_PRAGMAS, "query_only")}
+
+
+# ---------- READ-ONLY ROUTING ----------
+class RoutingSession(Session):
+    """
+    Session that sends reads to the READ_ONLY_BIND engine while a view
+    decorated with @read_only is running. Writes, flushes and anything
+    outside such a view use the primary engine as usual.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and has_request_context()
+            and g.get("db_read_only")
+            and READ_ONLY_BIND in self._db.engines
+        ):
+            return self._db.engines[READ_ONLY_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Mark a GET view as read-only so its queries can use the read-only connection pool."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+# ---------- UPSERTS ----------
+def conflict_insert(db, Model):
+    """
+    insert(Model) from the SQLite or PostgreSQL dialect (the databases the
+    app runs on), whose statements add on_conflict_do_nothing() and
+    on_conflict_do_update() for race-free "insert unless it exists".
+    """
+    dialect = db.session.get_bind(mapper=Model).dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"No INSERT ... ON CONFLICT for {dialect}")
+    return dialect_insert(Model)
@@ -0,0 +1,102 @@
+# backend/events.py
+import json
+import queue
+import threading
+
+# ---------- CONFIG ----------
+QUEUE_SIZE = 64  # events buffered per subscriber before it is told to resync
+HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+MAX_SUBSCRIBERS_PER_USER = 8
+
+
+class Subscription:
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+
+class EventHub:
+    """
+    In-process pub/sub for Server-Sent Events. Each subscriber has a bounded
+    queue; when a slow client's queue fills up its backlog is discarded and
+    replaced by a single "resync" event, so one stalled tab can never grow
+    memory without bound. Events only reach subscribers in this process.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, heartbeat=HEARTBEAT, max_per_user=MAX_SUBSCRIBERS_PER_USER):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_per_user = max_per_user
+        self._subscribers = {}  # user_id -> set of Subscription
+        self._lock = threading.Lock()
+
+    # ---------- SUBSCRIPTIONS ----------
+    def subscribe(self, user_id):
+        """Return a new Subscription, or None if the user already has too many open streams."""
+        with self._lock:
+            subs = self._subscribers.setdefault(user_id, set())
+            if len(subs) >= self.max_per_user:
+                return None
+            sub = Subscription(user_id, self.queue_size)
+            subs.add(sub)
+            return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._subscribers), "subscribers": sum(len(s) for s in self._subscribers.values())}
+
+    # ---------- PUBLISHING ----------
+    def publish(self, user_id, event, data):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        if not subs:
+            return
+        message = (event, data)
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                self._resync(sub)
+
+    def _resync(self, sub):
+        while True:
+            try:
+                sub.queue.get_nowait()
+                sub.dropped += 1
+            except queue.Empty:
+                break
+        try:
+            sub.queue.put_nowait(("resync", {"dropped": sub.dropped}))
+        except queue.Full:
+            pass  # a concurrent publisher refilled it; the client still catches up on the next resync
+
+    # ---------- STREAMING ----------
+    def stream(self, sub):
+        """Yield SSE frames for `sub` until the client disconnects."""
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event, data = sub.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_event(event, data)
+        finally:
+            self.unsubscribe(sub)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
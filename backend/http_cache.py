@@ -0,0 +1,92 @@
+# backend/http_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+# ---------- CONFIG ----------
+FRAGMENT_CACHE_SIZE = 2048
+# Per-user responses: browsers may keep them but must revalidate with If-None-Match
+REVALIDATE = "private, no-cache"
+
+
+# ---------- ETAGS ----------
+def etag(*parts):
+    """Opaque tag for a response identified by `parts` (build id, user, data version, URL, ...)."""
+    return hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+
+
+def build_id(*roots):
+    """
+    Fingerprint of the deployed code and templates (file names, sizes and
+    mtimes under `roots`), identical across workers of one deployment, so
+    ETags change when a release changes how pages render.
+    """
+    digest = hashlib.sha1()
+    for root in roots:
+        if os.path.isfile(root):
+            entries = [("", root)]
+        else:
+            entries = [
+                (dirpath, os.path.join(dirpath, name))
+                for dirpath, _dirs, files in os.walk(root)
+                for name in files
+                if not name.endswith(".pyc")
+            ]
+        for _dir, path in sorted(entries, key=lambda e: e[1]):
+            st = os.stat(path)
+            digest.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def not_modified(request, tag):
+    return request.if_none_match.contains_weak(tag)
+
+
+# ---------- FRAGMENTS ----------
+class FragmentCache:
+    """
+    LRU of rendered template fragments keyed by (name, user_id, version).
+    Keys include the user's data version, so entries never need explicit
+    invalidation: a bump simply makes the old key unreachable until it is
+    evicted.
+    """
+
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, key, caller):
+        """Cached output for `key`, rendering it with `caller()` (a Jinja call block) on a miss."""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = Markup(caller())
+        with self._lock:
+            self._entries[key] = html
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class Lazy:
+    """Iterable that runs `load()` only if a template actually iterates it (i.e. the fragment was not cached)."""
+
+    def __init__(self, load):
+        self._load = load
+
+    def __iter__(self):
+        return iter(self._load())
@@ -0,0 +1,292 @@
+# backend/jobs.py
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+
+# ---------- CONFIG ----------
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE = 2.0  # seconds before the first retry; doubles per attempt
+BACKOFF_MAX = 600.0
+DEFAULT_CONCURRENCY = 1
+DEFAULT_POLL_INTERVAL = 1.0  # seconds an idle worker sleeps between claims
+DEFAULT_LEASE = 300  # seconds a claimed job may run before its worker is presumed dead
+DEFAULT_KEEP_DAYS = 7
+LATENCY_SAMPLE = 1000  # most recent finished jobs used for the wait/run percentiles
+MAX_ERROR = 2000  # characters of the last exception kept on the job
+
+
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX, rng=random):
+    """Seconds before retrying after failed attempt number `attempt` (1-based): exponential, half of it jittered."""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def _insert_ignoring_key(db, Job):
+    """INSERT that skips rows whose idempotency key already exists (SQLite and PostgreSQL)."""
+    dialect = db.session.get_bind(mapper=Job).dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(Job)
+    return dialect_insert(Job).on_conflict_do_nothing(index_elements=["key"])
+
+
+class JobQueue:
+    """
+    Durable job queue stored in the app's own database: no broker, and a
+    job enqueued in a request's transaction only becomes visible to
+    workers if that transaction commits.
+
+    Handlers are registered by name and called with the job's JSON
+    payload as keyword arguments. A worker claims the oldest due job with
+    one UPDATE ... RETURNING, so any number of threads and processes can
+    share the table. Failures are retried with exponential backoff up to
+    the handler's max_attempts, then left as "failed" for `flask jobs
+    retry`. Jobs whose worker died are requeued once their lease expires.
+    """
+
+    def __init__(self, db, Job, lease=DEFAULT_LEASE):
+        self.db = db
+        self.Job = Job
+        self.lease = lease
+        self.handlers = {}  # name -> (fn, max_attempts)
+
+    def handler(self, name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        def register(fn):
+            self.handlers[name] = (fn, max_attempts)
+            return fn
+
+        return register
+
+    # ---------- PRODUCING ----------
+    def enqueue(self, name, payload=None, key=None, delay=0, now=None):
+        """
+        Add a job in the caller's transaction (no commit) and return its id.
+        With an idempotency `key`, enqueueing again returns the existing
+        job's id instead of adding another, until that job is purged.
+        """
+        if name not in self.handlers:
+            raise KeyError(f"No job handler named {name!r}")
+        now = now or datetime.utcnow()
+        Job = self.Job
+        stmt = _insert_ignoring_key(self.db, Job) if key is not None else insert(Job)
+        job_id = self.db.session.execute(
+            stmt.values(
+                name=name,
+                payload=json.dumps(payload or {}, sort_keys=True),
+                key=key,
+                status=QUEUED,
+                attempts=0,
+                max_attempts=self.handlers[name][1],
+                run_at=now + timedelta(seconds=delay),
+                created_at=now,
+            ).returning(Job.id)
+        ).scalar()
+        if job_id is None:
+            job_id = self.db.session.execute(select(Job.id).where(Job.key == key)).scalar()
+        return job_id
+
+    # ---------- CONSUMING ----------
+    def claim(self, worker_id, now=None):
+        """Atomically mark the oldest due job as running for `worker_id` and commit; returns the row or None."""
+        now = now or datetime.utcnow()
+        Job = self.Job
+        next_id = (
+            select(Job.id).where(Job.status == QUEUED, Job.run_at <= now).order_by(Job.run_at, Job.id).limit(1).scalar_subquery()
+        )
+        row = self.db.session.execute(
+            update(Job)
+            .where(Job.id == next_id, Job.status == QUEUED)
+            .values(status=RUNNING, attempts=Job.attempts + 1, locked_by=worker_id, started_at=now)
+            .returning(Job.id, Job.name, Job.payload, Job.attempts, Job.max_attempts)
+        ).first()
+        self.db.session.commit()
+        return row
+
+    def run_one(self, worker_id):
+        """
+        Claim and run one due job. The handler runs in the worker's session
+        and the job is marked done in the same commit as the handler's
+        uncommitted writes. Returns (job id, status) or None if nothing was due.
+        """
+        job = self.claim(worker_id)
+        if job is None:
+            return None
+        Job = self.Job
+        fn = self.handlers.get(job.name, (None, 0))[0]
+        try:
+            if fn is None:
+                raise LookupError(f"No job handler named {job.name!r}")
+            fn(**json.loads(job.payload or "{}"))
+            values = {"status": DONE, "finished_at": datetime.utcnow(), "locked_by": None, "last_error": None}
+        except Exception as e:
+            self.db.session.rollback()
+            now = datetime.utcnow()
+            values = {"locked_by": None, "last_error": f"{type(e).__name__}: {e}"[:MAX_ERROR]}
+            if job.attempts >= job.max_attempts:
+                values.update(status=FAILED, finished_at=now)
+            else:
+                values.update(status=QUEUED, run_at=now + timedelta(seconds=backoff(job.attempts)))
+        self.db.session.execute(update(Job).where(Job.id == job.id, Job.locked_by == worker_id).values(values))
+        self.db.session.commit()
+        return job.id, values["status"]
+
+    def reclaim_expired(self, now=None):
+        """Requeue jobs claimed more than `lease` seconds ago (their worker crashed or was killed); commits."""
+        now = now or datetime.utcnow()
+        Job = self.Job
+        result = self.db.session.execute(
+            update(Job)
+            .where(Job.status == RUNNING, Job.started_at < now - timedelta(seconds=self.lease))
+            .values(status=QUEUED, run_at=now, locked_by=None, last_error="lease expired")
+        )
+        self.db.session.commit()
+        return result.rowcount or 0
+
+    # ---------- MAINTENANCE ----------
+    def retry(self, job_ids=None, now=None):
+        """Give failed jobs (all of them, or `job_ids`) a fresh set of attempts; no commit."""
+        Job = self.Job
+        stmt = update(Job).where(Job.status == FAILED)
+        if job_ids is not None:
+            stmt = stmt.where(Job.id.in_(job_ids))
+        return self.db.session.execute(
+            stmt.values(status=QUEUED, attempts=0, run_at=now or datetime.utcnow(), finished_at=None)
+        ).rowcount or 0
+
+    def purge(self, older_than_days=DEFAULT_KEEP_DAYS, statuses=(DONE,), now=None):
+        """Delete finished jobs (and so release their idempotency keys) older than the cutoff; no commit."""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+        Job = self.Job
+        return self.db.session.execute(
+            delete(Job).where(Job.status.in_(statuses), Job.finished_at < cutoff)
+        ).rowcount or 0
+
+    def stats(self, now=None, sample=LATENCY_SAMPLE):
+        """
+        Queue depth by status, queued jobs by name, the age of the oldest
+        due job (lag) and wait/run percentiles in ms over the most recent
+        `sample` finished jobs.
+        """
+        now = now or datetime.utcnow()
+        Job = self.Job
+        depth = dict.fromkeys(STATUSES, 0)
+        depth.update(self.db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+        by_name = dict(
+            self.db.session.execute(select(Job.name, func.count()).where(Job.status == QUEUED).group_by(Job.name)).all()
+        )
+        oldest = self.db.session.execute(select(func.min(Job.run_at)).where(Job.status == QUEUED, Job.run_at <= now)).scalar()
+        recent = self.db.session.execute(
+            select(Job.run_at, Job.started_at, Job.finished_at)
+            .where(Job.status == DONE)
+            .order_by(Job.finished_at.desc())
+            .limit(sample)
+        ).all()
+        waits = sorted(max(0.0, (r.started_at - r.run_at).total_seconds() * 1000) for r in recent if r.started_at)
+        runs = sorted(max(0.0, (r.finished_at - r.started_at).total_seconds() * 1000) for r in recent if r.started_at)
+
+        def summary(values):
+            return {p: (round(_percentile(values, n), 1) if values else None) for p, n in (("p50", 50), ("p95", 95), ("max", 100))}
+
+        return {
+            "depth": depth,
+            "queued_by_name": by_name,
+            "lag_seconds": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+            "sampled": len(recent),
+            "wait_ms": summary(waits),
+            "run_ms": summary(runs),
+        }
+
+
+# ---------- WORKERS ----------
+class JobWorker:
+    """Pool of daemon threads that run due jobs from `queue`, each inside its own app context."""
+
+    def __init__(self, app, queue, concurrency=DEFAULT_CONCURRENCY, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.app = app
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.processed = {DONE: 0, QUEUED: 0, FAILED: 0}  # outcomes since start (QUEUED = will be retried)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._reclaimed_at = 0.0
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, args=(n,), name=f"jobs-{n}", daemon=True) for n in range(self.concurrency)
+            ]
+            for t in self._threads:
+                t.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+    def wake(self):
+        """Claim now instead of waiting for the next poll (called after a commit that enqueued jobs)."""
+        self._wake.set()
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+
+    def work_once(self, thread_id):
+        """Reclaim expired leases now and then, then run one job; returns run_one's result."""
+        if time.monotonic() - self._reclaimed_at >= self.queue.lease / 2:
+            self._reclaimed_at = time.monotonic()
+            self.queue.reclaim_expired()
+        result = self.queue.run_one(f"{self.worker_id}:{thread_id}")
+        if result is not None:
+            with self._lock:
+                self.processed[result[1]] += 1
+        return result
+
+    def drain(self):
+        """Run due jobs in the calling thread until none are left (used by `flask jobs work --burst`)."""
+        with self.app.app_context():
+            while self.work_once(0) is not None:
+                pass
+        return dict(self.processed)
+
+    def _run(self, thread_id):
+        while not self._stop.is_set():
+            result = None
+            try:
+                with self.app.app_context():
+                    result = self.work_once(thread_id)
+            except Exception as e:
+                self.app.logger.exception("Job worker failed to claim or record a job: %s", e)
+            if result is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
@@ -0,0 +1,286 @@
+# backend/leaderboard.py
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+# ---------- CONFIG ----------
+BUCKET_SIZE = 1000  # keys per bucket of the sorted index; buckets split at twice this
+
+
+class _Fenwick:
+    """Prefix sums over a list of counts with O(log n) point updates and queries."""
+
+    def __init__(self, counts):
+        self._tree = [0] + list(counts)
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def add(self, i, delta):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, n):
+        """Sum of the first `n` counts."""
+        total = 0
+        while n > 0:
+            total += self._tree[n]
+            n -= n & -n
+        return total
+
+
+class SortedKeys:
+    """
+    Sorted sequence stored as a list of sorted buckets of at most
+    2 * BUCKET_SIZE keys. Adding or removing a key shifts one bucket
+    instead of the whole list (insort on a single list is O(n) per update);
+    global positions are prefix sums of the bucket sizes, kept in a Fenwick
+    tree so they cost O(log buckets). The tree is rebuilt only when buckets
+    are split or dropped, at most once per BUCKET_SIZE updates.
+    """
+
+    def __init__(self, keys=(), bucket_size=BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        keys = sorted(keys)
+        self._buckets = [keys[i : i + bucket_size] for i in range(0, len(keys), bucket_size)]
+        self._maxes = [b[-1] for b in self._buckets]
+        self._sizes = _Fenwick(map(len, self._buckets))
+        self._len = len(keys)
+
+    def __len__(self):
+        return self._len
+
+    def _offset(self, b):
+        return self._sizes.prefix(b)
+
+    def _reindex(self):
+        self._sizes = _Fenwick(map(len, self._buckets))
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets, self._maxes = [[key]], [key]
+            self._reindex()
+        else:
+            b = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+            bucket = self._buckets[b]
+            insort(bucket, key)
+            self._maxes[b] = bucket[-1]
+            if len(bucket) > 2 * self.bucket_size:
+                self._buckets[b : b + 1] = [bucket[: self.bucket_size], bucket[self.bucket_size :]]
+                self._maxes[b : b + 1] = [bucket[self.bucket_size - 1], bucket[-1]]
+                self._reindex()
+            else:
+                self._sizes.add(b, 1)
+        self._len += 1
+
+    def discard(self, key):
+        b = bisect_left(self._maxes, key)
+        if b == len(self._buckets):
+            return
+        bucket = self._buckets[b]
+        i = bisect_left(bucket, key)
+        if i == len(bucket) or bucket[i] != key:
+            return
+        del bucket[i]
+        self._len -= 1
+        if bucket:
+            self._maxes[b] = bucket[-1]
+            self._sizes.add(b, -1)
+        else:
+            del self._buckets[b], self._maxes[b]
+            self._reindex()
+
+    def bisect_left(self, key):
+        b = bisect_left(self._maxes, key)
+        if b == len(self._buckets):
+            return self._len
+        return self._offset(b) + bisect_left(self._buckets[b], key)
+
+    def bisect_right(self, key):
+        b = bisect_right(self._maxes, key)
+        if b == len(self._buckets):
+            return self._len
+        return self._offset(b) + bisect_right(self._buckets[b], key)
+
+    def _locate(self, i):
+        """(bucket, offset of that bucket) holding position i, by bisecting the prefix sums."""
+        lo, hi = 0, len(self._buckets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._sizes.prefix(mid + 1) <= i:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo, self._sizes.prefix(lo)
+
+    def slice(self, start, stop):
+        """Keys[start:stop] for 0 <= start."""
+        out = []
+        b, offset = self._locate(start)
+        for bucket in self._buckets[b:]:
+            if offset >= stop:
+                break
+            out.extend(bucket[max(0, start - offset) : stop - offset])
+            offset += len(bucket)
+        return out
+
+
+class Leaderboard:
+    """
+    In-memory points index: a SortedKeys of (-points, user_id) plus a
+    user_id -> points map. Position, window and tier lookups are bisections;
+    an update is one bucket delete plus one bucket insert.
+    """
+
+    def __init__(self, tiers):
+        # tiers: [(name, min_points), ...] in ascending order of min_points
+        self.tiers = tiers
+        self.loaded_at = None
+        self._keys = SortedKeys()
+        self._points = {}
+        self._lock = threading.RLock()
+        self._loaded = threading.Event()
+        self._during_load = None  # updates made while a rebuild reads the table
+
+    def __len__(self):
+        return len(self._keys)
+
+    # ---------- MAINTENANCE ----------
+    def begin_rebuild(self):
+        """Start recording updates, so rebuild() can replay the ones its (older) rows miss."""
+        with self._lock:
+            self._during_load = {}
+
+    def rebuild(self, rows):
+        """Replace the index with `rows` of (user_id, points), then replay updates made since begin_rebuild()."""
+        points = {user_id: p or 0 for user_id, p in rows}
+        keys = SortedKeys((-p, user_id) for user_id, p in points.items())
+        with self._lock:
+            replay = self._during_load or {}
+            self._during_load = None
+            self._points = points
+            self._keys = keys
+            for user_id, p in replay.items():
+                self.update(user_id, p)
+            self.loaded_at = time.monotonic()
+        self._loaded.set()
+
+    def wait_loaded(self, timeout):
+        return self._loaded.wait(timeout)
+
+    def update(self, user_id, points):
+        points = points or 0
+        with self._lock:
+            if self._during_load is not None:
+                self._during_load[user_id] = points
+            old = self._points.get(user_id)
+            if old == points:
+                return
+            if old is not None:
+                self._keys.discard((-old, user_id))
+            self._points[user_id] = points
+            self._keys.add((-points, user_id))
+
+    def remove(self, user_id):
+        with self._lock:
+            old = self._points.pop(user_id, None)
+            if old is not None:
+                self._keys.discard((-old, user_id))
+
+    # ---------- LOOKUPS ----------
+    def _entries(self, start, stop):
+        return [{"position": start + i + 1, "user_id": uid, "points": -neg} for i, (neg, uid) in enumerate(self._keys.slice(start, stop))]
+
+    def position(self, user_id):
+        """1-based leaderboard position (ties ordered by user id), or None."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            return self._keys.bisect_left((-points, user_id)) + 1
+
+    def top(self, n):
+        with self._lock:
+            return self._entries(0, n)
+
+    def around(self, user_id, radius):
+        """Up to `radius` entries either side of the user, including the user."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return []
+            i = self._keys.bisect_left((-points, user_id))
+            return self._entries(max(0, i - radius), i + radius + 1)
+
+    def count_at_least(self, points):
+        """Number of users with >= `points`."""
+        with self._lock:
+            return self._keys.bisect_right((-points, float("inf")))
+
+    def percentile(self, user_id):
+        """Percentage of users with fewer points than this user (0-100), or None."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None or not len(self._keys):
+                return None
+            below = len(self._keys) - self.count_at_least(points)
+            return round(100.0 * below / len(self._keys), 2)
+
+    def tier_counts(self):
+        """[(tier, users)] from the tier thresholds, one bisection per tier."""
+        with self._lock:
+            counts = []
+            for i, (name, low) in enumerate(self.tiers):
+                at_least_low = self.count_at_least(low)
+                at_least_next = self.count_at_least(self.tiers[i + 1][1]) if i + 1 < len(self.tiers) else 0
+                counts.append((name, at_least_low - at_least_next))
+            return counts
+
+
+# ---------- BACKGROUND LOADING ----------
+class LeaderboardLoader:
+    """
+    Daemon thread that builds the index as soon as it starts and then
+    resyncs it every `interval` seconds (for points earned through other
+    processes), so no request ever pays for the full users scan.
+    """
+
+    def __init__(self, app, index, load, interval):
+        self.app = app
+        self.index = index
+        self.load = load  # () -> rows of (user_id, points); runs in an app context
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="leaderboard-loader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def resync(self):
+        self.index.begin_rebuild()
+        with self.app.app_context():
+            self.index.rebuild(self.load())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.resync()
+            except Exception as e:
+                self.app.logger.exception("Leaderboard resync failed: %s", e)
+            self._stop.wait(self.interval)
@@ -0,0 +1,175 @@
+# backend/metrics.py
+import logging
+import threading
+from bisect import bisect_left
+
+# ---------- CONFIG ----------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)  # statements per request
+DEFAULT_SLOW_QUERY_MS = 100
+MAX_LOGGED_PARAMS = 300  # characters of the parameter type list kept in the slow-query log
+LOCAL_ADDRESSES = frozenset({"127.0.0.1", "::1"})
+PREFIX = "sam"
+
+
+def parameter_types(parameters):
+    """Bound parameters reduced to their type names, e.g. "(str, int)" or "{name: str}"."""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def allowed_scrape(remote_addr, authorization, token):
+    """/metrics access: the bearer token when one is configured, otherwise local requests only."""
+    if token:
+        return authorization == f"Bearer {token}"
+    return remote_addr in LOCAL_ADDRESSES
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip((*self.buckets, "+Inf"), self.counts):
+            total += n
+            yield bound, total
+
+
+class Metrics:
+    """
+    In-process request and database metrics rendered in the Prometheus text
+    format. Every worker process keeps its own numbers, so scrape each
+    worker (or run one per host).
+
+    The app calls observe_request() once per request with the statement
+    count and SQL time it accumulated, observe_query() for every statement
+    and observe_commit() for every commit. Statements slower than `slow_query_ms` are logged with the
+    types of their parameters (never the values, which include password hashes).
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS, logger=None):
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms else None
+        self.logger = logger or logging.getLogger("sam.slow_query")
+        self._latency = {}  # (endpoint, method) -> Histogram
+        self._queries = {}  # endpoint -> Histogram of statements per request
+        self._sql_seconds = {}  # endpoint -> total SQL seconds
+        self._requests = {}  # (endpoint, method, status) -> count
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.slow_statements = 0
+        self._commits = {}  # endpoint (or "background") -> count
+        self._lock = threading.Lock()
+
+    # ---------- RECORDING ----------
+    def observe_request(self, endpoint, method, status, seconds, queries=0, sql_seconds=0.0):
+        with self._lock:
+            latency = self._latency.get((endpoint, method))
+            if latency is None:
+                latency = self._latency[(endpoint, method)] = Histogram(LATENCY_BUCKETS)
+            latency.observe(seconds)
+            per_request = self._queries.get(endpoint)
+            if per_request is None:
+                per_request = self._queries[endpoint] = Histogram(QUERY_COUNT_BUCKETS)
+            per_request.observe(queries)
+            self._sql_seconds[endpoint] = self._sql_seconds.get(endpoint, 0.0) + sql_seconds
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def observe_query(self, seconds, statement, parameters):
+        slow = self.slow_query_seconds is not None and seconds >= self.slow_query_seconds
+        with self._lock:
+            self.statements += 1
+            self.statement_seconds += seconds
+            self.slow_statements += slow
+        if slow:
+            params = parameter_types(parameters)
+            if len(params) > MAX_LOGGED_PARAMS:
+                params = params[:MAX_LOGGED_PARAMS] + "..."
+            self.logger.warning("slow query (%.1f ms): %s | params=%s", seconds * 1000, " ".join(statement.split()), params)
+
+    def observe_commit(self, endpoint):
+        with self._lock:
+            self._commits[endpoint] = self._commits.get(endpoint, 0) + 1
+
+    # ---------- EXPOSITION ----------
+    def render(self, gauges=()):
+        """
+        Prometheus text exposition. `gauges` is an iterable of
+        (name, help, type, value) for extra process-level numbers; `value`
+        may be a {'label="x"': number} dict for a labelled family.
+        """
+        out = []
+
+        def header(name, help_text, kind):
+            out.append(f"# HELP {PREFIX}_{name} {help_text}")
+            out.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+        def histogram(name, labels, h):
+            for bound, total in h.cumulative():
+                out.append(f"{PREFIX}_{name}_bucket{{{labels},le=\"{bound}\"}} {total}")
+            out.append(f"{PREFIX}_{name}_sum{{{labels}}} {h.sum:.6f}")
+            out.append(f"{PREFIX}_{name}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            header("http_request_duration_seconds", "Request latency by endpoint.", "histogram")
+            for (endpoint, method), h in sorted(self._latency.items()):
+                histogram("http_request_duration_seconds", f'endpoint="{_escape(endpoint)}",method="{method}"', h)
+
+            header("http_requests_total", "Requests by endpoint, method and status.", "counter")
+            for (endpoint, method, status), n in sorted(self._requests.items()):
+                out.append(f'{PREFIX}_http_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {n}')
+
+            header("db_statements_per_request", "SQL statements issued per request.", "histogram")
+            for endpoint, h in sorted(self._queries.items()):
+                histogram("db_statements_per_request", f'endpoint="{_escape(endpoint)}"', h)
+
+            header("db_request_seconds_total", "Time spent in SQL by endpoint.", "counter")
+            for endpoint, seconds in sorted(self._sql_seconds.items()):
+                out.append(f'{PREFIX}_db_request_seconds_total{{endpoint="{_escape(endpoint)}"}} {seconds:.6f}')
+
+            for name, help_text, value in (
+                ("db_statements_total", "SQL statements executed, including background work.", self.statements),
+                ("db_statement_seconds_total", "Time spent executing SQL statements.", round(self.statement_seconds, 6)),
+                ("db_slow_statements_total", "Statements slower than the slow-query threshold.", self.slow_statements),
+            ):
+                header(name, help_text, "counter")
+                out.append(f"{PREFIX}_{name} {value}")
+
+            header("db_commits_total", "Committed session transactions by endpoint.", "counter")
+            for endpoint, n in sorted(self._commits.items()):
+                out.append(f'{PREFIX}_db_commits_total{{endpoint="{_escape(endpoint)}"}} {n}')
+
+        for name, help_text, kind, value in gauges:
+            header(name, help_text, kind)
+            if isinstance(value, dict):
+                out.extend(f"{PREFIX}_{name}{{{labels}}} {v}" for labels, v in sorted(value.items()))
+            else:
+                out.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def server_timing(total_seconds, queries, sql_seconds):
+    """Server-Timing header value splitting a request into database and application time."""
+    db_ms = sql_seconds * 1000
+    app_ms = max(0.0, total_seconds * 1000 - db_ms)
+    return f'db;dur={db_ms:.1f};desc="{queries} queries", app;dur={app_ms:.1f}, total;dur={total_seconds * 1000:.1f}'
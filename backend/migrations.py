@@ -0,0 +1,179 @@
+# backend/migrations.py
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+
+from backend import search
+
+# ---------- REGISTRY ----------
+# Ordered (version, description, fn(conn)) entries. Every migration must be
+# safe to run against a database freshly built by db.create_all(), which
+# already has the current schema: use IF NOT EXISTS / add_column().
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+
+    return register
+
+
+# ---------- HELPERS ----------
+def add_column(conn, table, name, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists."""
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if name not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def create_index(conn, name, table, columns, where=None):
+    sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    if where:
+        sql += f" WHERE {where}"
+    conn.execute(text(sql))
+
+
+# ---------- MIGRATIONS ----------
+@migration(1, "composite indexes for per-user queries")
+def _composite_indexes(conn):
+    create_index(conn, "ix_task_user_created", "task", ["user_id", "created_at"])
+    create_index(conn, "ix_task_user_completed", "task", ["user_id", "completed", "created_at"])
+    create_index(conn, "ix_study_log_user_created", "study_log", ["user_id", "created_at"])
+    create_index(conn, "ix_quest_user_type", "quest", ["user_id", "type", "created_at"])
+    create_index(conn, "ix_quest_user_completed", "quest", ["user_id", "completed"])
+
+
+@migration(2, "profile picture thumbnail variants")
+def _profile_thumbnails(conn):
+    add_column(conn, "user", "profile_thumb", "VARCHAR(200)")
+    add_column(conn, "user", "profile_thumb_webp", "VARCHAR(200)")
+
+
+@migration(3, "partial indexes on pending task alarms")
+def _alarm_indexes(conn):
+    pending = "completed = 0 AND alarm_time IS NOT NULL"
+    create_index(conn, "ix_task_alarm_pending", "task", ["alarm_time"], where=pending)
+    create_index(conn, "ix_task_user_alarm_pending", "task", ["user_id", "alarm_time"], where=pending)
+
+
+@migration(4, "typed study session bounds and study rollups")
+def _study_rollups(conn):
+    # started_at/ended_at used to be free-form strings (browser ISO-8601, or "").
+    # Rewrite them in the DateTime storage format as naive UTC; SQLite keeps the
+    # declared column type, the stored values are what the model reads back.
+    rows = conn.execute(text("SELECT id, started_at, ended_at FROM study_log")).all()
+    for row_id, started, ended in rows:
+        values = {"id": row_id, "s": _utc_timestamp(started), "e": _utc_timestamp(ended)}
+        if (values["s"], values["e"]) != (started, ended):
+            conn.execute(text("UPDATE study_log SET started_at = :s, ended_at = :e WHERE id = :id"), values)
+    create_index(conn, "ix_study_log_user_started", "study_log", ["user_id", "started_at"])
+
+    # Tables come from db.create_all(); backfill them from the converted rows.
+    day = "date(COALESCE(started_at, created_at))"
+    conn.execute(text("DELETE FROM study_daily"))
+    conn.execute(
+        text(
+            f"INSERT INTO study_daily (user_id, day, sessions, minutes) "
+            f"SELECT user_id, {day}, COUNT(*), COALESCE(SUM(duration), 0) FROM study_log GROUP BY user_id, {day}"
+        )
+    )
+    conn.execute(text("DELETE FROM study_subject_daily"))
+    conn.execute(
+        text(
+            f"INSERT INTO study_subject_daily (user_id, day, subject, sessions, minutes) "
+            f"SELECT user_id, {day}, subject, COUNT(*), COALESCE(SUM(duration), 0) "
+            f"FROM study_log GROUP BY user_id, {day}, subject"
+        )
+    )
+
+
+def _utc_timestamp(value):
+    """Legacy session bound -> 'YYYY-MM-DD HH:MM:SS.ffffff' (naive UTC), or None."""
+    if value is None or isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f") if value else None
+    value = value.strip()
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+@migration(5, "points ledger opening balances")
+def _points_ledger(conn):
+    # Table comes from db.create_all(); seed it so SUM(amount) matches the points users already have.
+    conn.execute(
+        text(
+            "INSERT INTO points_ledger (user_id, amount, source, created_at) "
+            "SELECT u.id, COALESCE(u.points, 0) - COALESCE(l.total, 0), 'opening_balance', :now FROM user u "
+            "LEFT JOIN (SELECT user_id, SUM(amount) AS total FROM points_ledger GROUP BY user_id) l ON l.user_id = u.id "
+            "WHERE COALESCE(u.points, 0) != COALESCE(l.total, 0)"
+        ),
+        {"now": datetime.utcnow()},
+    )
+
+
+@migration(6, "per-user data version for conditional GET")
+def _data_version(conn):
+    add_column(conn, "user", "data_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(7, "full-text search over tasks and study logs")
+def _search_index(conn):
+    # FTS5 tables and their sync triggers aren't models; a no-op outside SQLite.
+    search.create(conn)
+
+
+@migration(8, "indexes for the quest regeneration sweep")
+def _quest_sweep_indexes(conn):
+    for period in ("daily", "weekly", "monthly"):
+        create_index(conn, f"ix_user_last_{period}_quest", "user", [f"last_{period}_quest"])
+
+
+# ---------- RUNNER ----------
+def _ensure_version_table(conn):
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at DATETIME)"
+        )
+    )
+
+
+def current_version(db):
+    with db.engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def pending(db):
+    version = current_version(db)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+
+def upgrade(db, target=None):
+    """
+    Bring the database up to date: create missing tables from the models,
+    then apply each pending migration in its own transaction and record it
+    in schema_version. Returns the list of applied (version, description).
+    """
+    db.create_all()
+    applied = []
+    for version, description, fn in pending(db):
+        if target is not None and version > target:
+            break
+        with db.engine.begin() as conn:
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()},
+            )
+        applied.append((version, description))
+    return applied
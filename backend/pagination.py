@@ -0,0 +1,83 @@
+# backend/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# ---------- CONFIG ----------
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+STREAM_CHUNK = 500  # rows fetched per round-trip when streaming
+
+
+# ---------- CURSORS ----------
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) for an opaque cursor; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created), int(row_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+# ---------- QUERIES ----------
+def newest_first(stmt, Model):
+    """Order by (created_at, id) descending: the keyset every list endpoint pages on."""
+    return stmt.order_by(Model.created_at.desc(), Model.id.desc())
+
+
+def keyset_page(stmt, Model, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Apply a (created_at, id) keyset to `stmt`. One extra row is fetched so
+    the caller can tell whether another page exists.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(Model.created_at < created_at, and_(Model.created_at == created_at, Model.id < row_id))
+        )
+    return newest_first(stmt, Model).limit(limit + 1)
+
+
+def page_result(rows, limit, serialize):
+    """{"items": [...], "next_cursor": str|None} from up to limit+1 rows."""
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if more and rows else None
+    return {"items": [serialize(r) for r in rows], "next_cursor": next_cursor}
+
+
+def page_list(items, cursor=None, limit=DEFAULT_LIMIT):
+    """Keyset-page an already materialized newest-first list (e.g. computed quests)."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        items = [i for i in items if (i.created_at, i.id) < (created_at, row_id)]
+    return items[: limit + 1]
+
+
+# ---------- STREAMING ----------
+def stream_json_array(rows, serialize):
+    """Yield a JSON array one element at a time so the full result is never held in memory."""
+    yield "["
+    first = True
+    for row in rows:
+        if not first:
+            yield ","
+        first = False
+        yield json.dumps(serialize(row), default=str)
+    yield "]"
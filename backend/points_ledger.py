@@ -0,0 +1,89 @@
+# backend/points_ledger.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, update
+
+# ---------- CONFIG ----------
+COMPACTED = "compacted"  # sum of rows folded by compact()
+DEFAULT_COMPACT_AFTER_DAYS = 90
+
+
+# ---------- AWARDS ----------
+def award(db, User, Ledger, user_id, amount, source, source_id=None, ranks=None, **stat_deltas):
+    """
+    Append a ledger row and apply it to the cached User.points with a single
+    `UPDATE user SET points = points + :amount, ...` in the caller's
+    transaction, so concurrent awards never overwrite each other. Other
+    integer User columns can be bumped in the same statement via
+    `stat_deltas` (e.g. strength=2).
+
+    `ranks(points) -> (rank, level)` refreshes User.rank/level from the new
+    total; that second UPDATE runs while this transaction already holds the
+    row's write lock. Returns the new values of every column touched.
+    """
+    db.session.execute(insert(Ledger).values(user_id=user_id, amount=amount, source=source, source_id=source_id))
+    values = {"points": func.coalesce(User.points, 0) + amount}
+    for column, delta in stat_deltas.items():
+        if delta:
+            values[column] = func.coalesce(getattr(User, column), 0) + delta
+    returned = [getattr(User, column) for column in values] + [User.rank, User.level]
+    row = db.session.execute(
+        update(User).where(User.id == user_id).values(values).returning(*returned).execution_options(synchronize_session=False)
+    ).one()
+    new = dict(row._mapping)
+    if ranks is not None:
+        rank, level = ranks(new["points"])
+        if (rank, level) != (new["rank"], new["level"]):
+            db.session.execute(
+                update(User).where(User.id == user_id).values(rank=rank, level=level).execution_options(synchronize_session=False)
+            )
+        new.update(rank=rank, level=level)
+    return new
+
+
+# ---------- RECONCILIATION ----------
+def ledger_totals(db, Ledger, user_ids=None):
+    stmt = db.select(Ledger.user_id, func.sum(Ledger.amount)).group_by(Ledger.user_id)
+    if user_ids is not None:
+        stmt = stmt.where(Ledger.user_id.in_(user_ids))
+    return {user_id: int(total or 0) for user_id, total in db.session.execute(stmt)}
+
+
+def reconcile(db, User, Ledger, fix=False):
+    """
+    Compare every cached User.points against the ledger sum. Returns a list
+    of (user_id, cached, ledger). With fix=True the ledger is treated as the
+    source of truth and User.points is rewritten (no commit).
+    """
+    totals = ledger_totals(db, Ledger)
+    drift = []
+    for user_id, cached in db.session.execute(db.select(User.id, User.points)):
+        want = totals.get(user_id, 0)
+        if (cached or 0) != want:
+            drift.append((user_id, cached, want))
+    if fix and drift:
+        db.session.execute(update(User), [{"id": user_id, "points": want} for user_id, _cached, want in drift])
+    return drift
+
+
+# ---------- COMPACTION ----------
+def compact(db, Ledger, older_than_days=DEFAULT_COMPACT_AFTER_DAYS, now=None):
+    """
+    Fold each user's ledger rows older than the cutoff into one COMPACTED
+    row dated at the cutoff, keeping totals unchanged while bounding table
+    growth (no commit). Returns (users, rows_removed).
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    old = Ledger.created_at < cutoff
+    foldable = db.select(Ledger.user_id).where(old).group_by(Ledger.user_id).having(func.count() > 1)
+    sums = db.session.execute(
+        db.select(Ledger.user_id, func.sum(Ledger.amount), func.count()).where(old).group_by(Ledger.user_id).having(func.count() > 1)
+    ).all()
+    if not sums:
+        return 0, 0
+    db.session.execute(delete(Ledger).where(old, Ledger.user_id.in_(foldable)))
+    db.session.execute(
+        insert(Ledger),
+        [{"user_id": user_id, "amount": int(total or 0), "source": COMPACTED, "created_at": cutoff} for user_id, total, _n in sums],
+    )
+    return len(sums), sum(n for _u, _t, n in sums) - len(sums)
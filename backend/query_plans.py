@@ -0,0 +1,110 @@
+# backend/query_plans.py
+import re
+
+from sqlalchemy import event
+
+# ---------- CONFIG ----------
+# Tables that grow with users or activity; a full scan of any of them on a request path is a failure
+HOT_TABLES = frozenset(
+    {
+        "user",
+        "task",
+        "study_log",
+        "study_daily",
+        "study_subject_daily",
+        "quest",
+        "quest_completion",
+        "points_ledger",
+        "user_stats",
+        "job",
+        "sync_receipt",
+    }
+)
+# (regex over the normalized statement, reason) for full scans that are intentional
+ALLOWED_SCANS = (
+    (r"^SELECT user\.id, user\.points FROM user$", "leaderboard rebuild reads every user once per resync"),
+)
+EXPLAINED_VERBS = ("SELECT", "UPDATE", "DELETE", "WITH", "INSERT")
+
+_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+)| USING INTEGER PRIMARY KEY)?")
+
+
+def normalize(statement):
+    return " ".join(statement.split())
+
+
+class PlanRecorder:
+    """
+    Captures every distinct statement executed on the given engines (with
+    the first parameters seen and the label of whatever issued it) so the
+    plans can be checked afterwards. `context()` may return a label for the
+    current statement (e.g. the request endpoint); otherwise `label` is
+    used, and nothing is captured while it is None.
+    """
+
+    def __init__(self, engines, context=None):
+        self.engines = list(engines)
+        self.context = context or (lambda: None)
+        self.label = None
+        self.statements = {}  # normalized sql -> (label, statement, parameters)
+
+    def __enter__(self):
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        label = self.context() or self.label
+        if label is None:
+            return
+        key = normalize(statement)
+        verb = key.split(" ", 1)[0].upper()
+        if verb not in EXPLAINED_VERBS or (verb == "INSERT" and " SELECT " not in key.upper()):
+            return
+        if key not in self.statements:
+            self.statements[key] = (label, statement, parameters[0] if executemany else parameters)
+
+
+# ---------- PLANS ----------
+def explain(connection, statement, parameters):
+    """EXPLAIN QUERY PLAN detail lines for a captured statement."""
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [row[-1] for row in rows]
+
+
+def classify(plan, sql, hot_tables=HOT_TABLES, allowed=ALLOWED_SCANS):
+    """
+    (failures, warnings) for one plan. A bare `SCAN <hot table>` is a
+    failure unless the statement is allowlisted; a full index scan or a
+    temporary b-tree for ORDER BY/GROUP BY is only a warning.
+    """
+    failures, warnings = [], []
+    allowed_reason = next((reason for pattern, reason in allowed if re.search(pattern, sql)), None)
+    for detail in plan:
+        if "USE TEMP B-TREE" in detail:
+            warnings.append(detail)
+            continue
+        match = _SCAN.match(detail)
+        if match is None or match.group(1) not in hot_tables:
+            continue
+        if "USING" in detail:
+            warnings.append(detail)
+        elif allowed_reason:
+            warnings.append(f"{detail} (allowed: {allowed_reason})")
+        else:
+            failures.append(detail)
+    return failures, warnings
+
+
+def check(connection, recorder, hot_tables=HOT_TABLES, allowed=ALLOWED_SCANS):
+    """Explain every captured statement: [{label, sql, plan, failures, warnings}] in capture order."""
+    results = []
+    for sql, (label, statement, parameters) in recorder.statements.items():
+        plan = explain(connection, statement, parameters)
+        failures, warnings = classify(plan, sql, hot_tables, allowed)
+        results.append({"label": label, "sql": sql, "plan": plan, "failures": failures, "warnings": warnings})
+    return results
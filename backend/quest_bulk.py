@@ -0,0 +1,124 @@
+# backend/quest_bulk.py
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, update
+
+PERIOD_COLUMNS = {
+    "daily": "last_daily_quest",
+    "weekly": "last_weekly_quest",
+    "monthly": "last_monthly_quest",
+}
+
+
+# ---------- HELPERS ----------
+def bmi_quest(height_cm, weight_kg):
+    """Personalized daily physical quest for a user's BMI, or None without measurements."""
+    if not height_cm or not weight_kg:
+        return None
+    bmi = weight_kg / ((height_cm / 100) ** 2)
+    title, xp = "Standard Exercise", 10
+    if bmi < 18.5:
+        title, xp = "Light Workout", 15
+    elif bmi > 25:
+        title, xp = "Moderate Cardio", 20
+    return {"title": title, "category": "Physical", "type": "daily", "difficulty": "Medium", "xp": xp}
+
+
+def _quest_row(user_id, q, period, now):
+    return {
+        "user_id": user_id,
+        "title": q["title"],
+        "category": q.get("category", "General"),
+        "type": q.get("type", period),
+        "difficulty": q.get("difficulty", "Medium"),
+        "xp": q.get("xp", 10),
+        "completed": False,
+        "created_at": now,
+    }
+
+
+# ---------- ENGINE ----------
+def regenerate_cohort(
+    db, User, Quest, user_ids, regen, choose, now=None, force=False, commit=True, Stats=None, extra_values=None
+):
+    """
+    Regenerate quests for a cohort of users with set-based statements.
+    `choose(period, now)` returns one user's new quests for a period
+    (QuestEngine.choose_now).
+
+    For each period this issues one DELETE ... WHERE type=? AND user_id IN (...),
+    one executemany INSERT of the chosen pool rows and one UPDATE of the
+    period's last_*_quest column. Only users whose period has expired are
+    touched unless `force` is set. When a `Stats` model is given, its
+    completed_quests counter is decremented by the completed quests being
+    deleted. `extra_values` are set on each touched user by the same UPDATE
+    (e.g. {"data_version": User.data_version + 1}). Returns counters
+    including rows/sec.
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    result = {"users": 0, "user_ids": [], "deleted": 0, "inserted": 0}
+    if not user_ids:
+        result.update(seconds=0.0, rows_per_sec=0.0)
+        return result
+
+    users = db.session.execute(
+        db.select(
+            User.id,
+            User.height_cm,
+            User.weight_kg,
+            User.last_daily_quest,
+            User.last_weekly_quest,
+            User.last_monthly_quest,
+        ).where(User.id.in_(user_ids))
+    ).all()
+
+    touched = set()
+    for period, column in PERIOD_COLUMNS.items():
+        cutoff = now - timedelta(seconds=regen[period])
+        due = [u for u in users if force or getattr(u, column) is None or getattr(u, column) <= cutoff]
+        if not due:
+            continue
+        ids = [u.id for u in due]
+
+        if Stats is not None:
+            done = (
+                db.select(func.count())
+                .where(Quest.user_id == Stats.user_id, Quest.type == period, Quest.completed.is_(True))
+                .scalar_subquery()
+            )
+            db.session.execute(
+                update(Stats)
+                .where(Stats.user_id.in_(ids))
+                .values(completed_quests=Stats.completed_quests - done)
+                .execution_options(synchronize_session=False)
+            )
+
+        deleted = db.session.execute(delete(Quest).where(Quest.type == period, Quest.user_id.in_(ids)))
+        result["deleted"] += deleted.rowcount or 0
+
+        rows = []
+        for u in due:
+            chosen = choose(period, now)
+            rows.extend(_quest_row(u.id, q, period, now) for q in chosen)
+            if period == "daily":
+                extra = bmi_quest(u.height_cm, u.weight_kg)
+                if extra and extra["title"] not in {q["title"] for q in chosen}:
+                    rows.append(_quest_row(u.id, extra, period, now))
+        if rows:
+            db.session.execute(insert(Quest), rows)
+            result["inserted"] += len(rows)
+
+        db.session.execute(update(User).where(User.id.in_(ids)).values({column: now, **(extra_values or {})}))
+        touched.update(ids)
+
+    if commit:
+        db.session.commit()
+
+    seconds = time.perf_counter() - started
+    result["users"] = len(touched)
+    result["user_ids"] = sorted(touched)
+    result["seconds"] = round(seconds, 3)
+    result["rows_per_sec"] = round((result["deleted"] + result["inserted"]) / seconds, 1) if seconds else 0.0
+    return result
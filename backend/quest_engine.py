@@ -0,0 +1,144 @@
+# backend/quest_engine.py
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+from backend.quest_stateless import period_number
+
+# ---------- CONFIG ----------
+DEFAULT_POOLS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quest_pools.json")
+DEFAULT_CHECK_INTERVAL = 2.0  # seconds between checks of the pools file's mtime
+# each_category: `count` quests from every category; rotate: `count` from the category
+# whose turn it is this period (physical -> mental -> financial -> ...); any: `count` from the whole pool
+SELECT_MODES = ("each_category", "rotate", "any")
+
+PeriodPool = namedtuple("PeriodPool", "select count categories by_category everything")
+
+
+# ---------- COMPILING ----------
+def compile_pools(data):
+    """
+    Validate the parsed pools file and precompile it into
+    {period: PeriodPool}: fully populated quest dicts in per-category
+    tuples, so choosing a quest is a single index.
+    """
+    compiled = {}
+    for period, spec in data.items():
+        select = spec.get("select", "any")
+        if select not in SELECT_MODES:
+            raise ValueError(f"{period}: select must be one of {', '.join(SELECT_MODES)}")
+        count = int(spec.get("count", 1))
+        if count < 1:
+            raise ValueError(f"{period}: count must be at least 1")
+        by_category = {}
+        for category, quests in spec.get("categories", {}).items():
+            rows = tuple(
+                {
+                    "title": q["title"],
+                    "category": category,
+                    "type": period,
+                    "difficulty": q.get("difficulty", "Medium"),
+                    "xp": int(q.get("xp", 10)),
+                }
+                for q in quests
+            )
+            if rows:
+                by_category[category] = rows
+        if not by_category:
+            raise ValueError(f"{period}: no quests")
+        categories = tuple(by_category)
+        everything = tuple(q for c in categories for q in by_category[c])
+        compiled[period] = PeriodPool(select, count, categories, by_category, everything)
+    return compiled
+
+
+def _pick(rows, count, rng):
+    if count == 1:
+        return [rows[rng.randrange(len(rows))]]
+    if len(rows) <= count:
+        return list(rows)
+    return rng.sample(rows, count)
+
+
+# ---------- ENGINE ----------
+class QuestEngine:
+    """
+    The one source of quest pools for stored and stateless quests alike.
+    Pools, per-period counts and the category rotation are read from a
+    JSON file and precompiled at startup. The file is re-checked at most
+    every `check_interval` seconds and recompiled when its mtime or size
+    changes; a broken edit is logged and the previous pools stay in use.
+    `version` increases on every reload so derived caches can key on it.
+    """
+
+    def __init__(self, path=DEFAULT_POOLS_FILE, regen=None, check_interval=DEFAULT_CHECK_INTERVAL, logger=None):
+        self.path = path
+        self.regen = regen
+        self.check_interval = check_interval
+        self.logger = logger or logging.getLogger("sam.quests")
+        self.version = 0
+        self._pools = {}
+        self._stamp = None
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.reload()  # a broken file fails at startup, not on first use
+
+    def reload(self):
+        """Recompile the pools if the file changed since the last load; True when new pools were installed."""
+        with self._lock:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp  # don't retry a broken file until it changes again
+            with open(self.path, encoding="utf-8") as f:
+                self._pools = compile_pools(json.load(f))
+            self.version += 1
+            return True
+
+    def refresh(self):
+        """Pick up file changes if the check interval has passed; returns the current version."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                if self.reload():
+                    self.logger.info("Reloaded quest pools from %s (version %s)", self.path, self.version)
+            except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                self.logger.error("Keeping the previous quest pools, %s is invalid: %s", self.path, e)
+        return self.version
+
+    @property
+    def pools(self):
+        self.refresh()
+        return self._pools
+
+    def choose(self, period, number, rng=random):
+        """Quests for one user's `number`-th `period` (see quest_stateless.period_number)."""
+        pool = self.pools.get(period)
+        if pool is None:
+            return []
+        if pool.select == "each_category":
+            return [q for c in pool.categories for q in _pick(pool.by_category[c], pool.count, rng)]
+        if pool.select == "rotate":
+            category = pool.categories[number % len(pool.categories)]
+            return _pick(pool.by_category[category], pool.count, rng)
+        return _pick(pool.everything, pool.count, rng)
+
+    def choose_now(self, period, now=None, rng=random):
+        return self.choose(period, period_number(period, self.regen, now), rng)
+
+    def describe(self):
+        """{period: {"select", "count", "categories": {category: number of quests}}} for the loaded pools."""
+        return {
+            period: {
+                "select": pool.select,
+                "count": pool.count,
+                "categories": {c: len(pool.by_category[c]) for c in pool.categories},
+            }
+            for period, pool in self.pools.items()
+        }
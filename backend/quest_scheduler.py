@@ -0,0 +1,168 @@
+# backend/quest_scheduler.py
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, or_, select, union, update
+from sqlalchemy.exc import IntegrityError
+
+# ---------- CONFIG ----------
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INTERVAL = 60  # seconds between in-process sweeps
+DEFAULT_LEASE = 300  # seconds the sweeping process keeps the sweep after its last batch
+SWEEP_LEASE = "quests.sweep"
+
+
+# ---------- QUERIES ----------
+def expired_user_ids(db, User, regen, now=None, after_id=0, limit=DEFAULT_BATCH_SIZE):
+    """
+    Return up to `limit` ids of users (id > after_id) whose daily, weekly or
+    monthly quests are missing or older than their regen window.
+
+    One SELECT per period, UNIONed: each reads only the expired range of its
+    last_*_quest index (NULLs sort first), so a sweep with nothing to do
+    touches no user rows. A single OR across the three columns can't use
+    them and walks the primary key instead.
+    """
+    now = now or datetime.utcnow()
+    selects = []
+    for period, column in (
+        ("daily", User.last_daily_quest),
+        ("weekly", User.last_weekly_quest),
+        ("monthly", User.last_monthly_quest),
+    ):
+        cutoff = now - timedelta(seconds=regen[period])
+        selects.append(select(User.id).where(User.id > after_id, or_(column.is_(None), column <= cutoff)))
+    expired = union(*selects).subquery()
+    return db.session.execute(select(expired.c.id).order_by(expired.c.id).limit(limit)).scalars().all()
+
+
+# ---------- LEASE ----------
+def holder_id():
+    """This process, as a lease holder (read per call: workers forked after import get their own pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(db, Lease, name, holder=None, ttl=DEFAULT_LEASE, now=None):
+    """
+    Take or renew the lease `name` for `holder` until now + ttl, and commit.
+    Returns False while another holder's lease is unexpired. The holder
+    keeps renewing it, so of several processes trying every interval one
+    does the work and the others' attempts are a single no-op UPDATE.
+    """
+    now = now or datetime.utcnow()
+    values = {"holder": holder or holder_id(), "expires_at": now + timedelta(seconds=ttl)}
+    taken = db.session.execute(
+        update(Lease).where(Lease.name == name, or_(Lease.holder == values["holder"], Lease.expires_at <= now)).values(values)
+    ).rowcount
+    if not taken:
+        if db.session.execute(select(Lease.name).where(Lease.name == name)).first() is not None:
+            db.session.rollback()
+            return False
+        try:
+            db.session.execute(insert(Lease).values(name=name, **values))
+        except IntegrityError:  # another process created it first
+            db.session.rollback()
+            return False
+    db.session.commit()
+    return True
+
+
+def release_lease(db, Lease, name, holder=None):
+    """Give up `name` if `holder` has it, and commit (one-shot sweeps, so the next one needn't wait out the ttl)."""
+    db.session.execute(delete(Lease).where(Lease.name == name, Lease.holder == (holder or holder_id())))
+    db.session.commit()
+
+
+# ---------- SWEEP ----------
+def sweep_result(users=0, batches=0, rows=0, seconds=0.0, leased=True):
+    return {
+        "users": users,
+        "batches": batches,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else 0.0,
+        "leased": leased,
+    }
+
+
+def regenerate_expired(db, User, regen, generate, batch_size=DEFAULT_BATCH_SIZE, now=None, lease=None):
+    """
+    Walk all users with expired quests in id order, `batch_size` at a time,
+    and call `generate(user_ids, now)` for each batch. `generate` is expected
+    to commit once per batch and may return a dict with "inserted"/"deleted"
+    row counts, which are summed into the result along with rows/sec.
+
+    `lease() -> bool` is taken before each batch; the sweep stops as soon as
+    it is refused ("leased" is False if that happens before the first batch).
+    """
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    after_id = 0
+    users = batches = rows = 0
+
+    while True:
+        if lease is not None and not lease():
+            if not batches:
+                return sweep_result(leased=False)
+            break
+        ids = expired_user_ids(db, User, regen, now=now, after_id=after_id, limit=batch_size)
+        if not ids:
+            break
+        stats = generate(ids, now)
+        if isinstance(stats, dict):
+            rows += stats.get("inserted", 0) + stats.get("deleted", 0)
+        users += len(ids)
+        batches += 1
+        after_id = ids[-1]
+        if len(ids) < batch_size:
+            break
+
+    return sweep_result(users, batches, rows, time.perf_counter() - started)
+
+
+# ---------- IN-PROCESS MODE ----------
+class QuestScheduler:
+    """Daemon thread that runs `regenerate_expired` every `interval` seconds."""
+
+    def __init__(self, app, sweep, interval=DEFAULT_INTERVAL):
+        self.app = app
+        self.sweep = sweep
+        self.interval = interval
+        self.last_result = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="quest-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def nudge(self):
+        """Run the next sweep now instead of waiting for the interval."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.last_result = self.sweep()
+            except Exception as e:
+                self.app.logger.exception("Quest scheduler sweep failed: %s", e)
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,107 @@
+# backend/quest_stateless.py
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from backend.quest_bulk import bmi_quest
+
+# ---------- CONFIG ----------
+EPOCH = datetime(1970, 1, 1)
+PERIOD_CODES = {"daily": 1, "weekly": 2, "monthly": 3}
+CODE_PERIODS = {code: period for period, code in PERIOD_CODES.items()}
+SLOTS = 16  # max quests per period (pool picks + BMI quest)
+DEFAULT_CACHE_SIZE = 4096
+
+ActiveQuest = namedtuple("ActiveQuest", "id title category type difficulty xp completed created_at")
+
+
+# ---------- QUEST KEYS ----------
+def period_number(period, regen, now=None):
+    """Index of the current period since the epoch, e.g. days since 1970 for daily quests."""
+    now = now or datetime.utcnow()
+    return int((now - EPOCH).total_seconds() // regen[period])
+
+
+def quest_key(period, number, slot):
+    """Pack (period, period number, slot) into the integer id exposed as quest.id."""
+    return (number * 4 + PERIOD_CODES[period]) * SLOTS + slot
+
+
+def decode_quest_key(key):
+    """Inverse of quest_key: returns (period, number, slot) or None for a malformed id."""
+    if key is None or key < 0:
+        return None
+    slot = key % SLOTS
+    period = CODE_PERIODS.get((key // SLOTS) % 4)
+    if period is None:
+        return None
+    return period, key // (SLOTS * 4), slot
+
+
+# ---------- ASSIGNMENT ----------
+class StatelessQuests:
+    """
+    Computes each user's active quests as a pure function of the quest
+    engine's pools, the period number and BMI. Nothing is stored per
+    period; only completions are persisted by the caller.
+    """
+
+    def __init__(self, engine, regen, cache_size=DEFAULT_CACHE_SIZE):
+        self.engine = engine
+        self.regen = regen
+        self._assign = lru_cache(maxsize=cache_size)(self._compute)
+
+    def _compute(self, user_id, period, number, height_cm, weight_kg, pools_version):
+        # pools_version is only part of the cache key, so reloaded pools take effect immediately
+        chosen = list(self.engine.choose(period, number, random.Random(f"{user_id}:{period}:{number}")))
+        if period == "daily":
+            extra = bmi_quest(height_cm, weight_kg)
+            if extra and extra["title"] not in {q["title"] for q in chosen}:
+                chosen.append(extra)
+
+        created_at = EPOCH + timedelta(seconds=number * self.regen[period])
+        return tuple(
+            ActiveQuest(
+                id=quest_key(period, number, slot),
+                title=q["title"],
+                category=q.get("category", "General"),
+                type=q.get("type", period),
+                difficulty=q.get("difficulty", "Medium"),
+                xp=q.get("xp", 10),
+                completed=False,
+                created_at=created_at,
+            )
+            for slot, q in enumerate(chosen[:SLOTS])
+        )
+
+    def active(self, user, period=None, now=None):
+        """Active quests for `user` (needs id, height_cm, weight_kg), newest period first."""
+        periods = [period] if period else list(PERIOD_CODES)
+        version = self.engine.refresh()
+        quests = []
+        for p in periods:
+            number = period_number(p, self.regen, now)
+            quests.extend(self._assign(user.id, p, number, user.height_cm, user.weight_kg, version))
+        return sorted(quests, key=lambda q: (q.created_at, q.id), reverse=True)
+
+    def find(self, user, key, now=None):
+        """Return the active quest with id `key`, or None if it is unknown or its period has ended."""
+        decoded = decode_quest_key(key)
+        if decoded is None:
+            return None
+        period, number, _slot = decoded
+        if number != period_number(period, self.regen, now):
+            return None
+        for q in self._assign(user.id, period, number, user.height_cm, user.weight_kg, self.engine.refresh()):
+            if q.id == key:
+                return q
+        return None
+
+    def cache_info(self):
+        return self._assign.cache_info()
+
+
+def mark_completed(quests, completed_keys):
+    """Return `quests` with `completed` set for ids in `completed_keys`."""
+    return [q._replace(completed=True) if q.id in completed_keys else q for q in quests]
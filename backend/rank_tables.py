@@ -0,0 +1,50 @@
+# backend/rank_tables.py
+from bisect import bisect_right
+
+try:  # optional: vectorized lookups for the batch recompute
+    import numpy
+except ImportError:
+    numpy = None
+
+UNRANKED = "Unranked"
+
+
+class RankTables:
+    """
+    Precomputed bisect tables for rank tiers and level thresholds.
+    `ranks` is [(name, low, high), ...] with contiguous ranges in ascending
+    order; `level_thresholds` are the points needed for level 2, 3, ...
+    """
+
+    def __init__(self, ranks, level_thresholds):
+        self.rank_floors = [low for _name, low, _high in ranks]
+        self.rank_names = [name for name, _low, _high in ranks]
+        self.rank_ceiling = ranks[-1][2]
+        self.level_thresholds = list(level_thresholds)
+
+    # ---------- SINGLE LOOKUPS ----------
+    def rank(self, points):
+        if points < self.rank_floors[0] or points > self.rank_ceiling:
+            return UNRANKED
+        return self.rank_names[bisect_right(self.rank_floors, points) - 1]
+
+    def level(self, points):
+        return 1 + bisect_right(self.level_thresholds, points)
+
+    # ---------- BATCH LOOKUPS ----------
+    def ranks_and_levels(self, points):
+        """
+        Map a sequence of points to (ranks, levels) lists. Uses
+        numpy.searchsorted over the whole array when numpy is installed,
+        otherwise a bisect per value over the same tables.
+        """
+        if numpy is None:
+            return [self.rank(p) for p in points], [self.level(p) for p in points]
+
+        values = numpy.asarray(points, dtype=numpy.int64)
+        names = numpy.array(self.rank_names + [UNRANKED], dtype=object)
+        idx = numpy.searchsorted(numpy.asarray(self.rank_floors), values, side="right") - 1
+        out_of_range = (values < self.rank_floors[0]) | (values > self.rank_ceiling)
+        idx[out_of_range] = len(self.rank_names)
+        levels = 1 + numpy.searchsorted(numpy.asarray(self.level_thresholds), values, side="right")
+        return names[idx].tolist(), levels.tolist()
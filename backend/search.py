@@ -0,0 +1,186 @@
+# backend/search.py
+import re
+from html import escape
+
+from sqlalchemy import text
+
+# ---------- CONFIG ----------
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8  # words of a query that are used; the rest are ignored
+MIN_PREFIX = 2  # shorter trailing words match whole tokens only (the prefix index starts at 2)
+SNIPPET_TOKENS = 12
+# Sentinels that never occur in user text; swapped for <mark> after HTML-escaping
+MARK_OPEN, MARK_CLOSE = "\x02", "\x03"
+ELLIPSIS = "…"
+
+
+def _minutes(value):
+    """Stored 'YYYY-MM-DD HH:MM:SS.ffffff' -> 'YYYY-MM-DD HH:MM', like the other list views."""
+    return value[:16] if value else None
+
+
+# kind -> the indexed table, its (title, body) columns, their bm25 weights
+# and the extra columns returned with each hit (raw SQL values, converted
+# by the given function).
+# Each FTS table is external-content (it stores only the index, the text
+# stays in the source table) and keyed by the source row id; user_id is
+# indexed as a token so a user's hits come from intersecting posting lists.
+INDEXES = {
+    "task": {
+        "table": "task",
+        "columns": ("title", "description"),
+        "weights": (3.0, 1.0),
+        "extra": {"completed": bool, "created_at": _minutes},
+    },
+    "study_log": {
+        "table": "study_log",
+        "columns": ("subject", "notes"),
+        "weights": (2.0, 1.0),
+        "extra": {"duration": int, "created_at": _minutes},
+    },
+}
+KINDS = tuple(INDEXES)
+TOKENIZE = "unicode61 remove_diacritics 2"
+PREFIXES = "2 3"
+
+_TERM = re.compile(r"\w+\*?")
+
+
+def fts_table(kind):
+    return f"{INDEXES[kind]['table']}_fts"
+
+
+def available(conn):
+    """Full-text search needs SQLite's FTS5; other databases have no index."""
+    return conn.dialect.name == "sqlite"
+
+
+# ---------- SCHEMA ----------
+def _ddl(kind):
+    spec = INDEXES[kind]
+    table, fts = spec["table"], fts_table(kind)
+    title, body = spec["columns"]
+    new = f"new.id, new.{title}, new.{body}, new.user_id"
+    old = f"'delete', old.id, old.{title}, old.{body}, old.user_id"
+    columns = f"rowid, {title}, {body}, user_id"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({title}, {body}, user_id, "
+        f"content='{table}', content_rowid='id', tokenize='{TOKENIZE}', prefix='{PREFIXES}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}({columns}) VALUES ({new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, {columns}) VALUES ({old}); END",
+        # Only edits to indexed columns touch the index (completing a task doesn't)
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {title}, {body}, user_id ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, {columns}) VALUES ({old}); "
+        f"INSERT INTO {fts}({columns}) VALUES ({new}); END",
+    ]
+
+
+def create(conn):
+    """Create the FTS tables and the triggers that keep them in sync, then index existing rows."""
+    if not available(conn):
+        return
+    for kind in KINDS:
+        for statement in _ddl(kind):
+            conn.execute(text(statement))
+    rebuild(conn)
+
+
+def drop_triggers(conn):
+    """Stop indexing row by row before a bulk load; create() restores the triggers and re-indexes."""
+    if not available(conn):
+        return
+    for kind in KINDS:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {fts_table(kind)}_{suffix}"))
+
+
+def rebuild(conn, kinds=KINDS):
+    """Re-index every row from the source tables (after bulk loads that bypassed the triggers)."""
+    for kind in kinds:
+        fts = fts_table(kind)
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def optimize(conn, kinds=KINDS):
+    """Merge each index's segments into one so queries read a single b-tree per term."""
+    for kind in kinds:
+        fts = fts_table(kind)
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('optimize')"))
+
+
+# ---------- QUERIES ----------
+def match_expression(query, user_id, kind):
+    """
+    FTS5 MATCH expression for free text typed by a user, or None if it has
+    no words. Every word must match (in either column); each is quoted so
+    FTS5 syntax in the input is inert. The last word, and any word written
+    with a trailing `*`, matches as a prefix, so results follow typing.
+    """
+    terms = _TERM.findall(query or "")[:MAX_TERMS]
+    if not terms:
+        return None
+    phrases = []
+    for n, term in enumerate(terms):
+        word = term.rstrip("*")
+        prefix = term.endswith("*") or n == len(terms) - 1
+        phrases.append(f'"{word}"*' if prefix and len(word) >= MIN_PREFIX else f'"{word}"')
+    title, body = INDEXES[kind]["columns"]
+    return f'user_id : "{int(user_id)}" AND {{{title} {body}}} : ({" ".join(phrases)})'
+
+
+def _marked(value):
+    if value is None:
+        return None
+    return escape(value).replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>")
+
+
+def _search_kind(session, kind, expression, limit):
+    spec = INDEXES[kind]
+    fts = fts_table(kind)
+    extra = ", ".join(f"s.{c}" for c in spec["extra"])
+    marks = f"'{MARK_OPEN}', '{MARK_CLOSE}'"
+    title_weight, body_weight = spec["weights"]
+    # SQLite ranks every match by bm25 (more negative is better; the user_id
+    # column weighs nothing) and keeps the best `limit` before anything is
+    # highlighted or read from the source table.
+    sql = (
+        f"SELECT f.rowid AS id, f.title, f.snippet, f.rank, {extra} FROM ("
+        f"SELECT rowid, highlight({fts}, 0, {marks}) AS title, "
+        f"snippet({fts}, 1, {marks}, '{ELLIPSIS}', {SNIPPET_TOKENS}) AS snippet, "
+        f"bm25({fts}, {title_weight}, {body_weight}, 0.0) AS rank "
+        f"FROM {fts} WHERE {fts} MATCH :expression ORDER BY rank LIMIT :limit"
+        f") f JOIN {spec['table']} s ON s.id = f.rowid"
+    )
+    rows = session.execute(text(sql), {"expression": expression, "limit": limit}).mappings().all()
+    return [
+        {
+            "type": kind,
+            "id": row["id"],
+            "title": _marked(row["title"]),
+            "snippet": _marked(row["snippet"]) or None,
+            # Unrounded: FTS5 floors the idf of very common terms at 1e-6, so scores can be tiny
+            "score": -row["rank"],
+            **{c: convert(row[c]) for c, convert in spec["extra"].items()},
+        }
+        for row in rows
+    ]
+
+
+def search(session, user_id, query, kinds=KINDS, limit=DEFAULT_LIMIT):
+    """
+    The best `limit` hits for `user_id` across `kinds`: highest score
+    (negated bm25) first, newest first among equal scores. Titles and
+    snippets are HTML-escaped with the matches wrapped in <mark>.
+    """
+    hits = []
+    for kind in kinds:
+        expression = match_expression(query, user_id, kind)
+        if expression is None:
+            return []
+        hits.extend(_search_kind(session, kind, expression, limit))
+    hits.sort(key=lambda hit: hit["created_at"] or "", reverse=True)
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits[:limit]
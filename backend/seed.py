@@ -0,0 +1,216 @@
+# backend/seed.py
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, text
+
+from backend.quest_bulk import PERIOD_COLUMNS
+
+# ---------- CONFIG ----------
+DEFAULT_BATCH = 20000  # rows per executemany; one commit per batch
+DEFAULT_SKEW = 1.2  # Pareto alpha for per-user activity: lower = a few users own most rows
+HISTORY_DAYS = 365
+SEED_PASSWORD = "seed-password"  # every seeded user can log in with this
+
+TASK_TITLES = [
+    "Read chapter", "Gym session", "Pay bills", "Call mom", "Write report", "Practice DSA",
+    "Clean room", "Meditate", "Review notes", "Plan week", "Grocery run", "Fix bug",
+]
+SUBJECTS = ["Math", "Physics", "Chemistry", "Biology", "History", "CS", "English", "Economics"]
+FITNESS_LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+
+# ---------- HELPERS ----------
+def _batches(total, size):
+    done = 0
+    while done < total:
+        n = min(size, total - done)
+        yield n
+        done += n
+
+
+def _when(rng, now, days=HISTORY_DAYS):
+    return now - timedelta(seconds=rng.random() * days * 86400)
+
+
+class Seeder:
+    """
+    Bulk-loads realistic synthetic data through the models' tables with
+    executemany INSERTs, committing once per batch. Per-user activity follows
+    a Pareto distribution so a small share of users owns most tasks and
+    study logs, like real usage. Seeded users get explicit ids after the
+    current maximum, so seeding an existing database only appends.
+    """
+
+    def __init__(self, db, models, choose_quests, password_hash, ranks, skew=DEFAULT_SKEW, rng_seed=None, batch=DEFAULT_BATCH, echo=None):
+        self.db = db
+        self.User = models["User"]
+        self.Task = models["Task"]
+        self.StudyLog = models["StudyLog"]
+        self.Quest = models["Quest"]
+        self.Ledger = models.get("PointsLedger")
+        self.choose_quests = choose_quests  # (period, now, rng) -> quests, e.g. QuestEngine.choose_now
+        self.password_hash = password_hash
+        self.ranks = ranks  # points -> (rank, level)
+        self.skew = skew
+        self.rng = random.Random(rng_seed)
+        self.batch = batch
+        self.echo = echo or (lambda msg: None)
+        self.now = datetime.utcnow()
+        self.user_ids = []
+        self._cum_weights = None
+
+    def _bulk_session(self):
+        # A crash mid-seed only loses the seed itself, so skip fsyncs while loading
+        if self.db.engine.dialect.name == "sqlite":
+            self.db.session.execute(text("PRAGMA synchronous=OFF"))
+
+    def _insert(self, Model, rows):
+        self.db.session.execute(insert(Model), rows)
+        self.db.session.commit()
+
+    def _progress(self, label, done, total, started):
+        rate = done / (time.perf_counter() - started or 1e-9)
+        self.echo(f"  {label}: {done}/{total} ({rate:,.0f} rows/s)")
+
+    # ---------- USERS ----------
+    def users(self, total):
+        first = (self.db.session.execute(self.db.select(func.max(self.User.id))).scalar() or 0) + 1
+        started, done = time.perf_counter(), 0
+        for n in _batches(total, self.batch):
+            rows, ledger = [], []
+            for user_id in range(first + done, first + done + n):
+                points = int(self.rng.lognormvariate(4.5, 1.2))
+                rank, level = self.ranks(points)
+                rows.append(
+                    {
+                        "id": user_id,
+                        "username": f"seed{user_id}",
+                        "password": self.password_hash,
+                        "quote": "Stay focused. Keep leveling up.",
+                        "points": points,
+                        "rank": rank,
+                        "level": level,
+                        "age": self.rng.randint(16, 60),
+                        "height_cm": round(self.rng.gauss(170, 10), 1),
+                        "weight_kg": round(self.rng.gauss(70, 12), 1),
+                        "fitness_level": self.rng.choice(FITNESS_LEVELS),
+                    }
+                )
+                if self.Ledger is not None and points:
+                    ledger.append({"user_id": user_id, "amount": points, "source": "opening_balance", "created_at": self.now})
+            self.db.session.execute(insert(self.User), rows)
+            if ledger:
+                self.db.session.execute(insert(self.Ledger), ledger)
+            self.db.session.commit()
+            done += n
+            self._progress("users", done, total, started)
+        self.user_ids = list(range(first, first + total))
+        weights = [self.rng.paretovariate(self.skew) for _ in self.user_ids]
+        self._cum_weights = []
+        acc = 0.0
+        for w in weights:
+            acc += w
+            self._cum_weights.append(acc)
+        return total
+
+    def _owners(self, k):
+        return self.rng.choices(self.user_ids, cum_weights=self._cum_weights, k=k)
+
+    # ---------- ACTIVITY ----------
+    def tasks(self, total, completed_ratio=0.6, alarm_ratio=0.1):
+        started, done = time.perf_counter(), 0
+        for n in _batches(total, self.batch):
+            rows = []
+            for user_id in self._owners(n):
+                created = _when(self.rng, self.now)
+                completed = self.rng.random() < completed_ratio
+                alarm = None
+                if self.rng.random() < alarm_ratio:
+                    alarm = created + timedelta(hours=self.rng.randint(1, 24 * 14))
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "title": self.rng.choice(TASK_TITLES),
+                        "description": None,
+                        "completed": completed,
+                        "created_at": created,
+                        "alarm_time": alarm,
+                    }
+                )
+            self._insert(self.Task, rows)
+            done += n
+            self._progress("tasks", done, total, started)
+        return total
+
+    def study_logs(self, total):
+        started, done = time.perf_counter(), 0
+        for n in _batches(total, self.batch):
+            rows = []
+            for user_id in self._owners(n):
+                duration = self.rng.randint(10, 120)
+                ended = _when(self.rng, self.now)
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "subject": self.rng.choice(SUBJECTS),
+                        "duration": duration,
+                        "notes": None,
+                        "started_at": ended - timedelta(minutes=duration),
+                        "ended_at": ended,
+                        "created_at": ended,
+                    }
+                )
+            self._insert(self.StudyLog, rows)
+            done += n
+            self._progress("study_logs", done, total, started)
+        return total
+
+    def quests(self, completed_ratio=0.3):
+        """One current set of quests per seeded user and period, marking last_*_quest as now."""
+        started, done, buffered = time.perf_counter(), 0, []
+        for user_id in self.user_ids:
+            for period in PERIOD_COLUMNS:
+                for q in self.choose_quests(period, self.now, self.rng):
+                    buffered.append(
+                        {
+                            "user_id": user_id,
+                            "title": q["title"],
+                            "category": q.get("category", "General"),
+                            "type": period,
+                            "difficulty": q.get("difficulty", "Medium"),
+                            "xp": q.get("xp", 10),
+                            "completed": self.rng.random() < completed_ratio,
+                            "created_at": self.now,
+                        }
+                    )
+            if len(buffered) >= self.batch:
+                self._insert(self.Quest, buffered)
+                done += len(buffered)
+                buffered = []
+                self._progress("quests", done, "?", started)
+        if buffered:
+            self._insert(self.Quest, buffered)
+            done += len(buffered)
+        if self.user_ids:
+            self.db.session.execute(
+                self.db.update(self.User)
+                .where(self.User.id.between(self.user_ids[0], self.user_ids[-1]))
+                .values(last_daily_quest=self.now, last_weekly_quest=self.now, last_monthly_quest=self.now)
+            )
+            self.db.session.commit()
+        return done
+
+    def run(self, users, tasks, study_logs, quests=True):
+        """Seed everything; returns {table: rows} and overall rows/sec."""
+        self._bulk_session()
+        started = time.perf_counter()
+        result = {"users": self.users(users)}
+        result["tasks"] = self.tasks(tasks) if tasks and users else 0
+        result["study_logs"] = self.study_logs(study_logs) if study_logs and users else 0
+        result["quests"] = self.quests() if quests else 0
+        seconds = time.perf_counter() - started
+        result["seconds"] = round(seconds, 2)
+        result["rows_per_sec"] = round(sum(v for k, v in result.items() if k != "seconds") / seconds, 1) if seconds else 0.0
+        return result
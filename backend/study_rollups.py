@@ -0,0 +1,125 @@
+# backend/study_rollups.py
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert
+
+from backend.db_engine import conflict_insert
+
+# ---------- CONFIG ----------
+GROUPS = ("day", "week", "subject")
+DEFAULT_RANGE_DAYS = 30
+
+
+# ---------- TIMESTAMPS ----------
+def parse_timestamp(value):
+    """
+    Parse an ISO-8601 session bound as sent by the browser
+    (e.g. "2025-01-31T09:15:00.000Z") into a naive UTC datetime, the same
+    convention as the created_at columns. Returns None for blank or
+    unparseable values.
+    """
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        value = (value or "").strip()
+        if not value:
+            return None
+        if value.endswith(("Z", "z")):
+            value = value[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def session_day(log):
+    """The UTC day a study session is counted on: when it started, else when it was logged."""
+    return (log.started_at or log.created_at or datetime.utcnow()).date()
+
+
+def parse_day(value, default):
+    """YYYY-MM-DD -> date; raises ValueError on malformed input."""
+    if not value:
+        return default
+    return date.fromisoformat(value)
+
+
+# ---------- INCREMENTAL UPDATES ----------
+def _add(db, Model, keys, sessions, minutes):
+    # One upsert rather than UPDATE-then-INSERT: two first writes to the same
+    # row (e.g. two sessions logged at once) add up instead of colliding
+    db.session.execute(
+        conflict_insert(db, Model)
+        .values(sessions=sessions, minutes=minutes, **keys)
+        .on_conflict_do_update(
+            index_elements=list(keys),
+            set_={"sessions": Model.sessions + sessions, "minutes": Model.minutes + minutes},
+        )
+    )
+
+
+def apply(db, Daily, Subject, log, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) one StudyLog from the daily and
+    per-subject rollups in the caller's transaction.
+    """
+    day = session_day(log)
+    sessions, minutes = sign, sign * (log.duration or 0)
+    _add(db, Daily, {"user_id": log.user_id, "day": day}, sessions, minutes)
+    _add(db, Subject, {"user_id": log.user_id, "day": day, "subject": log.subject}, sessions, minutes)
+
+
+def rebuild(db, StudyLog, Daily, Subject, user_ids=None):
+    """Recompute both rollup tables from study_log with one GROUP BY each (no commit)."""
+    day = func.date(func.coalesce(StudyLog.started_at, StudyLog.created_at))
+    for Model, columns, keys in (
+        (Daily, [StudyLog.user_id, day], ["user_id", "day"]),
+        (Subject, [StudyLog.user_id, day, StudyLog.subject], ["user_id", "day", "subject"]),
+    ):
+        wipe = delete(Model)
+        source = db.select(*columns, func.count(), func.coalesce(func.sum(StudyLog.duration), 0)).group_by(*columns)
+        if user_ids is not None:
+            wipe = wipe.where(Model.user_id.in_(user_ids))
+            source = source.where(StudyLog.user_id.in_(user_ids))
+        db.session.execute(wipe)
+        db.session.execute(insert(Model).from_select(keys + ["sessions", "minutes"], source))
+
+
+# ---------- QUERIES ----------
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def summarize(db, Daily, Subject, user_id, start, end, group):
+    """
+    Buckets for `user_id` between `start` and `end` (inclusive dates), read
+    only from the rollup tables: one indexed range scan over at most one row
+    per day (or per day and subject), folded into the requested buckets.
+    """
+    if group == "subject":
+        rows = db.session.execute(
+            db.select(Subject.subject, func.sum(Subject.sessions), func.sum(Subject.minutes))
+            .where(Subject.user_id == user_id, Subject.day >= start, Subject.day <= end)
+            .group_by(Subject.subject)
+            .having(func.sum(Subject.sessions) > 0)
+            .order_by(func.sum(Subject.minutes).desc(), Subject.subject)
+        ).all()
+        return [{"subject": s, "sessions": int(n), "minutes": int(m)} for s, n, m in rows]
+
+    rows = db.session.execute(
+        db.select(Daily.day, Daily.sessions, Daily.minutes)
+        .where(Daily.user_id == user_id, Daily.day >= start, Daily.day <= end, Daily.sessions > 0)
+        .order_by(Daily.day)
+    ).all()
+    if group == "day":
+        return [{"day": d.isoformat(), "sessions": n, "minutes": m} for d, n, m in rows]
+
+    weeks = {}
+    for d, n, m in rows:
+        bucket = weeks.setdefault(week_start(d), {"sessions": 0, "minutes": 0})
+        bucket["sessions"] += n
+        bucket["minutes"] += m
+    return [{"week": w.isoformat(), **totals} for w, totals in weeks.items()]
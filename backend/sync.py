@@ -0,0 +1,115 @@
+# backend/sync.py
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+# ---------- CONFIG ----------
+MAX_BATCH = 100  # mutations per request
+MAX_KEY_LENGTH = 64
+DEFAULT_KEY_TTL = 7 * 24 * 3600  # seconds a client key is remembered
+REF_SUFFIX = "_ref"  # args named like this hold the key of another mutation
+
+
+class SyncError(ValueError):
+    """The batch itself is malformed; nothing in it was applied."""
+
+
+class SyncOps:
+    """
+    Batch mutation engine for offline clients. Each item carries a
+    client-generated idempotency key; apply() runs new items in order in
+    the caller's transaction and stores a compact receipt of each result,
+    so a retried batch (or a key repeated within one) returns the stored
+    result instead of being applied twice.
+
+    Handlers are registered per op name and called as handler(args, refs),
+    where `refs` maps keys to their results: the keys already seen in this
+    batch plus any key named by a `*_ref` arg whose receipt is stored, so an
+    item can refer to a row created earlier (in this batch or a previous
+    one) before the client knows its server id.
+    """
+
+    def __init__(self):
+        self._ops = {}
+
+    def op(self, name):
+        def register(handler):
+            self._ops[name] = handler
+            return handler
+
+        return register
+
+    @property
+    def names(self):
+        return sorted(self._ops)
+
+    def validate(self, items, max_batch=MAX_BATCH):
+        """Check the shape of a batch before anything runs; raises SyncError."""
+        if not isinstance(items, list):
+            raise SyncError("mutations must be a list")
+        if len(items) > max_batch:
+            raise SyncError(f"at most {max_batch} mutations per batch")
+        for n, item in enumerate(items):
+            if not isinstance(item, dict):
+                raise SyncError(f"mutation {n} must be an object")
+            key = item.get("key")
+            if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+                raise SyncError(f"mutation {n}: key must be a non-empty string of at most {MAX_KEY_LENGTH} characters")
+            if item.get("op") not in self._ops:
+                raise SyncError(f"mutation {n}: op must be one of {', '.join(self.names)}")
+            if not isinstance(item.get("args", {}), dict):
+                raise SyncError(f"mutation {n}: args must be an object")
+            for name, value in item.get("args", {}).items():
+                if name.endswith(REF_SUFFIX) and value is not None and not isinstance(value, str):
+                    raise SyncError(f"mutation {n}: {name} must be the key of another mutation")
+        return items
+
+    def apply(self, db, Receipt, user_id, items, ttl=DEFAULT_KEY_TTL, now=None):
+        """
+        Apply validated `items` for `user_id` without committing and return
+        their results in order; replayed items are marked "replayed": true.
+        Inserting the receipts raises IntegrityError if a concurrent request
+        committed the same keys first, so the caller can roll back and retry.
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(seconds=ttl)
+        keys = list(dict.fromkeys(item["key"] for item in items))
+        referenced = {
+            value for item in items for name, value in item.get("args", {}).items() if name.endswith(REF_SUFFIX) and value
+        }
+        refs = {
+            key: json.loads(result)
+            for key, result in db.session.execute(
+                select(Receipt.key, Receipt.result).where(
+                    Receipt.user_id == user_id, Receipt.key.in_(referenced.union(keys)), Receipt.created_at >= cutoff
+                )
+            ).all()
+        }
+
+        results, receipts = [], []
+        for item in items:
+            key = item["key"]
+            if key in refs:
+                results.append({**refs[key], "key": key, "replayed": True})
+                continue
+            result = {"op": item["op"], **self._ops[item["op"]](item.get("args", {}), refs)}
+            refs[key] = result
+            receipts.append({"user_id": user_id, "key": key, "result": json.dumps(result, separators=(",", ":")), "created_at": now})
+            results.append({**result, "key": key})
+
+        if receipts:
+            # Expired receipts not purged yet would otherwise collide with the reused keys
+            db.session.execute(
+                delete(Receipt).where(
+                    Receipt.user_id == user_id, Receipt.key.in_([r["key"] for r in receipts]), Receipt.created_at < cutoff
+                )
+            )
+            db.session.execute(insert(Receipt), receipts)
+        return results
+
+
+def purge(db, Receipt, ttl=DEFAULT_KEY_TTL, now=None):
+    """Delete receipts older than `ttl` seconds (no commit); returns the number removed."""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=ttl)
+    return db.session.execute(delete(Receipt).where(Receipt.created_at < cutoff)).rowcount or 0
@@ -0,0 +1,88 @@
+# backend/uploads.py
+import hashlib
+import os
+import tempfile
+
+try:  # optional: thumbnails are skipped without Pillow and the original is served
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# ---------- CONFIG ----------
+CHUNK_SIZE = 64 * 1024
+THUMB_SIZE = 256
+THUMB_DIR = "thumbs"
+
+
+# ---------- CONTENT-ADDRESSED STORAGE ----------
+def save_upload(file_storage, folder, ext):
+    """
+    Stream an uploaded file to `folder` while hashing it and store it as
+    <sha256>.<ext>. Identical uploads map to the same key, so the second
+    copy is discarded instead of written. Returns the key (file name).
+    """
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        key = f"{digest.hexdigest()}.{ext.lower()}"
+        final_path = os.path.join(folder, key)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return key
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def thumbnail_keys(key, size=THUMB_SIZE):
+    """Variant keys (relative to the upload folder) for an original's key."""
+    stem = key.rsplit(".", 1)[0]
+    return {
+        "jpeg": f"{THUMB_DIR}/{stem}_{size}.jpg",
+        "webp": f"{THUMB_DIR}/{stem}_{size}.webp",
+    }
+
+
+def existing_thumbnails(folder, key, size=THUMB_SIZE):
+    """The variant keys for `key` if every variant is already on disk, else None."""
+    keys = thumbnail_keys(key, size)
+    if all(os.path.exists(os.path.join(folder, k)) for k in keys.values()):
+        return keys
+    return None
+
+
+def make_thumbnails(folder, key, size=THUMB_SIZE):
+    """
+    Write square JPEG and WebP thumbnails for `key`. Existing variants are
+    reused. Returns the variant keys, or None when Pillow is unavailable or
+    the image cannot be decoded.
+    """
+    if Image is None:
+        return None
+    existing = existing_thumbnails(folder, key, size)
+    if existing:
+        return existing
+    keys = thumbnail_keys(key, size)
+    paths = {fmt: os.path.join(folder, k) for fmt, k in keys.items()}
+
+    os.makedirs(os.path.join(folder, THUMB_DIR), exist_ok=True)
+    try:
+        with Image.open(os.path.join(folder, key)) as img:
+            img = ImageOps.exif_transpose(img)
+            thumb = ImageOps.fit(img.convert("RGB"), (size, size))
+    except (OSError, ValueError):
+        return None
+    thumb.save(paths["jpeg"], "JPEG", quality=85, optimize=True, progressive=True)
+    thumb.save(paths["webp"], "WEBP", quality=80)
+    return keys
@@ -0,0 +1,84 @@
+# backend/user_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+# ---------- CONFIG ----------
+DEFAULT_TTL = 30  # seconds; bounds staleness for changes made by other processes
+DEFAULT_MAXSIZE = 10000
+
+
+class UserCache:
+    """
+    Per-process TTL + LRU cache of user column snapshots keyed by id, used
+    by the login user loader so authenticated requests skip the per-request
+    SELECT. Entries are plain dicts, never ORM instances.
+
+    Writers call invalidate() after committing. A loader that missed reads
+    `version` before querying and passes it to put(); if any invalidation
+    happened in between, the possibly stale row is not cached.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # user_id -> (expires_at, snapshot)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, snapshot, version=None):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[user_id] = (self.clock() + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            self.version += 1
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.version += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,112 @@
+# backend/user_stats.py
+from sqlalchemy import func, update
+
+from backend.db_engine import conflict_insert
+
+# ---------- CONFIG ----------
+COUNTERS = ("completed_tasks", "completed_quests", "study_logs", "total_study_minutes")
+
+
+def _empty():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+# ---------- RECOMPUTE FROM BASE TABLES ----------
+def recompute(db, Task, StudyLog, QuestModel, quest_done=None, user_ids=None):
+    """
+    Recompute counters from the base tables with one GROUP BY per table.
+    `QuestModel`/`quest_done` select what counts as a completed quest
+    (Quest rows with completed=True, or QuestCompletion rows).
+    Returns {user_id: {counter: value}} for users with any activity.
+    """
+    result = {}
+
+    def merge(stmt, *keys):
+        if user_ids is not None:
+            stmt = stmt.where(stmt.selected_columns[0].in_(user_ids))
+        for row in db.session.execute(stmt):
+            counters = result.setdefault(row[0], _empty())
+            for key, value in zip(keys, row[1:]):
+                counters[key] = int(value or 0)
+
+    merge(db.select(Task.user_id, func.count()).where(Task.completed.is_(True)).group_by(Task.user_id), "completed_tasks")
+    quests = db.select(QuestModel.user_id, func.count())
+    if quest_done is not None:
+        quests = quests.where(quest_done)
+    merge(quests.group_by(QuestModel.user_id), "completed_quests")
+    merge(
+        db.select(StudyLog.user_id, func.count(), func.sum(StudyLog.duration)).group_by(StudyLog.user_id),
+        "study_logs",
+        "total_study_minutes",
+    )
+    return result
+
+
+# ---------- INCREMENTAL UPDATES ----------
+def bump(db, UserStats, user_id, counters_for, **deltas):
+    """
+    Add `deltas` to the user's stats row inside the caller's transaction.
+    If the row does not exist yet it is inserted from `counters_for(user_id)`
+    (pending changes are autoflushed first, so those counters already include
+    this change). Should a concurrent first write insert it in between, the
+    deltas are added to that row instead of failing on the primary key.
+    """
+    values = {key: getattr(UserStats, key) + delta for key, delta in deltas.items() if delta}
+    if not values:
+        return
+    result = db.session.execute(
+        update(UserStats).where(UserStats.user_id == user_id).values(values).execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return
+    counters = counters_for(user_id)
+    db.session.execute(
+        conflict_insert(db, UserStats)
+        .values(user_id=user_id, **{key: counters.get(key, 0) for key in COUNTERS})
+        .on_conflict_do_update(index_elements=["user_id"], set_=values)
+    )
+
+
+def load(db, UserStats, user_id, counters_for):
+    """
+    Return the stats row for `user_id`. A user without one gets an unsaved
+    row built from `counters_for(user_id)`: reads never write, and the first
+    `bump` stores it.
+    """
+    row = db.session.get(UserStats, user_id)
+    if row is None:
+        counters = counters_for(user_id)
+        row = UserStats(user_id=user_id, **{key: counters.get(key, 0) for key in COUNTERS})
+    return row
+
+
+def store_all(db, UserStats, expected, user_ids):
+    """Overwrite the stats rows of `user_ids` from `expected` with one SELECT for existing rows (no commit)."""
+    existing = {row.user_id: row for row in db.session.execute(db.select(UserStats)).scalars()}
+    for user_id in user_ids:
+        row = existing.get(user_id)
+        if row is None:
+            row = UserStats(user_id=user_id)
+            db.session.add(row)
+        counters = expected.get(user_id, {})
+        for key in COUNTERS:
+            setattr(row, key, counters.get(key, 0))
+
+
+# ---------- VERIFY ----------
+def verify(db, UserStats, expected, user_ids):
+    """
+    Compare stored rows against `expected` (from `recompute`) for `user_ids`.
+    Returns a list of (user_id, counter, stored, expected); a missing row is
+    reported with stored=None.
+    """
+    stored = {row.user_id: row for row in db.session.execute(db.select(UserStats)).scalars()}
+    drift = []
+    for user_id in user_ids:
+        want = expected.get(user_id, _empty())
+        row = stored.get(user_id)
+        for key in COUNTERS:
+            have = getattr(row, key) if row is not None else None
+            if have != want[key]:
+                drift.append((user_id, key, have, want[key]))
+    return drift
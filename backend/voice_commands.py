@@ -0,0 +1,77 @@
+# backend/voice_commands.py
+import re
+
+# ---------- CONFIG ----------
+# Placeholder types usable in patterns as {name:type}
+ARG_TYPES = {
+    "int": (r"\d+", int),
+    "word": (r"\S+", str),
+    "text": (r".+", str),
+}
+PLACEHOLDER = re.compile(r"\{(\w+):(\w+)\}")
+MAX_BATCH = 20  # utterances per request
+
+
+class CommandRegistry:
+    """
+    Voice command engine. Handlers register patterns such as
+    "complete task {task_id:int}"; all patterns are compiled once into a
+    single alternation regex, so a command is matched and its typed
+    arguments extracted in one pass. Earlier registrations win.
+
+    Pattern syntax: words are matched whole and separated by any
+    whitespace, the pattern is otherwise a regex fragment, a trailing " ..."
+    accepts any remainder, and contains=True matches the phrase anywhere in
+    the utterance (still on word boundaries, so "hi" does not match "this").
+    """
+
+    def __init__(self):
+        self._commands = {}  # group -> (handler, converters)
+        self._sources = []
+        self._regex = None
+
+    def command(self, pattern, contains=False):
+        def register(handler):
+            self._add(pattern, contains, handler)
+            return handler
+
+        return register
+
+    def _add(self, pattern, contains, handler):
+        group = f"c{len(self._commands)}"
+        converters = {}
+        rest = pattern.endswith(" ...")
+        if rest:
+            pattern = pattern[: -len(" ...")]
+
+        def placeholder(m):
+            name, kind = m.group(1), m.group(2)
+            regex, convert = ARG_TYPES[kind]
+            converters[name] = (f"{group}__{name}", convert)
+            return f"(?P<{group}__{name}>{regex})"
+
+        body = r"\s+".join(PLACEHOLDER.sub(placeholder, word) for word in pattern.split())
+        if contains:
+            body = rf".*?\b(?:{body})\b.*"
+        elif rest:
+            body = rf"{body}(?:\s+.*)?"
+        self._sources.append(f"(?P<{group}>{body})")
+        self._commands[group] = (handler, converters)
+        self._regex = None
+
+    def compile(self):
+        if self._regex is None:
+            self._regex = re.compile("|".join(self._sources), re.DOTALL)
+        return self._regex
+
+    def match(self, text):
+        """Return (handler, kwargs) for the first matching command, or (None, None)."""
+        m = self.compile().fullmatch(text)
+        if not m:
+            return None, None
+        handler, converters = self._commands[m.lastgroup]
+        return handler, {arg: convert(m.group(g)) for arg, (g, convert) in converters.items()}
+
+
+def normalize(command):
+    return " ".join((command or "").lower().split())
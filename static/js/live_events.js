@@ -0,0 +1,44 @@
+// live_events.js
+// Subscribes to /events (Server-Sent Events) and keeps the points badge in sync.
+// Every event is also re-dispatched on document as "sam:<event>" so pages can react
+// (e.g. document.addEventListener("sam:task_added", e => ...)) instead of polling.
+
+(function () {
+  if (!window.EventSource) return;
+
+  const EVENTS = [
+    "points",
+    "task_added",
+    "task_completed",
+    "task_deleted",
+    "quest_completed",
+    "quests_regenerated",
+    "study_logged",
+    "study_log_deleted",
+    "alarm",
+    "resync",
+  ];
+
+  const source = new EventSource("/events");
+
+  EVENTS.forEach(name => {
+    source.addEventListener(name, e => {
+      let data = {};
+      try {
+        data = JSON.parse(e.data);
+      } catch (err) {
+        console.error(err);
+      }
+      document.dispatchEvent(new CustomEvent(`sam:${name}`, { detail: data }));
+    });
+  });
+
+  document.addEventListener("sam:points", e => {
+    ["points", "points-display"].forEach(id => {
+      const el = document.getElementById(id);
+      if (el) el.textContent = e.detail.points;
+    });
+  });
+
+  window.addEventListener("beforeunload", () => source.close());
+})();
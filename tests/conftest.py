@@ -0,0 +1,70 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# The app reads its configuration at import time: point it at a scratch
+# database and keep every background thread off before importing it.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp(prefix="sam-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["QUEST_SCHEDULER"] = ""
+os.environ["ALARM_SCHEDULER"] = ""
+os.environ["JOBS_WORKER"] = "off"
+sys.path.insert(0, ROOT)
+
+import app as sam  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    sam.app.config.update(TESTING=True, UPLOAD_FOLDER=os.path.join(_TMP, "uploads"))
+    os.makedirs(sam.app.config["UPLOAD_FOLDER"], exist_ok=True)
+    with sam.app.app_context():
+        sam.migrations.upgrade(sam.db)
+    return sam.app
+
+
+@pytest.fixture
+def ctx(app):
+    """
+    An app context for tests that only touch the database. Don't issue
+    requests inside it: they would share its `g` (and the read-only routing
+    flag a GET view leaves there) instead of getting their own.
+    """
+    with app.app_context():
+        yield
+        sam.db.session.rollback()
+
+
+def register(client, username=None, password="pw", **data):
+    """Register and log in a fresh user; returns the username."""
+    username = username or f"u-{uuid.uuid4().hex[:10]}"
+    client.post("/register", data={"username": username, "password": password, **data})
+    client.post("/login", data={"username": username, "password": password})
+    return username
+
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as a new user (its username is on client.username)."""
+    c = app.test_client()
+    c.username = register(c)
+    return c
+
+
+def user_id(username):
+    with sam.app.app_context():
+        return sam.db.session.execute(sam.db.select(sam.User.id).where(sam.User.username == username)).scalar_one()
+
+
+def fetch(model, key):
+    """A detached, fully loaded row read in a context of its own."""
+    with sam.app.app_context():
+        row = sam.db.session.get(model, key)
+        if row is not None:
+            sam.db.session.expunge(row)
+        return row
@@ -0,0 +1,89 @@
+# tests/test_alarms.py
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from backend import alarms
+from conftest import ROOT, sam
+
+
+def test_import_does_not_start_the_scheduler(tmp_path):
+    env = {**os.environ, "ALARM_SCHEDULER": "inprocess", "DATABASE_URL": f"sqlite:///{tmp_path}/alarms.db"}
+    out = subprocess.run(
+        [sys.executable, "-c", "import app; print(app.alarm_scheduler.running)"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.split() == ["False"]
+
+
+def test_first_request_starts_the_scheduler(app, monkeypatch):
+    started = []
+    monkeypatch.setitem(app.config, "ALARM_SCHEDULER", "inprocess")
+    monkeypatch.setattr(sam.alarm_scheduler, "start", lambda: started.append(True))
+    app.test_client().get("/login")
+    assert started == [True]
+
+
+def _scheduler(load_window):
+    fired = []
+    scheduler = alarms.AlarmScheduler(sam.app, load_window, lambda user_id, alarm: fired.append(alarm["task_id"]), refresh=15)
+    return scheduler, fired
+
+
+def test_alarm_set_through_another_process_fires(app, client):
+    # This scheduler stands in for a second web process: the task is added
+    # through the app (whose own scheduler isn't running) after it loaded.
+    scheduler, fired = _scheduler(sam._load_alarm_window)
+    now = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    scheduler.tick(now)
+    due = now + timedelta(minutes=2)
+    client.post("/add_task", data={"title": "stretch", "time": due.strftime("%Y-%m-%dT%H:%M")})
+    task_id = client.get("/latest_task").get_json()["id"]
+
+    scheduler.tick(now + timedelta(seconds=20))  # refresh: picked up, not due yet
+    assert fired == []
+    scheduler.tick(due)
+    assert fired == [task_id]
+    scheduler.tick(due + timedelta(seconds=20))  # the next reload doesn't bring it back
+    assert fired == [task_id]
+
+
+def test_reload_catches_up_on_alarms_set_elsewhere_without_repeats():
+    t0 = datetime(2030, 1, 1, 9, 0)
+    rows = []
+    scheduler, fired = _scheduler(lambda start, end: [r for r in rows if start <= r[0] < end])
+    scheduler.tick(t0)
+    # Set through another process, due before this one's next refresh
+    rows.append((t0 + timedelta(seconds=5), 1, 1, "soon"))
+    scheduler.tick(t0 + timedelta(seconds=10))
+    assert fired == []
+    scheduler.tick(t0 + timedelta(seconds=15))  # refresh: fires late rather than never
+    assert fired == [1]
+
+    # Set here (and stored), fired here, then seen again by the next reload
+    rows.append((t0 + timedelta(seconds=20), 2, 1, "local"))
+    scheduler.schedule(2, 1, t0 + timedelta(seconds=20), "local")
+    scheduler.tick(t0 + timedelta(seconds=20))
+    scheduler.tick(t0 + timedelta(seconds=30))
+    scheduler.tick(t0 + timedelta(seconds=45))
+    assert fired == [1, 2]
+
+
+def test_local_changes_during_a_reload_are_kept():
+    t0 = datetime(2030, 1, 1, 9, 0)
+
+    def load_window(start, end):
+        # A request commits a new alarm (and the app schedules it) while the rows are read
+        scheduler.schedule(7, 1, t0 + timedelta(minutes=5), "meanwhile")
+        return []
+
+    scheduler, fired = _scheduler(load_window)
+    scheduler._window_end = scheduler._loaded_at = t0  # as after an earlier load
+    scheduler.tick(t0)
+    scheduler.tick(t0 + timedelta(minutes=5))
+    assert fired == [7]
@@ -0,0 +1,75 @@
+# tests/test_assets.py
+import gzip
+import os
+
+import pytest
+
+from conftest import sam
+
+SCRIPT = "js/quests.js"
+
+
+@pytest.fixture
+def manifest(monkeypatch, tmp_path):
+    """The app's manifest, with its compressed variants kept out of instance/."""
+    monkeypatch.setattr(sam.asset_manifest, "cache_folder", str(tmp_path))
+    return sam.asset_manifest
+
+
+def _source(filename):
+    with open(os.path.join(sam.app.static_folder, filename), "rb") as f:
+        return f.read()
+
+
+def _gunzip(path):
+    with open(path, "rb") as f:
+        return gzip.decompress(f.read())
+
+
+def _url(app, filename):
+    with app.test_request_context():
+        return sam.asset_url(filename)
+
+
+def test_fingerprinted_url_is_cached_forever_and_compressed(app, manifest):
+    url = _url(app, SCRIPT)
+    assert manifest.fingerprint(SCRIPT) in url
+    resp = app.test_client().get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Cache-Control"] == sam.assets.CACHE_FOREVER
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert gzip.decompress(resp.data) == _source(SCRIPT)
+
+
+def test_ranges_come_from_the_identity_encoding(app, manifest):
+    resp = app.test_client().get(_url(app, SCRIPT), headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert resp.status_code == 206
+    assert "Content-Encoding" not in resp.headers
+    assert resp.data == _source(SCRIPT)[:10]
+
+
+def test_stale_fingerprints_are_not_pinned(app, manifest):
+    resp = app.test_client().get(f"/assets/000000000000/{SCRIPT}")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+
+def test_paths_outside_static_are_refused(app, manifest):
+    client = app.test_client()
+    assert client.get("/assets/x/missing.js").status_code == 404
+    assert client.get("/assets/x/..%2Fapp.py").status_code == 404
+
+
+def test_fingerprint_and_variants_follow_content(tmp_path):
+    static, cache = tmp_path / "static", tmp_path / "cache"
+    static.mkdir()
+    (static / "app.js").write_text("one")
+    manifest = sam.assets.AssetManifest(str(static), str(cache))
+    before = manifest.fingerprint("app.js")
+    assert _gunzip(manifest.variant("app.js", "gzip")) == b"one"
+
+    (static / "app.js").write_text("two!")
+    assert manifest.fingerprint("app.js") != before
+    assert _gunzip(manifest.variant("app.js", "gzip")) == b"two!"
+    assert set(manifest.build()) == {"app.js"}
@@ -0,0 +1,28 @@
+# tests/test_benchmark.py
+from conftest import sam
+
+benchmark = sam.benchmark
+
+
+def test_the_journey_runs_clean_in_process(app):
+    rec, wall = benchmark.run(lambda: benchmark.TestClientDriver(app), journeys=3, concurrency=2)
+    summary = benchmark.summarize(rec, wall, 3, 2, "in-process")
+    assert summary["errors"] == 0, summary["routes"]
+    assert set(summary["routes"]) >= {"register", "login", "add_task", "complete_task", "complete_quest", "voice_command"}
+    assert all(route["count"] == 3 for route in summary["routes"].values())
+    assert summary["requests"] == sum(route["count"] for route in summary["routes"].values())
+    assert "requests in" in benchmark.format_report(summary)
+
+
+def test_percentiles_use_the_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert [benchmark.percentile(values, p) for p in (50, 95, 99, 100)] == [0.05, 0.095, 0.099, 0.1]
+    assert benchmark.percentile([], 95) == 0.0
+
+
+def test_compare_needs_both_the_ratio_and_the_noise_floor():
+    baseline = {"routes": {"slow": {"p95_ms": 10.0}, "tiny": {"p95_ms": 1.0}, "gone": {"p95_ms": 5.0}}}
+    current = {"routes": {"slow": {"p95_ms": 13.0}, "tiny": {"p95_ms": 2.5}}}
+    # tiny is 150% slower but only 1.5 ms; gone was not measured this time
+    assert benchmark.compare(current, baseline) == [("slow", 10.0, 13.0, 1.3)]
+    assert benchmark.compare(current, baseline, threshold=0.5) == []
@@ -0,0 +1,58 @@
+# tests/test_db_engine.py
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from conftest import sam
+
+db_engine = sam.db_engine
+
+
+def test_pragma_overrides():
+    pragmas = db_engine.parse_pragmas("busy_timeout=100, mmap_size=,cache_size = -2000")
+    assert pragmas["busy_timeout"] == "100"
+    assert pragmas["cache_size"] == "-2000"
+    assert "mmap_size" not in pragmas
+    assert pragmas["journal_mode"] == "WAL"
+    for bad in ("busy_timeout", "x;y=1"):
+        with pytest.raises(ValueError):
+            db_engine.parse_pragmas(bad)
+
+
+def test_engine_options_per_backend():
+    assert db_engine.engine_options("sqlite://") == {}
+    sqlite = db_engine.engine_options("sqlite:////tmp/x.db", pragmas={"busy_timeout": 2500})
+    assert sqlite["connect_args"] == {"timeout": 2.5, "check_same_thread": False}
+    assert db_engine.engine_options("postgresql://u@h/db")["pool_pre_ping"] is True
+
+
+def test_read_only_uri():
+    assert db_engine.read_only_uri("sqlite:////tmp/x.db") == "sqlite:///file:/tmp/x.db?mode=ro&uri=true"
+    assert db_engine.read_only_uri("sqlite://") is None
+    assert db_engine.read_only_uri("postgresql://u@h/db") is None
+
+
+def test_connections_are_tuned(ctx):
+    primary = db_engine.sqlite_settings(sam.db.engine)
+    assert primary["journal_mode"] == "wal"
+    assert primary["busy_timeout"] == 5000
+    assert primary["query_only"] == 0
+    read_only = db_engine.sqlite_settings(sam.db.engines[db_engine.READ_ONLY_BIND])
+    assert read_only["busy_timeout"] == 5000 and read_only["query_only"] == 1
+
+
+def test_read_only_views_read_through_the_read_only_pool(app):
+    with app.test_request_context():
+        read_only = sam.db.engines[db_engine.READ_ONLY_BIND]
+        assert sam.db.session.get_bind(mapper=sam.User) is sam.db.engine
+        db_engine.read_only(lambda: None)()
+        assert sam.db.session.get_bind(mapper=sam.User) is read_only
+        # Writes still go to the primary, even inside a read-only view
+        update = sam.db.update(sam.User).values(points=0)
+        assert sam.db.session.get_bind(mapper=sam.User, clause=update) is sam.db.engine
+        sam.db.session.remove()
+
+
+def test_the_read_only_pool_refuses_writes(ctx):
+    with pytest.raises(OperationalError):
+        with sam.db.engines[db_engine.READ_ONLY_BIND].begin() as conn:
+            conn.execute(sam.db.update(sam.User).values(points=sam.User.points))
@@ -0,0 +1,69 @@
+# tests/test_events.py
+import json
+
+from sqlalchemy.exc import OperationalError
+
+from conftest import sam, user_id
+
+
+def _drain(sub):
+    events = []
+    while not sub.queue.empty():
+        events.append(sub.queue.get_nowait())
+    return events
+
+
+def test_events_are_published_after_commit(client):
+    sub = sam.event_hub.subscribe(user_id(client.username))
+    try:
+        client.post("/add_task", data={"title": "live"})
+        task_id = client.get("/latest_task").get_json()["id"]
+        client.post(f"/complete_task/{task_id}")
+        events = _drain(sub)
+    finally:
+        sam.event_hub.unsubscribe(sub)
+    names = [name for name, _data in events]
+    assert names[0] == "task_added" and events[0][1]["title"] == "live"
+    assert "task_completed" in names and "points" in names
+
+
+def test_rolled_back_writes_publish_nothing(client, monkeypatch):
+    sub = sam.event_hub.subscribe(user_id(client.username))
+
+    def commit():
+        raise OperationalError("COMMIT", None, Exception("database is locked"))
+
+    try:
+        monkeypatch.setattr(sam.db.session, "commit", commit)
+        client.post("/voice_command", json={"command": "add task nothing"})
+        monkeypatch.undo()
+        client.get("/latest_task")  # a later commit must not flush the discarded events either
+        assert _drain(sub) == []
+    finally:
+        sam.event_hub.unsubscribe(sub)
+
+
+def test_stream_frames_and_subscriber_limit(client, monkeypatch):
+    uid = user_id(client.username)
+    resp = client.get("/events")
+    assert resp.mimetype == "text/event-stream"
+    frames = iter(resp.response)
+    assert next(frames) == b"retry: 5000\n\n"
+    sam.event_hub.publish(uid, "points", {"points": 5})
+    assert next(frames) == sam.events.format_event("points", {"points": 5}).encode()
+
+    monkeypatch.setattr(sam.event_hub, "max_per_user", 1)
+    assert client.get("/events").status_code == 429
+    resp.close()
+    assert not sam.event_hub.has_subscribers(uid)
+
+
+def test_a_slow_subscriber_is_told_to_resync():
+    hub = sam.events.EventHub(queue_size=3)
+    sub = hub.subscribe(1)
+    for n in range(5):
+        hub.publish(1, "points", {"points": n})
+    events = _drain(sub)
+    # 0-2 filled the queue, 3 found it full: the backlog was swapped for one resync
+    assert events == [("resync", {"dropped": 3}), ("points", {"points": 4})]
+    assert json.loads(sam.events.format_event(*events[0]).split("data: ")[1]) == {"dropped": 3}
@@ -0,0 +1,109 @@
+# tests/test_http_cache.py
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, register, sam, user_id
+
+
+def _build_id(cwd, db_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "PYTHONPATH": ROOT}
+    env.pop("APP_BUILD_ID", None)
+    out = subprocess.run(
+        [sys.executable, "-c", "import app; print(app.BUILD_ID)"], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    return out.stdout.strip()
+
+
+def test_build_id_covers_templates_from_any_working_directory(tmp_path):
+    assert _build_id(tmp_path, tmp_path / "a.db") == _build_id(ROOT, tmp_path / "b.db")
+
+
+def test_build_id_changes_with_files(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text("one")
+    before = sam.http_cache.build_id(str(tmp_path))
+    page.write_text("two!")
+    assert sam.http_cache.build_id(str(tmp_path)) != before
+
+
+def test_conditional_get_round_trip(client):
+    first = client.get("/tasks_list")
+    tag = first.headers["ETag"]
+    assert first.status_code == 200 and tag.startswith("W/")
+
+    again = client.get("/tasks_list", headers={"If-None-Match": tag})
+    assert again.status_code == 304 and again.headers["ETag"] == tag
+
+    client.post("/add_task", data={"title": "new"})
+    changed = client.get("/tasks_list", headers={"If-None-Match": tag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != tag
+    assert [t["title"] for t in changed.get_json()] == ["new"]
+
+
+def test_etags_are_per_user(app, client):
+    other = app.test_client()
+    register(other)
+    tag = client.get("/tasks_list").headers["ETag"]
+    assert other.get("/tasks_list", headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_etag_depends_on_the_query_string(client):
+    tag = client.get("/tasks_list").headers["ETag"]
+    assert client.get("/tasks_list?limit=5", headers={"If-None-Match": tag}).status_code == 200
+
+
+def _write_from_another_worker(username, title):
+    """Add a task the way another process would: its commit leaves this process's identity cache alone."""
+    uid = user_id(username)
+    with sam.app.app_context(), sam.db.engine.begin() as conn:
+        conn.execute(sam.db.insert(sam.Task).values(user_id=uid, title=title))
+        conn.execute(sam.db.update(sam.User).where(sam.User.id == uid).values(data_version=sam.User.data_version + 1))
+
+
+def test_validators_see_writes_from_other_workers(client):
+    tag = client.get("/tasks_list").headers["ETag"]
+    _write_from_another_worker(client.username, "elsewhere")
+    changed = client.get("/tasks_list", headers={"If-None-Match": tag})
+    assert changed.status_code == 200
+    assert [t["title"] for t in changed.get_json()] == ["elsewhere"]
+
+
+def test_fragments_see_writes_from_other_workers(client):
+    assert b"elsewhere" not in client.get("/tasks").data
+    _write_from_another_worker(client.username, "elsewhere")
+    assert b"elsewhere" in client.get("/tasks").data
+
+
+def test_fragments_rendered_after_a_commit_use_the_new_version(app, client):
+    """A request that reads the version, commits a change and then renders must not key on the old version."""
+    with app.test_request_context():
+        sam.login_user(sam.db.session.get(sam.User, user_id(client.username)))
+        before = sam.current_data_version()
+        sam.data_changed(sam.current_user.id)
+        sam.db.session.commit()
+        assert sam.current_data_version() == before + 1
+
+
+def test_fragments_are_reused_until_the_user_writes(client):
+    client.get("/tasks")
+    hits = sam.fragments.hits
+    assert client.get("/tasks").status_code == 200
+    assert sam.fragments.hits == hits + 1
+
+    client.post("/add_task", data={"title": "fresh"})
+    task_id = client.get("/latest_task").get_json()["id"]
+    assert b"fresh" in client.get("/tasks").data
+    client.post(f"/complete_task/{task_id}")
+    client.post(f"/delete_task/{task_id}")
+    assert b"fresh" not in client.get("/tasks").data
+
+
+def test_quest_board_fragment_follows_completions(client):
+    quest = client.get("/get_user_quests").get_json()[0]
+    marker = f'id="quest-{quest["id"]}"'.encode()
+    page = client.get("/quests").data
+    assert marker in page and b"quest-card completed" not in page
+    client.post("/complete_quest", json={"quest_id": quest["id"]})
+    assert b"quest-card completed" in client.get("/quests").data
@@ -0,0 +1,118 @@
+# tests/test_jobs.py
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import jobs
+from conftest import sam
+
+
+@pytest.fixture
+def queue(ctx):
+    """A queue over the app's job table, emptied first so only this test's jobs are due."""
+    sam.db.session.execute(sam.db.delete(sam.Job))
+    sam.db.session.commit()
+    q = jobs.JobQueue(sam.db, sam.Job, lease=60)
+    q.calls = []
+
+    @q.handler("test.ok")
+    def ok(n):
+        q.calls.append(n)
+
+    @q.handler("test.flaky", max_attempts=3)
+    def flaky():
+        raise RuntimeError("boom")
+
+    yield q
+    sam.db.session.execute(sam.db.delete(sam.Job))
+    sam.db.session.commit()
+
+
+def _job(job_id):
+    sam.db.session.expire_all()
+    return sam.db.session.get(sam.Job, job_id)
+
+
+def test_enqueue_with_a_key_is_idempotent(queue):
+    first = queue.enqueue("test.ok", {"n": 1}, key="k")
+    assert queue.enqueue("test.ok", {"n": 2}, key="k") == first
+    sam.db.session.commit()
+    assert sam.db.session.execute(sam.db.select(sam.db.func.count()).select_from(sam.Job)).scalar() == 1
+
+
+def test_run_one_passes_the_payload_and_marks_done(queue):
+    job_id = queue.enqueue("test.ok", {"n": 5})
+    sam.db.session.commit()
+    assert queue.run_one("w") == (job_id, jobs.DONE)
+    assert queue.calls == [5]
+    assert queue.run_one("w") is None
+
+
+def test_job_is_invisible_until_its_transaction_commits(queue):
+    queue.enqueue("test.ok", {"n": 1})
+    sam.db.session.rollback()
+    assert queue.run_one("w") is None
+
+
+def test_each_job_is_claimed_exactly_once(app, queue):
+    for n in range(20):
+        queue.enqueue("test.ok", {"n": n})
+    sam.db.session.commit()
+    claimed, errors = [], []
+
+    def worker(worker_id):
+        try:
+            with app.app_context():
+                while (job := queue.claim(worker_id)) is not None:
+                    claimed.append(job.id)
+        except Exception as e:  # surfaced below; a thread's exception is otherwise swallowed
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(claimed) == len(set(claimed)) == 20
+
+
+def test_failures_back_off_then_fail(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "backoff", lambda attempt: 30.0 * attempt)
+    job_id = queue.enqueue("test.flaky")
+    sam.db.session.commit()
+    for attempt in (1, 2):
+        before = datetime.utcnow()
+        assert queue.run_one("w") == (job_id, jobs.QUEUED)
+        job = _job(job_id)
+        assert job.attempts == attempt and "boom" in job.last_error
+        assert job.run_at >= before + timedelta(seconds=30.0 * attempt)
+        assert queue.run_one("w") is None  # not due yet
+        job.run_at = datetime.utcnow()
+        sam.db.session.commit()
+    assert queue.run_one("w") == (job_id, jobs.FAILED)
+    assert _job(job_id).attempts == 3
+
+    assert queue.retry([job_id]) == 1
+    sam.db.session.commit()
+    assert (_job(job_id).status, _job(job_id).attempts) == (jobs.QUEUED, 0)
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job_id = queue.enqueue("test.ok", {"n": 7})
+    sam.db.session.commit()
+    queue.claim("dead-worker")
+    now = datetime.utcnow()
+    assert queue.reclaim_expired(now=now + timedelta(seconds=30)) == 0
+    assert queue.reclaim_expired(now=now + timedelta(seconds=61)) == 1
+    job = queue.claim("w", now=now + timedelta(seconds=61))
+    assert (job.id, job.attempts) == (job_id, 2)
+
+
+def test_first_request_starts_the_worker(app, monkeypatch):
+    started = []
+    monkeypatch.setitem(app.config, "JOBS_WORKER", "inprocess")
+    monkeypatch.setattr(sam.job_worker, "start", lambda: started.append(True))
+    app.test_client().get("/login")
+    assert started == [True]
@@ -0,0 +1,66 @@
+# tests/test_leaderboard.py
+import random
+from bisect import bisect_left, bisect_right
+
+from conftest import sam, user_id
+
+from backend.leaderboard import Leaderboard, SortedKeys
+
+
+def test_sorted_keys_matches_a_sorted_list():
+    rng = random.Random(7)
+    keys, reference = SortedKeys(bucket_size=4), []
+    for _ in range(2000):
+        key = (rng.randrange(-50, 0), rng.randrange(200))
+        if reference and rng.random() < 0.4:
+            key = reference[rng.randrange(len(reference))]
+            keys.discard(key)
+            reference.remove(key)
+        elif key not in reference:
+            keys.add(key)
+            reference.append(key)
+            reference.sort()
+        probe = (rng.randrange(-50, 0), rng.randrange(200))
+        assert len(keys) == len(reference)
+        assert keys.bisect_left(probe) == bisect_left(reference, probe)
+        assert keys.bisect_right(probe) == bisect_right(reference, probe)
+        start = rng.randrange(len(reference) + 1)
+        assert keys.slice(start, start + 5) == reference[start : start + 5]
+
+
+def test_positions_stay_exact_across_bucket_splits_and_drops():
+    keys, reference = SortedKeys(bucket_size=2), []
+    for n, points in enumerate([5, 9, 1, 7, 3, 8, 2, 6, 4, 0, 9, 5]):
+        key = (-points, n)
+        keys.add(key)
+        reference = sorted(reference + [key])
+        assert [keys.bisect_left(k) for k in reference] == list(range(len(reference)))
+    assert len(keys._buckets) > 2  # split several times
+    for key in list(reference):
+        keys.discard(key)
+        reference.remove(key)
+        assert [keys.bisect_left(k) for k in reference] == list(range(len(reference)))
+        assert keys.slice(0, len(reference)) == reference
+    assert len(keys) == 0 and keys._buckets == []
+
+
+def test_rebuild_replays_updates_made_while_loading():
+    board = Leaderboard([("E", 0), ("D", 100)])
+    board.begin_rebuild()
+    board.update(1, 500)  # committed after the rebuild's SELECT read 1 -> 10
+    board.rebuild([(1, 10), (2, 50)])
+    assert board.top(2) == [
+        {"position": 1, "user_id": 1, "points": 500},
+        {"position": 2, "user_id": 2, "points": 50},
+    ]
+    assert board.tier_counts() == [("E", 1), ("D", 1)]
+
+
+def test_leaderboard_endpoint_sees_new_points(app, client):
+    uid = user_id(client.username)
+    client.post("/add_task", data={"title": "score"})
+    task_id = client.get("/latest_task").get_json()["id"]
+    client.post(f"/complete_task/{task_id}")
+    me = client.get("/leaderboard").get_json()["me"]
+    assert me["position"] == sam.ranking.position(uid)
+    assert me["points"] == sam.ranking._points[uid] > 0
@@ -0,0 +1,29 @@
+# tests/test_metrics.py
+import logging
+
+from backend import metrics
+
+
+def test_slow_query_log_has_parameter_types_not_values(caplog):
+    recorder = metrics.Metrics(slow_query_ms=1, logger=logging.getLogger("test.slow_query"))
+    with caplog.at_level(logging.WARNING, logger="test.slow_query"):
+        recorder.observe_query(0.5, "UPDATE user SET password=? WHERE id=?", ("scrypt:32768:8:1$secret", 7))
+        recorder.observe_query(0.5, "SELECT :name", {"name": "alice"})
+    text = caplog.text
+    assert "secret" not in text and "alice" not in text
+    assert "params=(str, int)" in text and "params={name: str}" in text
+
+
+def test_metrics_answers_local_requests_only(app):
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.9"}).status_code == 404
+
+
+def test_metrics_token_is_required_when_configured(app, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", "t0ken")
+    client = app.test_client()
+    remote = {"REMOTE_ADDR": "203.0.113.9"}
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer t0ken"}).status_code == 200
+    assert metrics.allowed_scrape("127.0.0.1", "Bearer nope", "t0ken") is False
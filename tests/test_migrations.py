@@ -0,0 +1,120 @@
+# tests/test_migrations.py
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from backend import migrations
+from conftest import ROOT
+
+BASELINE = os.path.join(ROOT, "instance", "Sam.db")
+LATEST = migrations.MIGRATIONS[-1][0]
+
+
+def _flask(db_path, *args):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "QUEST_SCHEDULER": "",
+        "ALARM_SCHEDULER": "",
+        "JOBS_WORKER": "off",
+    }
+    return subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+
+@pytest.fixture(scope="module")
+def upgraded(tmp_path_factory):
+    """A copy of the baseline database (the schema before any migration) after `flask db upgrade`."""
+    if not os.path.exists(BASELINE):
+        pytest.skip("no baseline database")
+    path = str(tmp_path_factory.mktemp("migrations") / "Sam.db")
+    shutil.copy(BASELINE, path)
+    with sqlite3.connect(BASELINE) as conn:
+        before = {t: conn.execute(f"SELECT * FROM {t} ORDER BY id").fetchall() for t in ("user", "task", "study_log")}
+    out = _flask(path, "db", "upgrade")
+    conn = sqlite3.connect(path)
+    yield path, before, out, conn
+    conn.close()
+
+
+def test_applies_every_migration(upgraded):
+    _path, _before, out, conn = upgraded
+    assert "Applied 1:" in out and f"Schema at version {LATEST}" in out
+    assert [v for (v,) in conn.execute("SELECT version FROM schema_version ORDER BY version")] == list(range(1, LATEST + 1))
+
+
+def test_keeps_existing_rows(upgraded):
+    _path, before, _out, conn = upgraded
+    columns = len(before["task"][0]) if before["task"] else 0
+    assert [row[:columns] for row in conn.execute("SELECT * FROM task ORDER BY id")] == before["task"]
+    assert conn.execute("SELECT id, username FROM user").fetchall() == [(u[0], u[1]) for u in before["user"]]
+    logs = conn.execute("SELECT id, user_id, subject, duration, notes FROM study_log ORDER BY id").fetchall()
+    assert logs == [row[:5] for row in before["study_log"]]
+
+
+def test_study_session_bounds_become_utc_datetimes(upgraded):
+    _path, _before, _out, conn = upgraded
+    for started, ended in conn.execute("SELECT started_at, ended_at FROM study_log"):
+        for value in (started, ended):
+            assert value is None or datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+
+
+def test_ledger_opens_at_current_points(upgraded):
+    _path, _before, _out, conn = upgraded
+    for user_id, points in conn.execute("SELECT id, COALESCE(points, 0) FROM user"):
+        total = conn.execute("SELECT COALESCE(SUM(amount), 0) FROM points_ledger WHERE user_id = ?", (user_id,)).fetchone()[0]
+        assert total == points
+
+
+def test_search_indexes_existing_rows(upgraded):
+    _path, _before, _out, conn = upgraded
+    for table in ("task", "study_log"):
+        indexed = conn.execute(f"SELECT COUNT(*) FROM {table}_fts WHERE {table}_fts MATCH 'user_id : \"1\"'").fetchone()[0]
+        assert indexed == conn.execute(f"SELECT COUNT(*) FROM {table} WHERE user_id = 1").fetchone()[0]
+
+
+def test_study_rollups_match_the_logs(upgraded):
+    _path, _before, _out, conn = upgraded
+    logged = conn.execute("SELECT COALESCE(SUM(duration), 0) FROM study_log").fetchone()[0]
+    assert conn.execute("SELECT COALESCE(SUM(minutes), 0) FROM study_daily").fetchone()[0] == logged
+
+
+def test_upgrade_is_idempotent(upgraded):
+    path, _before, _out, _conn = upgraded
+    out = _flask(path, "db", "upgrade")
+    assert "Applied" not in out and f"Schema at version {LATEST}" in out
+
+
+def test_quest_sweep_reads_the_period_indexes(upgraded):
+    path, _before, _out, _conn = upgraded
+    out = subprocess.run(
+        [sys.executable, "-c", _SWEEP_PLAN],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    for period in ("daily", "weekly", "monthly"):
+        assert f"ix_user_last_{period}_quest" in out
+    assert "SCAN user" not in out and "INTEGER PRIMARY KEY" not in out
+
+
+_SWEEP_PLAN = """
+from sqlalchemy import event
+import app as sam
+from backend import quest_scheduler
+with sam.app.app_context():
+    captured = []
+    event.listen(sam.db.engine, "before_cursor_execute", lambda *a: captured.append(a[2:4]))
+    quest_scheduler.expired_user_ids(sam.db, sam.User, sam.REGEN)
+    sql, params = captured[-1]
+    for row in sam.db.session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params):
+        print(row[-1])
+"""
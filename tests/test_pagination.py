@@ -0,0 +1,78 @@
+# tests/test_pagination.py
+from datetime import datetime, timedelta
+
+from conftest import sam, user_id
+
+
+def _add_tasks(username, created):
+    """Insert tasks titled 0..n-1 with the given created_at values (ties included)."""
+    uid = user_id(username)
+    with sam.app.app_context():
+        sam.db.session.execute(
+            sam.db.insert(sam.Task), [{"user_id": uid, "title": str(i), "created_at": at} for i, at in enumerate(created)]
+        )
+        sam.db.session.commit()
+
+
+def _pages(client, url, limit):
+    pages, cursor = [], None
+    while True:
+        query = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get(url, query_string=query).get_json()
+        pages.append([item["title"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursors_walk_every_row_once_across_ties(client):
+    base = datetime(2025, 1, 1, 12)
+    # Five rows share one timestamp, so pages must split inside the tie on id
+    _add_tasks(client.username, [base] * 5 + [base + timedelta(minutes=i) for i in (1, 2)] + [base - timedelta(days=1)])
+    full = [t["title"] for t in client.get("/tasks_list").get_json()]
+    assert full == ["6", "5", "4", "3", "2", "1", "0", "7"]
+    pages = _pages(client, "/tasks_list", 3)
+    assert pages == [full[:3], full[3:6], full[6:]]
+
+
+def test_rows_added_between_pages_do_not_shift_later_pages(client):
+    base = datetime(2025, 1, 1)
+    _add_tasks(client.username, [base + timedelta(minutes=i) for i in range(4)])
+    first = client.get("/tasks_list?limit=2").get_json()
+    client.post("/add_task", data={"title": "newest"})
+    second = client.get("/tasks_list", query_string={"limit": 2, "cursor": first["next_cursor"]}).get_json()
+    assert [t["title"] for t in first["items"] + second["items"]] == ["3", "2", "1", "0"]
+    assert second["next_cursor"] is None
+
+
+def test_stream_matches_the_full_array(client):
+    _add_tasks(client.username, [datetime(2025, 1, 1) + timedelta(seconds=i) for i in range(7)])
+    streamed = client.get("/tasks_list?stream=1")
+    assert streamed.mimetype == "application/json"
+    assert streamed.get_json() == client.get("/tasks_list").get_json()
+
+
+def test_empty_and_malformed_requests(client):
+    assert client.get("/tasks_list?stream=1").get_json() == []
+    assert client.get("/tasks_list?limit=10").get_json() == {"items": [], "next_cursor": None}
+    bad = client.get("/tasks_list?cursor=not-a-cursor")
+    assert bad.status_code == 400 and bad.get_json()["error"] == "Invalid cursor"
+
+
+def test_limits_are_clamped():
+    assert sam.pagination.parse_limit("0") == 1
+    assert sam.pagination.parse_limit("abc") == sam.pagination.DEFAULT_LIMIT
+    assert sam.pagination.parse_limit(str(10**6)) == sam.pagination.MAX_LIMIT
+
+
+def test_computed_lists_page_the_same_way(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "QUEST_MODE", "stateless")
+    full = [q["id"] for q in client.get("/get_user_quests").get_json()]
+    pages, cursor = [], None
+    while True:
+        page = client.get("/get_user_quests", query_string={"limit": 2, **({"cursor": cursor} if cursor else {})}).get_json()
+        pages.extend(q["id"] for q in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == full and len(full) > 2
@@ -0,0 +1,68 @@
+# tests/test_points_ledger.py
+import threading
+
+from backend import points_ledger
+from conftest import fetch, sam, user_id
+
+THREADS, AWARDS = 8, 5
+
+
+def _ledger_total(uid):
+    with sam.app.app_context():
+        return points_ledger.ledger_totals(sam.db, sam.PointsLedger, [uid]).get(uid, 0)
+
+
+def test_concurrent_awards_are_not_lost(app, client):
+    uid = user_id(client.username)
+    start = fetch(sam.User, uid).points or 0
+    barrier = threading.Barrier(THREADS)
+    totals, errors = [], []
+
+    def worker():
+        try:
+            with app.app_context():
+                stale = sam.db.session.get(sam.User, uid)
+                sam.db.session.expunge(stale)  # a read-modify-write from here would lose updates
+                barrier.wait()
+                for _ in range(AWARDS):
+                    totals.append(sam.award_points(stale, 1, "test"))
+                    sam.db.session.commit()
+        except Exception as e:  # surfaced below; a thread's exception is otherwise swallowed
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert fetch(sam.User, uid).points == start + THREADS * AWARDS
+    # Each award saw its own total: no two increments read the same base
+    assert sorted(totals) == list(range(start + 1, start + THREADS * AWARDS + 1))
+    assert _ledger_total(uid) == start + THREADS * AWARDS
+
+
+def test_award_refreshes_the_loaded_user(app, client):
+    uid = user_id(client.username)
+    with app.app_context():
+        user = sam.db.session.get(sam.User, uid)
+        before = (user.points or 0, user.strength or 0)
+        sam.award_points(user, 150, "test", strength=2)
+        sam.db.session.commit()
+        assert (user.points, user.strength) == (before[0] + 150, before[1] + 2)
+        assert (user.rank, user.level) == (sam.get_rank(user.points), sam.get_level(user.points))
+    row = fetch(sam.User, uid)
+    assert (row.points, row.strength, row.rank) == (user.points, user.strength, user.rank)
+    assert _ledger_total(uid) == row.points
+
+
+def test_reconcile_repairs_drift(app, client):
+    uid = user_id(client.username)
+    client.post("/add_task", data={"title": "earn"})
+    client.post(f"/complete_task/{client.get('/latest_task').get_json()['id']}")
+    with app.app_context():
+        sam.db.session.execute(sam.db.update(sam.User).where(sam.User.id == uid).values(points=999))
+        drift = points_ledger.reconcile(sam.db, sam.User, sam.PointsLedger, fix=True)
+        sam.db.session.commit()
+    assert (uid, 999, _ledger_total(uid)) in drift
+    assert fetch(sam.User, uid).points == _ledger_total(uid)
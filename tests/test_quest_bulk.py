@@ -0,0 +1,82 @@
+# tests/test_quest_bulk.py
+import uuid
+from datetime import datetime, timedelta
+
+from backend import quest_bulk
+from conftest import sam
+
+NOW = datetime(2030, 1, 1, 12, 0)
+
+
+def _choose(period, now):
+    return [{"title": f"{period} {n}", "type": period, "xp": 10} for n in range(2)]
+
+
+def _users(n, **columns):
+    users = [sam.User(username=f"bulk-{uuid.uuid4().hex[:10]}", password="x", **columns) for _ in range(n)]
+    sam.db.session.add_all(users)
+    sam.db.session.flush()
+    sam.db.session.add_all(sam.UserStats(user_id=u.id) for u in users)
+    sam.db.session.commit()
+    return [u.id for u in users]
+
+
+def _regen(ids, now, **kwargs):
+    return quest_bulk.regenerate_cohort(sam.db, sam.User, sam.Quest, ids, sam.REGEN, _choose, now=now, Stats=sam.UserStats, **kwargs)
+
+
+def _quests(user_id, period):
+    return sam.db.session.execute(
+        sam.db.select(sam.Quest.title).where(sam.Quest.user_id == user_id, sam.Quest.type == period)
+    ).scalars().all()
+
+
+def test_new_users_get_every_period(ctx):
+    ids = _users(3)
+    result = _regen(ids, NOW)
+    assert (result["users"], result["inserted"], result["deleted"]) == (3, 18, 0)
+    assert result["user_ids"] == sorted(ids)
+    for uid in ids:
+        user = sam.db.session.get(sam.User, uid)
+        assert (user.last_daily_quest, user.last_weekly_quest, user.last_monthly_quest) == (NOW, NOW, NOW)
+        assert sorted(_quests(uid, "weekly")) == ["weekly 0", "weekly 1"]
+
+
+def test_only_expired_periods_are_replaced(ctx):
+    ids = _users(2)
+    _regen(ids, NOW)
+    assert _regen(ids, NOW + timedelta(hours=1))["users"] == 0
+    result = _regen(ids, NOW + timedelta(days=1, seconds=1))
+    assert (result["users"], result["inserted"], result["deleted"]) == (2, 4, 4)
+    user = sam.db.session.get(sam.User, ids[0])
+    sam.db.session.refresh(user)
+    assert user.last_daily_quest == NOW + timedelta(days=1, seconds=1) and user.last_weekly_quest == NOW
+    assert _regen(ids, NOW + timedelta(days=1, hours=1), force=True)["inserted"] == 12
+
+
+def test_completed_quests_leave_the_stats_counter(ctx):
+    (uid,) = _users(1)
+    _regen([uid], NOW)
+    sam.db.session.execute(
+        sam.db.update(sam.Quest).where(sam.Quest.user_id == uid, sam.Quest.type == "daily").values(completed=True)
+    )
+    sam.db.session.execute(sam.db.update(sam.UserStats).where(sam.UserStats.user_id == uid).values(completed_quests=3))
+    sam.db.session.commit()
+    _regen([uid], NOW + timedelta(days=2))
+    sam.db.session.expire_all()
+    assert sam.db.session.get(sam.UserStats, uid).completed_quests == 1
+
+
+def test_extra_values_ride_on_the_same_update(ctx):
+    ids = _users(2)
+    _regen(ids[:1], NOW, extra_values={"data_version": sam.User.data_version + 1})
+    _regen(ids[1:], NOW)
+    sam.db.session.expire_all()
+    # One bump per period UPDATE that touched the user
+    assert [sam.db.session.get(sam.User, uid).data_version for uid in ids] == [3, 0]
+
+
+def test_daily_adds_the_bmi_quest(ctx):
+    (uid,) = _users(1, height_cm=180, weight_kg=90)
+    _regen([uid], NOW)
+    assert sorted(_quests(uid, "daily")) == ["Moderate Cardio", "daily 0", "daily 1"]
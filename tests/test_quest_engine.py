@@ -0,0 +1,74 @@
+# tests/test_quest_engine.py
+import json
+import os
+import random
+from pathlib import Path
+
+import pytest
+
+from conftest import sam
+
+quest_engine = sam.quest_engine
+
+POOLS = {
+    "daily": {"select": "each_category", "count": 1, "categories": {"A": [{"title": "a1"}, {"title": "a2"}], "B": [{"title": "b1"}]}},
+    "weekly": {"select": "rotate", "count": 2, "categories": {"A": [{"title": "wa1"}, {"title": "wa2"}], "B": [{"title": "wb1"}]}},
+    "monthly": {"select": "any", "count": 2, "categories": {"A": [{"title": "m1", "xp": 50}], "B": [{"title": "m2"}, {"title": "m3"}]}},
+}
+
+
+def _write(path, data, mtime=None):
+    path.write_text(json.dumps(data))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    path = tmp_path / "pools.json"
+    _write(path, POOLS, mtime=1_000_000_000)
+    return quest_engine.QuestEngine(str(path), sam.REGEN, check_interval=0)
+
+
+def test_select_modes(engine):
+    daily = engine.choose("daily", 0, random.Random(1))
+    assert [q["category"] for q in daily] == ["A", "B"]
+    assert daily[1] == {"title": "b1", "category": "B", "type": "daily", "difficulty": "Medium", "xp": 10}
+    # rotate takes its turn category by period number
+    assert {q["title"] for q in engine.choose("weekly", 0)} == {"wa1", "wa2"}
+    assert [q["title"] for q in engine.choose("weekly", 1)] == ["wb1"]
+    monthly = engine.choose("monthly", 0, random.Random(3))
+    assert len(monthly) == 2 and {q["title"] for q in monthly} <= {"m1", "m2", "m3"}
+    assert engine.choose("yearly", 0) == []
+
+
+def test_choices_are_deterministic_per_seed(engine):
+    picks = {tuple(q["title"] for q in engine.choose("monthly", 5, random.Random("7:monthly:5"))) for _ in range(5)}
+    assert len(picks) == 1
+
+
+def test_edits_are_picked_up_and_broken_edits_ignored(engine):
+    version = engine.version
+    _write(Path(engine.path), {**POOLS, "daily": {"select": "any", "count": 1, "categories": {"C": [{"title": "c1"}]}}}, 2_000_000_000)
+    assert engine.refresh() == version + 1
+    assert [q["title"] for q in engine.choose("daily", 0)] == ["c1"]
+
+    _write(Path(engine.path), {"daily": {"select": "sometimes"}}, 3_000_000_000)
+    assert engine.refresh() == version + 1
+    assert [q["title"] for q in engine.choose("daily", 0)] == ["c1"]
+    assert engine.describe()["daily"] == {"select": "any", "count": 1, "categories": {"C": 1}}
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [{"select": "sometimes", "categories": {"A": [{"title": "x"}]}}, {"count": 0, "categories": {"A": [{"title": "x"}]}}, {"categories": {}}],
+)
+def test_invalid_pools_are_rejected(spec):
+    with pytest.raises(ValueError):
+        quest_engine.compile_pools({"daily": spec})
+
+
+def test_shipped_pools_compile():
+    with open(quest_engine.DEFAULT_POOLS_FILE, encoding="utf-8") as f:
+        pools = quest_engine.compile_pools(json.load(f))
+    assert set(pools) == set(sam.REGEN)
@@ -0,0 +1,71 @@
+# tests/test_quest_scheduler.py
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from conftest import ROOT, fetch, sam, user_id
+
+
+def test_scheduler_defaults_to_inprocess(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != "QUEST_SCHEDULER"}
+    env["DATABASE_URL"] = f"sqlite:///{tmp_path}/default.db"
+    out = subprocess.run(
+        [sys.executable, "-c", "import app; print(app.app.config['QUEST_SCHEDULER'], app.scheduler.running)"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Enabled, but not started by merely importing the app (as CLI commands do)
+    assert out.stdout.split() == ["inprocess", "False"]
+
+
+def test_first_request_starts_the_scheduler(app, monkeypatch):
+    started = []
+    monkeypatch.setitem(app.config, "QUEST_SCHEDULER", "inprocess")
+    monkeypatch.setattr(sam.scheduler, "start", lambda: started.append(True))
+    app.test_client().get("/login")
+    assert started == [True]
+
+
+def test_sweep_rolls_over_expired_daily_quests(app, client):
+    uid = user_id(client.username)
+    stale = datetime.utcnow() - timedelta(days=2)
+    with app.app_context():
+        sam.db.session.execute(sam.db.update(sam.User).where(sam.User.id == uid).values(last_daily_quest=stale))
+        sam.db.session.commit()
+        sam.regenerate_expired_quests()
+    assert fetch(sam.User, uid).last_daily_quest > stale
+
+
+def test_lease_is_held_by_one_process_until_it_expires(ctx):
+    name, now = "test.lease", datetime(2030, 1, 1)
+    acquire = sam.quest_scheduler.acquire_lease
+    assert acquire(sam.db, sam.Lease, name, "a", ttl=60, now=now)
+    assert not acquire(sam.db, sam.Lease, name, "b", ttl=60, now=now + timedelta(seconds=30))
+    assert acquire(sam.db, sam.Lease, name, "a", ttl=60, now=now + timedelta(seconds=50))  # renewed to +110s
+    assert not acquire(sam.db, sam.Lease, name, "b", ttl=60, now=now + timedelta(seconds=100))
+    assert acquire(sam.db, sam.Lease, name, "b", ttl=60, now=now + timedelta(seconds=111))
+
+
+def test_sweep_skipped_while_another_process_holds_the_lease(app, client):
+    uid = user_id(client.username)
+    stale = datetime.utcnow() - timedelta(days=2)
+    with app.app_context():
+        sam.db.session.execute(sam.db.update(sam.User).where(sam.User.id == uid).values(last_daily_quest=stale))
+        sam.db.session.merge(
+            sam.Lease(name="quests.sweep", holder="elsewhere:1", expires_at=datetime.utcnow() + timedelta(minutes=5))
+        )
+        sam.db.session.commit()
+        try:
+            assert sam.regenerate_expired_quests()["leased"] is False
+            assert fetch(sam.User, uid).last_daily_quest == stale
+        finally:
+            sam.db.session.execute(sam.db.delete(sam.Lease).where(sam.Lease.name == "quests.sweep"))
+            sam.db.session.commit()
+        assert sam.regenerate_expired_quests()["leased"] is True
+        # One-shot sweeps (cron, jobs) release it so the next one needn't wait out the ttl
+        assert sam.db.session.get(sam.Lease, "quests.sweep") is None
+    assert fetch(sam.User, uid).last_daily_quest > stale
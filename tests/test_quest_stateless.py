@@ -0,0 +1,76 @@
+# tests/test_quest_stateless.py
+import pytest
+
+from conftest import fetch, sam, user_id
+
+
+@pytest.fixture
+def stateless(app, monkeypatch):
+    monkeypatch.setitem(app.config, "QUEST_MODE", "stateless")
+
+
+def _points(uid):
+    return fetch(sam.User, uid).points or 0
+
+
+def _first_quest(client):
+    return client.get("/get_user_quests?period=daily").get_json()[0]
+
+
+def test_completion_awards_once(stateless, client):
+    uid = user_id(client.username)
+    quest = _first_quest(client)
+    before = _points(uid)
+
+    first = client.post("/complete_quest", json={"quest_id": quest["id"]})
+    assert first.status_code == 200
+    assert first.get_json()["points"] == before + quest["xp"]
+
+    again = client.post("/complete_quest", json={"quest_id": quest["id"]})
+    assert again.status_code == 400
+    assert again.get_json()["error"] == "Quest already completed"
+    assert _points(uid) == before + quest["xp"]
+    assert fetch(sam.UserStats, uid).completed_quests == 1
+    assert [q["completed"] for q in client.get("/get_user_quests?period=daily").get_json() if q["id"] == quest["id"]] == [True]
+
+
+def test_losing_a_race_is_not_an_error(stateless, client):
+    """A rival request commits the same completion while this one is deciding."""
+    uid = user_id(client.username)
+    quest = _first_quest(client)
+    before = _points(uid)
+    raced = []
+
+    def rival_commits(state):
+        # Right after a "done already?" read, or right before the insert
+        touched = [m.class_ for m in state.all_mappers] if state.is_select else [getattr(state.statement, "table", None)]
+        if raced or not (sam.QuestCompletion in touched or sam.QuestCompletion.__table__ in touched):
+            return None
+        raced.append(True)
+        result = state.invoke_statement() if state.is_select else None
+        with sam.db.engine.begin() as conn:
+            conn.execute(sam.db.insert(sam.QuestCompletion).values(user_id=uid, quest_key=quest["id"], xp=quest["xp"]))
+        return result
+
+    sam.sa_event.listen(sam.db.session, "do_orm_execute", rival_commits)
+    try:
+        resp = client.post("/complete_quest", json={"quest_id": quest["id"]})
+    finally:
+        sam.sa_event.remove(sam.db.session, "do_orm_execute", rival_commits)
+    assert raced
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Quest already completed"
+    assert _points(uid) == before
+    with sam.app.app_context():
+        rows = sam.db.session.execute(
+            sam.db.select(sam.db.func.count()).where(
+                sam.QuestCompletion.user_id == uid, sam.QuestCompletion.quest_key == quest["id"]
+            )
+        ).scalar_one()
+    assert rows == 1
+
+
+def test_unknown_quest(stateless, client):
+    resp = client.post("/complete_quest", json={"quest_id": 12345})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Quest not found or not owned by user"
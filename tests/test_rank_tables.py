@@ -0,0 +1,41 @@
+# tests/test_rank_tables.py
+from conftest import fetch, sam, user_id
+
+
+def _scan_rank(points):
+    for name, low, high in sam.RANKS:
+        if low <= points <= high:
+            return name
+    return sam.rank_tables.UNRANKED
+
+
+def _scan_level(points):
+    return 1 + sum(points >= t for t in sam.LEVEL_THRESHOLDS)
+
+
+EDGES = sorted({-1, 10**8} | {p + d for _n, low, high in sam.RANKS for p in (low, high) for d in (-1, 0, 1)})
+
+
+def test_lookups_match_a_linear_scan():
+    for points in EDGES + sam.LEVEL_THRESHOLDS:
+        assert (sam.get_rank(points), sam.get_level(points)) == (_scan_rank(points), _scan_level(points)), points
+
+
+def test_batch_lookup_matches_single_lookups(monkeypatch):
+    monkeypatch.setattr(sam.rank_tables, "numpy", None)
+    points = EDGES + list(range(0, 3000, 7))
+    ranks, levels = sam.RANK_TABLES.ranks_and_levels(points)
+    assert ranks == [sam.get_rank(p) for p in points]
+    assert levels == [sam.get_level(p) for p in points]
+
+
+def test_recompute_writes_only_stale_rows(app, client):
+    uid = user_id(client.username)
+    with app.app_context():
+        sam.recompute_ranks()
+        sam.db.session.execute(sam.db.update(sam.User).where(sam.User.id == uid).values(points=1850, rank="E", level=1))
+        sam.db.session.commit()
+        assert sam.recompute_ranks(batch_size=1)["changed"] == 1
+        assert sam.recompute_ranks()["changed"] == 0
+    user = fetch(sam.User, uid)
+    assert (user.rank, user.level) == ("B", 9)
@@ -0,0 +1,81 @@
+# tests/test_search.py
+from conftest import register, sam, user_id
+
+
+def _search(client, q, **params):
+    return client.get("/search", query_string={"q": q, **params}).get_json()["results"]
+
+
+def _log(client, subject, notes=""):
+    client.post("/add_study_log", data={"subject": subject, "duration": "10", "notes": notes})
+
+
+def test_subject_match_ranks_above_a_notes_match(client):
+    _log(client, "Maths", "integrals and vectors")
+    _log(client, "Vectors", "")
+    _log(client, "History", "the weekend")
+    hits = _search(client, "vectors", type="study_log")
+    assert [h["title"] for h in hits] == ["<mark>Vectors</mark>", "Maths"]
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_best_matches_survive_the_limit(client):
+    # The one strong match is the oldest row, so a newest-first cut would drop it
+    _log(client, "Optics", "")
+    for n in range(5):
+        _log(client, f"Revision {n}", "optics " + "notes " * 40)
+    hits = _search(client, "optics", type="study_log", limit=1)
+    assert [h["title"] for h in hits] == ["<mark>Optics</mark>"]
+
+
+def test_last_word_matches_as_a_prefix(client):
+    client.post("/add_study_log", data={"subject": "Chemistry", "duration": "20", "notes": "organic reactions"})
+    assert [h["type"] for h in _search(client, "chem")] == ["study_log"]
+    assert _search(client, "chem organic") == []
+    assert len(_search(client, "organic chem")) == 1
+
+
+def test_hits_are_per_user(app, client):
+    client.post("/add_task", data={"title": "secret plan"})
+    other = app.test_client()
+    register(other)
+    assert _search(other, "secret") == []
+    assert len(_search(client, "secret")) == 1
+
+
+def test_index_follows_deletes(client):
+    client.post("/add_task", data={"title": "ephemeral"})
+    task_id = client.get("/latest_task").get_json()["id"]
+    assert [h["id"] for h in _search(client, "ephemeral")] == [task_id]
+    client.post(f"/delete_task/{task_id}")
+    assert _search(client, "ephemeral") == []
+
+
+def test_index_follows_updates_made_anywhere(client):
+    client.post("/add_task", data={"title": "draft essay"})
+    task_id = client.get("/latest_task").get_json()["id"]
+    with sam.app.app_context():
+        sam.db.session.execute(
+            sam.db.update(sam.Task).where(sam.Task.id == task_id).values(title="final essay", description="submitted")
+        )
+        sam.db.session.commit()
+    assert _search(client, "draft") == []
+    assert [h["id"] for h in _search(client, "submitted")] == [task_id]
+    assert [h["id"] for h in _search(client, "final")] == [task_id]
+
+
+def test_index_stays_consistent_through_churn(client):
+    uid = user_id(client.username)
+    for n in range(6):
+        _log(client, f"Topic {n}", "churn")
+    with sam.app.app_context():
+        ids = sam.db.session.execute(sam.db.select(sam.StudyLog.id).where(sam.StudyLog.user_id == uid)).scalars().all()
+        sam.db.session.execute(sam.db.update(sam.StudyLog).where(sam.StudyLog.id.in_(ids[:3])).values(notes="settled"))
+        sam.db.session.execute(sam.db.delete(sam.StudyLog).where(sam.StudyLog.id.in_(ids[3:5])))
+        sam.db.session.commit()
+        for kind in sam.search.KINDS:
+            fts = sam.search.fts_table(kind)
+            sam.db.session.execute(sam.db.text(f"INSERT INTO {fts}({fts}) VALUES ('integrity-check')"))
+        sam.db.session.rollback()
+    assert [h["id"] for h in _search(client, "churn")] == [ids[5]]
+    assert sorted(h["id"] for h in _search(client, "settled")) == sorted(ids[:3])
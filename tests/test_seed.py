@@ -0,0 +1,59 @@
+# tests/test_seed.py
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, sam
+
+
+def _flask(db_path, *args):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "QUEST_SCHEDULER": "", "ALARM_SCHEDULER": "", "JOBS_WORKER": "off"}
+    return subprocess.run([sys.executable, "-m", "flask", "--app", "app", *args], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("seed") / "seed.db")
+    out = _flask(path, "seed", "run", "--users", "40", "--tasks", "600", "--study-logs", "200", "--seed", "7", "--batch", "128")
+    assert out.returncode == 0, out.stderr
+    assert "Seeded 40 users, 600 tasks, 200 study logs" in out.stdout
+    return path
+
+
+def _scalar(path, sql):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(sql).fetchone()[0]
+
+
+def test_seeded_rows_and_derived_tables(seeded):
+    assert _scalar(seeded, "SELECT COUNT(*) FROM user") == 40
+    assert _scalar(seeded, "SELECT COUNT(*) FROM task") == 600
+    assert _scalar(seeded, "SELECT SUM(sessions) FROM study_daily") == 200
+    assert _scalar(seeded, "SELECT SUM(minutes) FROM study_subject_daily") == _scalar(seeded, "SELECT SUM(duration) FROM study_log")
+    # Activity is skewed: the busiest user owns far more than an even share
+    assert _scalar(seeded, "SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM task GROUP BY user_id)") > 600 / 40 * 2
+
+
+def test_search_index_is_rebuilt_after_seeding(seeded):
+    with sqlite3.connect(seeded) as conn:
+        for kind in sam.search.KINDS:
+            conn.execute(f"INSERT INTO {sam.search.fts_table(kind)}({sam.search.fts_table(kind)}) VALUES ('integrity-check')")
+        triggers = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    assert {"task_fts_ai", "task_fts_ad", "study_log_fts_ai"} <= triggers
+
+
+def test_plan_check_passes_on_a_seeded_database(seeded):
+    out = _flask(seeded, "plans", "check", "--analyze")
+    assert out.returncode == 0, out.stdout + out.stderr
+    assert " 0 full scans of hot tables" in out.stdout
+
+
+def test_a_full_scan_of_a_hot_table_fails():
+    assert sam.query_plans.classify(["SCAN task"], "SELECT * FROM task") == (["SCAN task"], [])
+    assert sam.query_plans.classify(["SEARCH task USING INDEX ix_task_user (user_id=?)"], "...") == ([], [])
+    assert sam.query_plans.classify(["SCAN task USING INDEX ix_task_user"], "...") == ([], ["SCAN task USING INDEX ix_task_user"])
+    assert sam.query_plans.classify(["SCAN user"], "SELECT user.id, user.points FROM user")[0] == []
+    assert sam.query_plans.classify(["SCAN job_log"], "SELECT * FROM job_log") == ([], [])
@@ -0,0 +1,86 @@
+# tests/test_study_rollups.py
+from datetime import date
+
+from conftest import sam, user_id
+
+RANGE = {"from": "2025-01-06", "to": "2025-01-19"}
+
+
+def _log(client, subject, minutes, started_at):
+    client.post("/add_study_log", data={"subject": subject, "duration": str(minutes), "started_at": started_at})
+
+
+def _stats(client, group):
+    return client.get("/study_stats", query_string={**RANGE, "group": group}).get_json()
+
+
+def _rows(Model, uid):
+    with sam.app.app_context():
+        rows = sam.db.session.execute(sam.db.select(Model).where(Model.user_id == uid)).scalars()
+        return sorted((r.day, getattr(r, "subject", None), r.sessions, r.minutes) for r in rows)
+
+
+def test_buckets_follow_session_start_days(client):
+    # 23:30 in UTC-5 is the next UTC day
+    _log(client, "Math", 30, "2025-01-06T09:00:00Z")
+    _log(client, "Art", 15, "2025-01-07T23:30:00-05:00")
+    _log(client, "Math", 45, "2025-01-13T10:00:00.000Z")
+
+    days = _stats(client, "day")
+    assert days["buckets"] == [
+        {"day": "2025-01-06", "sessions": 1, "minutes": 30},
+        {"day": "2025-01-08", "sessions": 1, "minutes": 15},
+        {"day": "2025-01-13", "sessions": 1, "minutes": 45},
+    ]
+    assert (days["total_sessions"], days["total_minutes"]) == (3, 90)
+    assert _stats(client, "week")["buckets"] == [
+        {"week": "2025-01-06", "sessions": 2, "minutes": 45},
+        {"week": "2025-01-13", "sessions": 1, "minutes": 45},
+    ]
+    assert _stats(client, "subject")["buckets"] == [
+        {"subject": "Math", "sessions": 2, "minutes": 75},
+        {"subject": "Art", "sessions": 1, "minutes": 15},
+    ]
+
+
+def test_deleting_a_log_takes_it_out_of_the_buckets(client):
+    _log(client, "Math", 30, "2025-01-06T09:00:00Z")
+    _log(client, "Art", 20, "2025-01-06T12:00:00Z")
+    art = next(log for log in client.get("/get_study_logs").get_json() if log["subject"] == "Art")
+    client.delete(f"/delete_study_log/{art['id']}")
+    assert _stats(client, "day")["buckets"] == [{"day": "2025-01-06", "sessions": 1, "minutes": 30}]
+    assert _stats(client, "subject")["buckets"] == [{"subject": "Math", "sessions": 1, "minutes": 30}]
+
+
+def test_incremental_rollups_match_a_rebuild(client):
+    uid = user_id(client.username)
+    for i, subject in enumerate(["Math", "Math", "Art", "Bio"]):
+        _log(client, subject, 10 + i, f"2025-01-0{6 + i % 2}T08:00:00Z")
+    first = client.get("/get_study_logs").get_json()[0]
+    client.delete(f"/delete_study_log/{first['id']}")
+    incremental = [_rows(sam.StudyDaily, uid), _rows(sam.StudySubjectDaily, uid)]
+    with sam.app.app_context():
+        sam.rebuild_study_rollups([uid])
+        sam.db.session.commit()
+    rebuilt = [_rows(sam.StudyDaily, uid), _rows(sam.StudySubjectDaily, uid)]
+    # A rebuild drops emptied rows that the incremental path leaves at zero
+    assert [[r for r in rows if r[2]] for rows in incremental] == rebuilt
+
+
+def test_first_writes_to_a_day_add_up(app, client):
+    """Two sessions on a day nobody logged yet, the second finding the row already there."""
+    uid = user_id(client.username)
+    day = date(2025, 1, 9)
+    with app.app_context():
+        for minutes in (10, 25):
+            log = sam.StudyLog(user_id=uid, subject="Math", duration=minutes, created_at=sam.datetime(2025, 1, 9, 8))
+            sam.study_rollup(log)
+        sam.db.session.commit()
+    assert _rows(sam.StudyDaily, uid) == [(day, None, 2, 35)]
+    assert _rows(sam.StudySubjectDaily, uid) == [(day, "Math", 2, 35)]
+
+
+def test_rejects_bad_ranges(client):
+    assert client.get("/study_stats?group=month").status_code == 400
+    assert client.get("/study_stats?from=2025-13-01").status_code == 400
+    assert client.get("/study_stats?from=2025-01-10&to=2025-01-01").status_code == 400
@@ -0,0 +1,62 @@
+# tests/test_sync.py
+import uuid
+
+from conftest import fetch, register, sam, user_id
+
+
+def _key():
+    return uuid.uuid4().hex
+
+
+def _sync(client, *mutations):
+    return client.post("/sync", json={"mutations": list(mutations)}).get_json()
+
+
+def test_replayed_batch_is_not_applied_twice(client):
+    uid = user_id(client.username)
+    add, done = _key(), _key()
+    batch = [
+        {"key": add, "op": "add_task", "args": {"title": "offline"}},
+        {"key": done, "op": "complete_task", "args": {"task_ref": add}},
+    ]
+    first = _sync(client, *batch)
+    assert [r["success"] for r in first["results"]] == [True, True]
+    points = fetch(sam.User, uid).points
+    replay = _sync(client, *batch)
+    assert all(r["replayed"] for r in replay["results"])
+    assert [r["task_id"] for r in replay["results"]] == [r["task_id"] for r in first["results"]]
+    assert fetch(sam.User, uid).points == points
+    assert fetch(sam.UserStats, uid).completed_tasks == 1
+    with sam.app.app_context():
+        tasks = sam.db.session.execute(sam.db.select(sam.db.func.count()).where(sam.Task.user_id == uid)).scalar()
+    assert tasks == 1
+
+
+def test_key_repeated_within_a_batch_is_applied_once(client):
+    key = _key()
+    item = {"key": key, "op": "add_study_log", "args": {"duration": 10}}
+    results = _sync(client, item, item)["results"]
+    assert not results[0].get("replayed") and results[1]["replayed"]
+    assert results[0]["log_id"] == results[1]["log_id"]
+
+
+def test_task_ref_resolves_a_key_from_an_earlier_batch(client):
+    add = _key()
+    task_id = _sync(client, {"key": add, "op": "add_task", "args": {"title": "later"}})["results"][0]["task_id"]
+    result = _sync(client, {"key": _key(), "op": "complete_task", "args": {"task_ref": add}})["results"][0]
+    assert result["success"] and result["task_id"] == task_id
+    assert fetch(sam.Task, task_id).completed
+
+
+def test_refs_do_not_cross_users(app, client):
+    add = _key()
+    _sync(client, {"key": add, "op": "add_task", "args": {"title": "mine"}})
+    other = app.test_client()
+    register(other)
+    result = _sync(other, {"key": _key(), "op": "complete_task", "args": {"task_ref": add}})["results"][0]
+    assert not result["success"]
+
+
+def test_malformed_ref_rejects_the_batch(client):
+    reply = client.post("/sync", json={"mutations": [{"key": _key(), "op": "complete_task", "args": {"task_ref": 5}}]})
+    assert reply.status_code == 400
@@ -0,0 +1,62 @@
+# tests/test_uploads.py
+import io
+import os
+
+from conftest import fetch, register, sam, user_id
+
+
+def _picture(name, data=b"\xff\xd8\xff fake jpeg"):
+    return (io.BytesIO(data), name)
+
+
+def test_register_with_non_ascii_picture_name(app):
+    username = register(app.test_client(), profile_pic=_picture("фото.jpg"))
+    user = fetch(sam.User, user_id(username))
+    assert user.profile_pic.endswith(".jpg")
+    assert os.path.exists(os.path.join(app.config["UPLOAD_FOLDER"], user.profile_pic))
+
+
+def test_edit_profile_with_dot_only_picture_name(app, client):
+    response = client.post("/edit-profile", data={"profile_pic": _picture(".PNG", b"png bytes")})
+    assert response.status_code == 302
+    assert fetch(sam.User, user_id(client.username)).profile_pic.endswith(".png")
+
+
+def test_identical_uploads_share_one_file(app):
+    keys = [
+        fetch(sam.User, user_id(register(app.test_client(), profile_pic=_picture(name, b"same bytes")))).profile_pic
+        for name in ("a.jpg", "b.jpg")
+    ]
+    assert keys[0] == keys[1]
+
+
+def _set_picture(client, data):
+    client.post("/edit-profile", data={"profile_pic": _picture("p.jpg", data)})
+    return fetch(sam.User, user_id(client.username))
+
+
+def _thumbnail_jobs(uid):
+    with sam.app.app_context():
+        jobs = sam.db.session.execute(sam.db.select(sam.Job.payload).where(sam.Job.name == "thumbnails")).scalars()
+        return [payload for payload in jobs if f'"user_id": {uid}}}' in payload]
+
+
+def test_switching_back_to_a_picture_queues_its_thumbnails_again(app, client):
+    a = _set_picture(client, b"picture A " + os.urandom(8)).profile_pic
+    _set_picture(client, b"picture B " + os.urandom(8))
+    user = _set_picture(client, open(os.path.join(app.config["UPLOAD_FOLDER"], a), "rb").read())
+    assert user.profile_pic == a
+    assert sum(a in payload for payload in _thumbnail_jobs(user.id)) == 2
+
+
+def test_switching_back_restores_existing_thumbnails(app, client):
+    data = b"picture A " + os.urandom(8)
+    a = _set_picture(client, data).profile_pic
+    variants = sam.uploads.thumbnail_keys(a)
+    for key in variants.values():  # as the thumbnails job would have left them
+        os.makedirs(os.path.dirname(os.path.join(app.config["UPLOAD_FOLDER"], key)), exist_ok=True)
+        open(os.path.join(app.config["UPLOAD_FOLDER"], key), "wb").close()
+    _set_picture(client, b"picture B " + os.urandom(8))
+    user = _set_picture(client, data)
+    assert (user.profile_thumb, user.profile_thumb_webp) == (variants["jpeg"], variants["webp"])
+    assert sum(a in payload for payload in _thumbnail_jobs(user.id)) == 1
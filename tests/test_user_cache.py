@@ -0,0 +1,71 @@
+# tests/test_user_cache.py
+import pytest
+
+from conftest import sam, user_id
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_and_the_least_recent_is_evicted():
+    clock = _Clock()
+    cache = sam.user_cache.UserCache(ttl=30, maxsize=2, clock=clock)
+    cache.put(1, {"id": 1})
+    cache.put(2, {"id": 2})
+    assert cache.get(1) == {"id": 1}
+    cache.put(3, {"id": 3})  # 2 is the least recently used
+    assert cache.get(2) is None and cache.get(1) is not None
+    clock.now += 30
+    assert cache.get(1) is None and len(cache) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_a_miss_raced_by_an_invalidation_is_not_cached():
+    cache = sam.user_cache.UserCache()
+    version = cache.version
+    cache.invalidate(1)  # a writer committed while the loader was querying
+    cache.put(1, {"points": "stale"}, version)
+    assert cache.get(1) is None
+
+
+def test_a_zero_ttl_disables_caching():
+    cache = sam.user_cache.UserCache(ttl=0)
+    cache.put(1, {"id": 1})
+    assert cache.get(1) is None
+
+
+def _points_reply(client):
+    return client.post("/voice_command", json={"command": "points"}).get_json()["message"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(sam.identity_cache, "clock", fake)
+    monkeypatch.setitem(sam.app.config, "USER_CACHE_SESSION", False)
+    return fake
+
+
+def test_own_writes_invalidate_the_identity(client, clock):
+    _points_reply(client)
+    hits = sam.identity_cache.hits
+    _points_reply(client)
+    assert sam.identity_cache.hits == hits + 1  # no SELECT for the user this time
+
+    client.post("/add_study_log", data={"subject": "Math", "duration": "50"})
+    assert _points_reply(client) == "You currently have 10 points."
+
+
+def test_other_workers_writes_show_up_within_the_ttl(client, clock):
+    uid = user_id(client.username)
+    _points_reply(client)
+    with sam.app.app_context(), sam.db.engine.begin() as conn:
+        conn.execute(sam.db.update(sam.User).where(sam.User.id == uid).values(points=77))
+    assert _points_reply(client) == "You currently have 0 points."  # the bound: served from cache until it expires
+    clock.now += sam.identity_cache.ttl
+    assert _points_reply(client) == "You currently have 77 points."
@@ -0,0 +1,68 @@
+# tests/test_user_stats.py
+from conftest import fetch, sam, user_id
+
+
+def _forget_stats(app, uid):
+    """Make the user look like one created before the stats table existed."""
+    with app.app_context():
+        sam.db.session.execute(sam.db.delete(sam.UserStats).where(sam.UserStats.user_id == uid))
+        sam.db.session.commit()
+
+
+def _latest_task_id(client):
+    return client.get("/latest_task").get_json()["id"]
+
+
+def test_counters_follow_task_lifecycle(app, client):
+    uid = user_id(client.username)
+    client.post("/add_task", data={"title": "one"})
+    task_id = _latest_task_id(client)
+    client.post(f"/complete_task/{task_id}")
+    assert fetch(sam.UserStats, uid).completed_tasks == 1
+    client.post(f"/delete_task/{task_id}")
+    assert fetch(sam.UserStats, uid).completed_tasks == 0
+
+
+def test_legacy_user_deleting_a_completed_task(app, client):
+    uid = user_id(client.username)
+    client.post("/add_task", data={"title": "old"})
+    task_id = _latest_task_id(client)
+    client.post(f"/complete_task/{task_id}")
+    _forget_stats(app, uid)
+    client.post(f"/delete_task/{task_id}")
+    assert fetch(sam.UserStats, uid).completed_tasks == 0
+
+
+def test_legacy_user_deleting_a_study_log(app, client):
+    uid = user_id(client.username)
+    client.post("/add_study_log", data={"subject": "Math", "duration": "30"})
+    client.post("/add_study_log", data={"subject": "Art", "duration": "15"})
+    log_id = client.get("/get_study_logs?limit=1").get_json()["items"][0]["id"]
+    _forget_stats(app, uid)
+    assert client.delete(f"/delete_study_log/{log_id}").status_code == 200
+    stats = fetch(sam.UserStats, uid)
+    assert (stats.study_logs, stats.total_study_minutes) == (1, 30)
+
+
+def test_first_write_adds_to_a_row_inserted_concurrently(app, client):
+    """Another transaction stores the missing row between our UPDATE and INSERT."""
+    uid = user_id(client.username)
+    _forget_stats(app, uid)
+
+    def counters_for(rival_user_id):
+        rival = dict.fromkeys(sam.user_stats.COUNTERS, 0) | {"completed_tasks": 4, "study_logs": 2}
+        sam.db.session.execute(sam.db.insert(sam.UserStats).values(user_id=rival_user_id, **rival))
+        return dict.fromkeys(sam.user_stats.COUNTERS, 0) | {"completed_tasks": 1}
+
+    with app.app_context():
+        sam.user_stats.bump(sam.db, sam.UserStats, uid, counters_for, completed_tasks=1)
+        sam.db.session.commit()
+    stats = fetch(sam.UserStats, uid)
+    assert (stats.completed_tasks, stats.study_logs) == (5, 2)
+
+
+def test_reading_stats_does_not_store_them(app, client):
+    uid = user_id(client.username)
+    _forget_stats(app, uid)
+    assert client.get("/profile").status_code == 200
+    assert fetch(sam.UserStats, uid) is None
@@ -0,0 +1,85 @@
+# tests/test_voice_commands.py
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from conftest import fetch, sam
+
+
+class _Alarms:
+    """Stands in for the alarm scheduler and records which alarms were cancelled."""
+
+    running = True
+
+    def __init__(self):
+        self.cancelled = []
+
+    def cancel(self, task_id):
+        self.cancelled.append(task_id)
+
+    def schedule(self, task_id, user_id, alarm_time, title):
+        pass
+
+
+@pytest.fixture
+def alarms(monkeypatch):
+    fake = _Alarms()
+    monkeypatch.setattr(sam, "alarm_scheduler", fake)
+    return fake
+
+
+def _add_task(client, alarms):
+    client.post("/add_task", data={"title": "wake up"})
+    alarms.cancelled.clear()  # adding a task without an alarm time cancels its (absent) alarm
+    return client.get("/latest_task").get_json()["id"]
+
+
+def test_completing_a_task_cancels_its_alarm(client, alarms):
+    task_id = _add_task(client, alarms)
+    reply = client.post("/voice_command", json={"command": f"complete task {task_id}"}).get_json()
+    assert reply["success"]
+    assert fetch(sam.Task, task_id).completed
+    assert alarms.cancelled == [task_id]
+
+
+def test_failed_commit_keeps_the_alarm(client, alarms, monkeypatch):
+    task_id = _add_task(client, alarms)
+
+    def commit():
+        raise OperationalError("COMMIT", None, Exception("database is locked"))
+
+    monkeypatch.setattr(sam.db.session, "commit", commit)
+    reply = client.post("/voice_command", json={"command": f"complete task {task_id}"}).get_json()
+    monkeypatch.undo()
+    assert not reply["success"]
+    assert not fetch(sam.Task, task_id).completed
+    assert alarms.cancelled == []
+
+
+def test_batch_reports_bad_items_one_by_one(client, alarms):
+    task_id = _add_task(client, alarms)
+    resp = client.post("/voice_command", json={"commands": [42, f"complete task {task_id}", None, {"x": 1}, "sing"]})
+    assert resp.status_code == 200
+    reply = resp.get_json()
+    assert not reply["success"]
+    assert [r["success"] for r in reply["results"]] == [False, True, False, False, False]
+    assert [reply["results"][i]["message"] for i in (0, 2, 3, 4)] == [
+        "Command must be a string.",
+        "No command provided.",
+        "Command must be a string.",
+        "Command not recognized.",
+    ]
+    assert fetch(sam.Task, task_id).completed
+
+
+def test_batch_size_is_capped(client, alarms):
+    task_id = _add_task(client, alarms)
+    too_many = [f"complete task {task_id}"] + ["hello"] * sam.voice_commands.MAX_BATCH
+    resp = client.post("/voice_command", json={"commands": too_many})
+    assert resp.status_code == 400
+    assert not fetch(sam.Task, task_id).completed
+    assert client.post("/voice_command", json={"commands": too_many[: sam.voice_commands.MAX_BATCH]}).status_code == 200
+
+
+@pytest.mark.parametrize("body", [{"command": 7}, {"command": ["a"]}, {"commands": "a"}, ["complete task 1"], {}])
+def test_malformed_requests_are_rejected(client, body):
+    assert client.post("/voice_command", json=body).status_code == 400